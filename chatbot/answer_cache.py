@@ -0,0 +1,128 @@
+"""
+Cache of generated chatbot answers.
+
+Answers are stored in the Django cache named by
+``settings.CHATBOT_ANSWER_CACHE``, so development uses locmem and
+production shares one backend between workers. Entries expire with the
+backend's TTL and are evicted LRU by the backend.
+
+Keys combine the normalised question, the language and the generation of
+every contributing ``KnowledgeArticle``. Saving or deleting an article bumps
+its generation, which makes every answer built from it unreachable.
+
+Questions that are worded differently but retrieve the same articles are
+matched through a small per-(language, articles) bucket that keeps the
+hashing embeddings of recent questions, most recently used first.
+"""
+import hashlib
+import re
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+
+from core.versioning import bump_version
+
+from .embeddings import HashingEmbedder
+
+
+PUNCTUATION_RE = re.compile(r'[^\wഀ-ൿ\s]')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_question(question):
+    """Lowercase, strip punctuation and collapse whitespace"""
+    text = PUNCTUATION_RE.sub(' ', question.lower())
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def _digest(*parts):
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+class AnswerCache:
+    """Exact and near-duplicate lookup of previously generated answers"""
+
+    def __init__(self, alias=None):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias or settings.CHATBOT_ANSWER_CACHE]
+
+    @property
+    def embedder(self):
+        return HashingEmbedder(dim=settings.CHATBOT_ANSWER_CACHE_DIM)
+
+    # Keys
+
+    def _generation_key(self, article_id):
+        return f'chatbot:answers:article:{article_id}:gen'
+
+    def _scope(self, language, article_ids):
+        """Digest of the language and the current article generations"""
+        keys = [self._generation_key(article_id) for article_id in sorted(article_ids)]
+        generations = self.cache.get_many(keys)
+        parts = [f'{key}={generations.get(key, 0)}' for key in keys]
+        return _digest(language, *parts)
+
+    def _entry_key(self, scope, normalized):
+        return f'chatbot:answers:entry:{_digest(scope, normalized)}'
+
+    def _bucket_key(self, scope):
+        return f'chatbot:answers:bucket:{scope}'
+
+    # Lookup
+
+    def get(self, question, language, article_ids):
+        """Return the cached answer payload or ``None``"""
+        normalized = normalize_question(question)
+        scope = self._scope(language, article_ids)
+        payload = self.cache.get(self._entry_key(scope, normalized))
+        if payload is not None:
+            return payload
+        return self._get_similar(scope, normalized)
+
+    def _get_similar(self, scope, normalized):
+        bucket = self.cache.get(self._bucket_key(scope))
+        if not bucket:
+            return None
+
+        query = self.embedder.embed([normalized])[0].astype(np.float16)
+        matrix = np.frombuffer(b''.join(vector for _, vector in bucket), dtype=np.float16)
+        similarities = matrix.reshape(len(bucket), -1).astype(np.float32) @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] < settings.CHATBOT_ANSWER_CACHE_SIMILARITY:
+            return None
+
+        entry_key, _ = bucket[best]
+        payload = self.cache.get(entry_key)
+        if payload is None:
+            del bucket[best]
+        elif best:
+            bucket.insert(0, bucket.pop(best))
+        self.cache.set(self._bucket_key(scope), bucket)
+        return payload
+
+    # Storage
+
+    def set(self, question, language, article_ids, payload):
+        """Store ``payload`` for the question and its contributing articles"""
+        normalized = normalize_question(question)
+        scope = self._scope(language, article_ids)
+        entry_key = self._entry_key(scope, normalized)
+        self.cache.set(entry_key, payload)
+
+        bucket_key = self._bucket_key(scope)
+        bucket = [entry for entry in self.cache.get(bucket_key, []) if entry[0] != entry_key]
+        vector = self.embedder.embed([normalized])[0].astype(np.float16).tobytes()
+        bucket.insert(0, (entry_key, vector))
+        del bucket[settings.CHATBOT_ANSWER_CACHE_BUCKET_SIZE:]
+        self.cache.set(bucket_key, bucket)
+
+    def invalidate_article(self, article_id):
+        """Make every answer that used ``article_id`` unreachable"""
+        bump_version(self._generation_key(article_id), self.cache)
+
+
+answer_cache = AnswerCache()
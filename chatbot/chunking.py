@@ -0,0 +1,62 @@
+"""
+Split knowledge articles into overlapping passages for retrieval.
+
+Only the best matching passages are sent to the LLM, so prompt size no
+longer grows with article length. Token counts are computed once here and
+stored on ``ArticleChunk`` so prompt budgeting never re-tokenizes.
+"""
+import re
+
+from django.conf import settings
+
+from .models import ArticleChunk
+
+
+# Approximation of LLM tokenisation: one token per word or punctuation mark
+LLM_TOKEN_RE = re.compile(r'[\wഀ-ൿ]+|[^\w\sഀ-ൿ]')
+WORD_RE = re.compile(r'\S+')
+
+
+def count_tokens(text):
+    """Estimate the number of LLM tokens in ``text``"""
+    if not text:
+        return 0
+    return sum(1 for _ in LLM_TOKEN_RE.finditer(text))
+
+
+def chunk_text(text, size=None, overlap=None):
+    """Yield overlapping windows of roughly ``size`` words from ``text``"""
+    size = size or settings.CHATBOT_CHUNK_WORDS
+    overlap = settings.CHATBOT_CHUNK_OVERLAP if overlap is None else overlap
+    if overlap >= size:
+        raise ValueError("Chunk overlap must be smaller than the chunk size")
+
+    spans = [match.span() for match in WORD_RE.finditer(text or '')]
+    step = size - overlap
+    for start in range(0, len(spans), step):
+        window = spans[start:start + size]
+        yield text[window[0][0]:window[-1][1]]
+        if start + size >= len(spans):
+            break
+
+
+def build_chunks(article):
+    """Return unsaved ``ArticleChunk`` objects for ``article``"""
+    return [
+        ArticleChunk(
+            article=article,
+            language=article.language,
+            position=position,
+            content=content,
+            token_count=count_tokens(content),
+        )
+        for position, content in enumerate(chunk_text(article.content))
+    ]
+
+
+def rechunk_article(article):
+    """Replace the stored chunks of ``article`` and return the new ones"""
+    ArticleChunk.objects.filter(article=article).delete()
+    if not article.is_active:
+        return []
+    return ArticleChunk.objects.bulk_create(build_chunks(article))
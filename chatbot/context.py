@@ -0,0 +1,112 @@
+"""
+Conversation history for chatbot prompts.
+
+Each session keeps a rolling window of recent messages within
+``settings.CHATBOT_HISTORY_TOKENS``. When the window overflows, the
+oldest whole turns are folded into ``ChatSession.summary`` and the
+``summarized_until`` watermark moves forward. Building the history for a
+new turn therefore reads only the unsummarised tail of the conversation,
+which the window keeps bounded, using the token counts stored on each
+``ChatMessage`` instead of re-tokenising.
+"""
+import re
+from collections import namedtuple
+
+from django.conf import settings
+
+from .chunking import count_tokens
+from .models import ChatMessage, ChatSession
+from .persistence import chat_writer
+
+
+ConversationHistory = namedtuple('ConversationHistory', ['summary', 'messages'])
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?।])\s')
+SPEAKERS = {'user': 'Farmer', 'bot': 'Assistant', 'system': 'System'}
+
+
+def first_sentence(text, max_words=30):
+    sentence = SENTENCE_END_RE.split(text.strip(), 1)[0]
+    words = sentence.split()
+    return ' '.join(words[:max_words]) + (' ...' if len(words) > max_words else '')
+
+
+def summarize(summary, messages, max_tokens):
+    """Fold ``messages`` into ``summary`` extractively
+
+    Keeps each question and the first sentence of each answer, dropping
+    the oldest lines once the summary exceeds ``max_tokens``.
+    """
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        lines.append(f"{SPEAKERS.get(message.message_type, 'System')}: {first_sentence(message.content)}")
+
+    counts = [count_tokens(line) for line in lines]
+    total = sum(counts)
+    start = 0
+    while total > max_tokens and start < len(lines) - 1:
+        total -= counts[start]
+        start += 1
+    return '\n'.join(lines[start:]), total
+
+
+def fold_overflow(session, messages, budget):
+    """Fold the oldest whole turns until ``messages`` fit in ``budget``
+
+    Only messages already in the database are folded, since the watermark
+    is stored on the session. Returns the messages left in the window.
+    """
+    total = sum(message.token_count for message in messages)
+    if total <= budget:
+        return messages
+
+    # Fold down to half the budget so folding does not happen every turn
+    target = budget // 2
+    cut = 0
+    while cut < len(messages) and total > target and messages[cut].pk is not None:
+        total -= messages[cut].token_count
+        cut += 1
+    # Never split a turn: keep a dangling user question in the window
+    while cut and messages[cut - 1].message_type == 'user':
+        cut -= 1
+        total += messages[cut].token_count
+    if not cut:
+        return messages
+
+    folded = messages[:cut]
+    session.summary, session.summary_token_count = summarize(
+        session.summary, folded, settings.CHATBOT_SUMMARY_TOKENS
+    )
+    session.summarized_until = folded[-1].timestamp
+    ChatSession.objects.filter(pk=session.pk).update(
+        summary=session.summary,
+        summary_token_count=session.summary_token_count,
+        summarized_until=session.summarized_until,
+    )
+    return messages[cut:]
+
+
+def build_history(session, budget=None):
+    """Return the ``ConversationHistory`` to include in the next prompt"""
+    if budget is None:
+        budget = settings.CHATBOT_HISTORY_TOKENS
+
+    tail = ChatMessage.objects.filter(session=session)
+    if session.summarized_until is not None:
+        tail = tail.filter(timestamp__gt=session.summarized_until)
+    messages = list(
+        tail.order_by('timestamp', 'id').only('id', 'message_type', 'content', 'token_count', 'timestamp')
+    )
+    messages.extend(chat_writer.pending_messages(session.pk))
+    messages = fold_overflow(session, messages, budget)
+    return ConversationHistory(session.summary, messages)
+
+
+def format_history(history):
+    """Render a ``ConversationHistory`` as prompt text"""
+    lines = []
+    if history.summary:
+        lines.append(f"Summary of earlier conversation:\n{history.summary}")
+    for message in history.messages:
+        lines.append(f"{SPEAKERS.get(message.message_type, 'System')}: {message.content}")
+    return '\n'.join(lines)
@@ -0,0 +1,82 @@
+"""
+Pluggable text embedders for semantic retrieval.
+
+The active embedder is chosen with ``settings.CHATBOT_EMBEDDER`` (a dotted
+path). Every embedder exposes ``dim`` and ``embed(texts)`` returning an
+L2-normalised ``float32`` array of shape ``(len(texts), dim)``.
+"""
+import zlib
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .search import tokenize
+
+
+def normalize_rows(matrix):
+    """L2-normalise each row in place, leaving all-zero rows untouched"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class HashingEmbedder:
+    """Deterministic offline embedder based on signed feature hashing
+
+    Unigrams and adjacent bigrams are hashed into ``dim`` buckets, so
+    questions sharing vocabulary with an article land close to it without
+    any model download or network access.
+    """
+
+    def __init__(self, dim=None):
+        self.dim = dim or settings.CHATBOT_EMBEDDING_DIM
+
+    def _features(self, text):
+        tokens = tokenize(text)
+        return tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if not features:
+                continue
+            hashes = np.fromiter(
+                (zlib.crc32(feature.encode('utf-8')) for feature in features),
+                dtype=np.uint32,
+                count=len(features),
+            )
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(matrix[row], hashes % self.dim, signs)
+        return normalize_rows(matrix)
+
+
+class GeminiEmbedder:
+    """Embed text with the Gemini embedding API"""
+
+    model = 'models/text-embedding-004'
+    dim = 768
+
+    def __init__(self, dim=None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self._genai = genai
+
+    def embed(self, texts):
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        result = self._genai.embed_content(model=self.model, content=list(texts))
+        return normalize_rows(np.asarray(result['embedding'], dtype=np.float32))
+
+
+@lru_cache(maxsize=None)
+def _load_embedder(path, dim):
+    return import_string(path)(dim=dim)
+
+
+def get_embedder():
+    """Return the configured embedder instance (one per process)"""
+    return _load_embedder(settings.CHATBOT_EMBEDDER, settings.CHATBOT_EMBEDDING_DIM)
@@ -0,0 +1,117 @@
+"""
+Pluggable LLM clients used to generate chatbot answers.
+
+The active client is chosen with ``settings.CHATBOT_LLM_CLIENT``. A client
+exposes ``name`` (recorded in ``APIUsageLog.endpoint``),
+``generate(prompt)`` returning an ``LLMResponse`` and the async generator
+``stream(prompt)`` yielding ``LLMResponse`` pieces as the model produces
+them. ``tokens_used`` is only set on the final piece, when known.
+"""
+import asyncio
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+LLMResponse = namedtuple('LLMResponse', ['text', 'tokens_used'])
+
+HISTORY_HEADER = "Conversation so far:"
+CONTEXT_HEADER = "Context from knowledge base:"
+QUESTION_HEADER = "User question:"
+
+LANGUAGE_INSTRUCTIONS = {
+    'ml': "Please respond in simple Malayalam language suitable for farmers.",
+    'en': "Please respond in simple English language suitable for farmers.",
+}
+
+
+class LLMError(Exception):
+    """Raised when the language model cannot produce an answer"""
+
+
+def build_prompt(question, context, language='en', history=''):
+    """Build the RAG prompt sent to the language model"""
+    instructions = LANGUAGE_INSTRUCTIONS.get(language, LANGUAGE_INSTRUCTIONS['en'])
+    return (
+        (f"{HISTORY_HEADER}\n{history}\n\n" if history else '') +
+        f"{CONTEXT_HEADER}\n{context}\n\n"
+        f"{QUESTION_HEADER} {question}\n\n"
+        f"Instructions: {instructions}\n"
+        "Provide practical, actionable advice based on the context provided."
+    )
+
+
+class GeminiClient:
+    """Generate answers with Google Gemini"""
+
+    def __init__(self):
+        import google.generativeai as genai
+
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self.name = settings.GEMINI_MODEL
+        self._model = genai.GenerativeModel(settings.GEMINI_MODEL)
+
+    def generate(self, prompt):
+        try:
+            response = self._model.generate_content(
+                prompt, request_options={'timeout': settings.GEMINI_TIMEOUT},
+            )
+            text = response.text
+        except Exception as exc:
+            raise LLMError(str(exc)) from exc
+        usage = getattr(response, 'usage_metadata', None)
+        return LLMResponse(text, getattr(usage, 'total_token_count', None))
+
+    async def stream(self, prompt):
+        usage = None
+        try:
+            response = await self._model.generate_content_async(
+                prompt, stream=True, request_options={'timeout': settings.GEMINI_TIMEOUT},
+            )
+            chunks = aiter(response)
+            while True:
+                # The request timeout does not cover a stream that stalls midway
+                try:
+                    chunk = await asyncio.wait_for(anext(chunks), settings.GEMINI_TIMEOUT)
+                except StopAsyncIteration:
+                    break
+                usage = getattr(chunk, 'usage_metadata', None) or usage
+                if chunk.text:
+                    yield LLMResponse(chunk.text, None)
+        except Exception as exc:
+            raise LLMError(str(exc) or type(exc).__name__) from exc
+        yield LLMResponse('', getattr(usage, 'total_token_count', None))
+
+
+class OfflineClient:
+    """Answer with the retrieved context verbatim; needs no API key
+
+    Useful for local development and tests. It reports the prompt's word
+    count as token usage.
+    """
+
+    name = 'offline'
+
+    def generate(self, prompt):
+        context = prompt.split(CONTEXT_HEADER, 1)[-1].split(QUESTION_HEADER, 1)[0].strip()
+        text = context or "Sorry, I could not find information about that yet."
+        return LLMResponse(text, len(prompt.split()))
+
+    async def stream(self, prompt):
+        response = self.generate(prompt)
+        for word in response.text.split(' '):
+            yield LLMResponse(word + ' ', None)
+            await asyncio.sleep(0)
+        yield LLMResponse('', response.tokens_used)
+
+
+@lru_cache(maxsize=None)
+def _load_client(path):
+    return import_string(path)()
+
+
+def get_llm_client():
+    """Return the configured LLM client instance (one per process)"""
+    return _load_client(settings.CHATBOT_LLM_CLIENT)
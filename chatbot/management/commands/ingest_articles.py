@@ -0,0 +1,89 @@
+import json
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from chatbot.chunking import build_chunks
+from chatbot.models import ArticleChunk, KnowledgeArticle, tag_index
+from chatbot.search import index_manager
+from chatbot.vectors import vector_index
+
+
+ARTICLE_FIELDS = ('title', 'content', 'summary', 'category', 'language', 'tags', 'source')
+
+
+class Command(BaseCommand):
+    help = "Stream knowledge articles from a JSONL file into the database in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSONL file with one article object per line")
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Articles inserted per transaction (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive")
+
+        started = time.perf_counter()
+        created = chunk_count = skipped = 0
+        batch = []
+        try:
+            fh = open(options['path'], encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+
+        with fh:
+            for line_no, line in enumerate(fh, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    batch.append(self.build_article(json.loads(line)))
+                except (ValueError, TypeError, ValidationError) as exc:
+                    skipped += 1
+                    self.stderr.write(f"Line {line_no}: skipped ({exc})")
+                    continue
+                if len(batch) >= batch_size:
+                    chunk_count += self.flush(batch)
+                    created += len(batch)
+                    batch = []
+            if batch:
+                chunk_count += self.flush(batch)
+                created += len(batch)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {created} articles ({chunk_count} chunks) in {elapsed:.2f}s, "
+            f"skipped {skipped}"
+        ))
+
+    def build_article(self, data):
+        if not isinstance(data, dict):
+            raise ValueError("expected a JSON object")
+        values = {field: data.get(field) for field in ARTICLE_FIELDS if data.get(field) is not None}
+        if isinstance(values.get('tags'), list):
+            values['tags'] = ', '.join(values['tags'])
+        article = KnowledgeArticle(**values)
+        article.full_clean(validate_unique=False, validate_constraints=False)
+        # bulk_create skips save(), which records this
+        article.index_hash = article.index_signature()
+        return article
+
+    def flush(self, batch):
+        """Insert one batch of articles with their chunks and index them"""
+        with transaction.atomic():
+            articles = KnowledgeArticle.objects.bulk_create(batch)
+            tag_index.sync(articles)
+            chunks = ArticleChunk.objects.bulk_create(
+                [chunk for article in articles if article.is_active for chunk in build_chunks(article)]
+            )
+        index_manager.update_chunks(chunks=chunks)
+        vector_index.update_chunks(chunks=chunks)
+        return len(chunks)
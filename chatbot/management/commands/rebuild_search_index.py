@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from chatbot.chunking import build_chunks
+from chatbot.models import ArticleChunk, KnowledgeArticle
+from chatbot.search import index_manager
+from chatbot.vectors import vector_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the BM25 and vector knowledge base indexes from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--language',
+            action='append',
+            help="Language code to rebuild (repeatable, defaults to all)",
+        )
+        parser.add_argument(
+            '--rechunk',
+            action='store_true',
+            help="Regenerate article chunks before indexing",
+        )
+        parser.add_argument(
+            '--skip-vectors',
+            action='store_true',
+            help="Only rebuild the keyword index",
+        )
+
+    def handle(self, *args, **options):
+        languages = options['language'] or index_manager.languages()
+        if options['rechunk']:
+            self.rechunk(languages)
+        for language in languages:
+            started = time.perf_counter()
+            index = index_manager.rebuild(language)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"Indexed {len(index)} {language} chunks "
+                f"({len(index.postings)} terms) in {elapsed:.2f}s"
+            ))
+
+            if options['skip_vectors']:
+                continue
+            started = time.perf_counter()
+            store = vector_index.rebuild(language)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"Embedded {len(store)} {language} chunks "
+                f"({store.dim} dims) in {elapsed:.2f}s"
+            ))
+
+    def rechunk(self, languages, batch_size=500):
+        """Replace the chunks of each batch of articles in one transaction
+
+        Retrieval keeps serving the old chunks of articles not reached yet,
+        and a failure leaves every article with a complete set of chunks.
+        """
+        started = time.perf_counter()
+        articles = KnowledgeArticle.objects.filter(language__in=languages).order_by('pk')
+
+        total = 0
+        batch = []
+        for article in articles.iterator(chunk_size=batch_size):
+            batch.append(article)
+            if len(batch) >= batch_size:
+                total += self.replace_chunks(batch)
+                batch = []
+        if batch:
+            total += self.replace_chunks(batch)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Created {total} chunks in {elapsed:.2f}s"))
+
+    def replace_chunks(self, articles):
+        with transaction.atomic():
+            ArticleChunk.objects.filter(article__in=[article.pk for article in articles]).delete()
+            chunks = ArticleChunk.objects.bulk_create(
+                [chunk for article in articles if article.is_active for chunk in build_chunks(article)]
+            )
+        return len(chunks)
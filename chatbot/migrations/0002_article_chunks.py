@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(choices=[('en', 'English'), ('ml', 'Malayalam')], help_text='Copied from the article so chunks can be indexed per language', max_length=5)),
+                ('position', models.PositiveIntegerField(help_text='Order of the chunk within its article')),
+                ('content', models.TextField(help_text='Passage text')),
+                ('token_count', models.PositiveIntegerField(help_text='Precomputed token count of the passage')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='chatbot.knowledgearticle')),
+            ],
+            options={
+                'verbose_name': 'Article Chunk',
+                'verbose_name_plural': 'Article Chunks',
+                'ordering': ['article', 'position'],
+                'indexes': [models.Index(fields=['language'], name='chatbot_art_languag_644f50_idx')],
+                'constraints': [models.UniqueConstraint(fields=('article', 'position'), name='unique_article_chunk_position')],
+            },
+        ),
+    ]
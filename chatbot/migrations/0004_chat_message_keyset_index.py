@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0003_chat_message_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='chatmessage',
+            options={'ordering': ['timestamp', 'id'], 'verbose_name': 'Chat Message', 'verbose_name_plural': 'Chat Messages'},
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'timestamp', 'id'], name='chat_msg_session_keyset'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+def backfill_token_counts(apps, schema_editor):
+    from chatbot.chunking import count_tokens
+
+    ChatMessage = apps.get_model('chatbot', 'ChatMessage')
+    batch = []
+    for message in ChatMessage.objects.only('id', 'content').iterator(chunk_size=2000):
+        message.token_count = count_tokens(message.content)
+        batch.append(message)
+        if len(batch) == 2000:
+            ChatMessage.objects.bulk_update(batch, ['token_count'])
+            batch = []
+    if batch:
+        ChatMessage.objects.bulk_update(batch, ['token_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0004_chat_message_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='token_count',
+            field=models.PositiveIntegerField(default=0, help_text='Precomputed token count of the content'),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='summarized_until',
+            field=models.DateTimeField(blank=True, help_text='Timestamp of the last message folded into the summary', null=True),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary',
+            field=models.TextField(blank=True, default='', help_text='Running summary of the turns folded out of the prompt window'),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary_token_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_token_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0005_conversation_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Lowercase tag', max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArticleTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='chatbot.knowledgearticle')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='article_links', to='chatbot.tag')),
+            ],
+            options={
+                'verbose_name': 'Article Tag',
+                'verbose_name_plural': 'Article Tags',
+            },
+        ),
+        migrations.AddField(
+            model_name='knowledgearticle',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, help_text='Normalised tags, synced from tags on save', related_name='articles', through='chatbot.ArticleTag', to='chatbot.tag'),
+        ),
+        migrations.AddConstraint(
+            model_name='articletag',
+            constraint=models.UniqueConstraint(fields=('tag', 'article'), name='article_tag_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0006_tag_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='knowledgearticle',
+            name='index_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Digest of the fields its chunks and search entries are built from', max_length=64),
+        ),
+    ]
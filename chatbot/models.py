@@ -1,5 +1,11 @@
+import hashlib
+import json
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from core.terms import TermIndex
 # For PostgreSQL-specific features (commented for SQLite development)
 # from django.contrib.postgres.search import SearchVectorField
 # from django.contrib.postgres.indexes import GinIndex
@@ -57,6 +63,13 @@ class KnowledgeArticle(models.Model):
         null=True,
         help_text="Comma-separated tags for better searchability"
     )
+    tag_set = models.ManyToManyField(
+        'Tag',
+        through='ArticleTag',
+        related_name='articles',
+        blank=True,
+        help_text="Normalised tags, synced from tags on save"
+    )
     source = models.CharField(
         max_length=200, 
         blank=True, 
@@ -67,6 +80,12 @@ class KnowledgeArticle(models.Model):
         default=True,
         help_text="Whether this article should be included in searches"
     )
+    index_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        help_text="Digest of the fields its chunks and search entries are built from"
+    )
     # search_vector = SearchVectorField(null=True, blank=True)  # PostgreSQL-specific
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -74,6 +93,22 @@ class KnowledgeArticle(models.Model):
     def __str__(self):
         return f"{self.title} ({self.language})"
     
+    def index_signature(self):
+        """Digest of every field that chunking and indexing read"""
+        fields = (self.title, self.content, self.summary, self.tags, self.language, self.is_active)
+        return hashlib.sha256(json.dumps(fields).encode('utf-8')).hexdigest()
+    
+    def save(self, *args, **kwargs):
+        # Saves that leave the indexed fields alone skip re-chunking (chatbot.signals)
+        signature = self.index_signature()
+        self.index_changed = signature != self.index_hash
+        if self.index_changed:
+            self.index_hash = signature
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'index_hash'}
+        super().save(*args, **kwargs)
+    
     class Meta:
         verbose_name = "Knowledge Article"
         verbose_name_plural = "Knowledge Articles"
@@ -84,6 +119,81 @@ class KnowledgeArticle(models.Model):
         ]
 
 
+class Tag(models.Model):
+    """A normalised article tag"""
+    
+    name = models.CharField(max_length=100, unique=True, help_text="Lowercase tag")
+    
+    def __str__(self):
+        return self.name
+    
+    class Meta:
+        verbose_name = "Tag"
+        verbose_name_plural = "Tags"
+        ordering = ['name']
+
+
+class ArticleTag(models.Model):
+    """Links an article to one of its tags"""
+    
+    article = models.ForeignKey(KnowledgeArticle, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='article_links')
+    
+    def __str__(self):
+        return f"{self.article_id} tagged {self.tag_id}"
+    
+    class Meta:
+        verbose_name = "Article Tag"
+        verbose_name_plural = "Article Tags"
+        constraints = [
+            # Leading tag column serves "articles tagged X" lookups
+            models.UniqueConstraint(fields=['tag', 'article'], name='article_tag_unique'),
+        ]
+
+
+tag_index = TermIndex(Tag, ArticleTag, 'article', 'tag', 'tags', 'tag_set')
+
+
+class ArticleChunk(models.Model):
+    """Overlapping passage of a knowledge article, the unit of retrieval"""
+    
+    article = models.ForeignKey(
+        KnowledgeArticle, 
+        on_delete=models.CASCADE, 
+        related_name='chunks'
+    )
+    language = models.CharField(
+        max_length=5, 
+        choices=KnowledgeArticle.LANGUAGE_CHOICES,
+        help_text="Copied from the article so chunks can be indexed per language"
+    )
+    position = models.PositiveIntegerField(
+        help_text="Order of the chunk within its article"
+    )
+    content = models.TextField(help_text="Passage text")
+    token_count = models.PositiveIntegerField(
+        help_text="Precomputed token count of the passage"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Chunk {self.position} of article {self.article_id}"
+    
+    class Meta:
+        verbose_name = "Article Chunk"
+        verbose_name_plural = "Article Chunks"
+        ordering = ['article', 'position']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['article', 'position'], 
+                name='unique_article_chunk_position'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['language']),
+        ]
+
+
 class ChatSession(models.Model):
     """Chat sessions to track user conversations"""
     
@@ -97,6 +207,17 @@ class ChatSession(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     last_activity = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    summary = models.TextField(
+        blank=True, 
+        default='',
+        help_text="Running summary of the turns folded out of the prompt window"
+    )
+    summary_token_count = models.PositiveIntegerField(default=0)
+    summarized_until = models.DateTimeField(
+        null=True, 
+        blank=True,
+        help_text="Timestamp of the last message folded into the summary"
+    )
     
     def __str__(self):
         return f"{self.user.username} - Session {self.session_id}"
@@ -126,12 +247,17 @@ class ChatMessage(models.Model):
         choices=MESSAGE_TYPES
     )
     content = models.TextField(help_text="Message content")
+    token_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Precomputed token count of the content"
+    )
     context_articles = models.ManyToManyField(
         KnowledgeArticle, 
         blank=True,
         help_text="Knowledge articles used as context for this response"
     )
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the message is built, not when a buffered write reaches the DB
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     
     def __str__(self):
         return f"{self.session.user.username} - {self.message_type} at {self.timestamp}"
@@ -139,4 +265,8 @@ class ChatMessage(models.Model):
     class Meta:
         verbose_name = "Chat Message"
         verbose_name_plural = "Chat Messages"
-        ordering = ['timestamp']
+        ordering = ['timestamp', 'id']
+        indexes = [
+            # Backs keyset pagination of a session's history
+            models.Index(fields=['session', 'timestamp', 'id'], name='chat_msg_session_keyset'),
+        ]
@@ -0,0 +1,190 @@
+"""
+Write-behind persistence of chat turns.
+
+Every turn produces a user ``ChatMessage``, a bot ``ChatMessage``, its
+``context_articles`` rows and a ``ChatSession.last_activity`` bump. With
+``settings.CHATBOT_WRITE_MODE = 'buffered'`` these are queued in process
+and written together: one ``bulk_create`` for the messages, one for the
+M2M through rows and a single ``UPDATE`` for session activity. A flush
+happens when ``CHATBOT_WRITE_BUFFER_SIZE`` turns are pending, every
+``CHATBOT_WRITE_FLUSH_INTERVAL`` seconds from a background thread, and at
+interpreter exit. ``last_activity`` is written at most once per
+``CHATBOT_ACTIVITY_DEBOUNCE`` seconds per session.
+
+A batch that violates a constraint (typically a session deleted while its
+turns were queued) is retried turn by turn and the turns that still cannot
+be saved are dropped and logged, so one bad turn never blocks the rest.
+If the database is unavailable the turns are requeued, keeping at most
+``CHATBOT_WRITE_BUFFER_LIMIT``; failures of a buffered flush are logged
+and never reach the request.
+
+``'sync'`` mode writes each turn immediately through the same bulk path,
+for deployments that cannot afford to lose the last second of chats.
+"""
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+from core.buffers import WriteBehindBuffer
+
+from .chunking import count_tokens
+from .models import ChatMessage, ChatSession, KnowledgeArticle
+
+
+logger = logging.getLogger('krishi_sakhi')
+
+
+class ChatWriteBuffer(WriteBehindBuffer):
+    """Coalesces chat turn writes and flushes them in bulk"""
+
+    thread_name = 'chat-write-behind'
+    item_name = 'chat turns'
+
+    def _reset(self):
+        super()._reset()
+        self._activity = {}        # session pk -> latest activity not yet written
+        self._activity_written = {}  # session pk -> when activity was last written
+
+    @property
+    def limit(self):
+        return settings.CHATBOT_WRITE_BUFFER_LIMIT
+
+    @property
+    def flush_interval(self):
+        return settings.CHATBOT_WRITE_FLUSH_INTERVAL
+
+    @property
+    def buffered(self):
+        return settings.CHATBOT_WRITE_MODE == 'buffered'
+
+    def add_turn(self, session, question, answer, article_ids=()):
+        """Queue both messages of a chat turn"""
+        user_message = ChatMessage(
+            session=session, message_type='user', content=question, token_count=count_tokens(question)
+        )
+        bot_message = ChatMessage(
+            session=session, message_type='bot', content=answer, token_count=count_tokens(answer)
+        )
+        with self._lock:
+            pending = self._push((user_message, bot_message, list(article_ids)))
+            self._activity[session.pk] = bot_message.timestamp
+
+        if not self.buffered:
+            self.flush(force=True)
+            return
+        if pending >= settings.CHATBOT_WRITE_BUFFER_SIZE:
+            try:
+                self.flush()
+            except Exception:
+                pass  # Already logged; the turns stay queued for the background thread
+        self._ensure_thread()
+
+    def pending_messages(self, session_pk):
+        """Unflushed messages of a session, oldest first"""
+        with self._lock:
+            return [message for user_message, bot_message, _ in self._queue
+                    if user_message.session_id == session_pk
+                    for message in (user_message, bot_message)]
+
+    def flush(self, force=False):
+        """Write pending turns; ``force`` also writes debounced activity"""
+        with self._flush_lock:
+            with self._lock:
+                turns, dropped = self._take()
+                activity = self._due_activity(force)
+            self._report_dropped(dropped)
+            if not turns and not activity:
+                return 0
+            try:
+                self._write(turns, activity)
+            except IntegrityError:
+                forget_pks(turns)
+                self._write_each(turns, activity)
+            except Exception:
+                logger.exception("Chat write-behind flush failed; requeueing %d turns", len(turns))
+                forget_pks(turns)
+                with self._lock:
+                    self._requeue(turns)
+                    for pk, timestamp in activity.items():
+                        self._activity.setdefault(pk, timestamp)
+                raise
+            now = timezone.now()
+            with self._lock:
+                for pk in activity:
+                    self._activity_written[pk] = now
+            return len(turns)
+
+    def _due_activity(self, force):
+        """Pop the activity updates whose debounce window has passed"""
+        now = timezone.now()
+        debounce = settings.CHATBOT_ACTIVITY_DEBOUNCE
+        due = {}
+        for pk, timestamp in list(self._activity.items()):
+            written = self._activity_written.get(pk)
+            if force or written is None or (now - written).total_seconds() >= debounce:
+                due[pk] = self._activity.pop(pk)
+        return due
+
+    def _write_each(self, turns, activity):
+        """Write turns one at a time, dropping those that cannot be saved"""
+        session_ids = set(ChatSession.objects.filter(
+            pk__in={user_message.session_id for user_message, _, _ in turns}
+        ).values_list('pk', flat=True))
+        article_ids = set(KnowledgeArticle.objects.filter(
+            pk__in={article_id for _, _, ids in turns for article_id in ids}
+        ).values_list('pk', flat=True))
+        dropped = []
+        for user_message, bot_message, ids in turns:
+            if user_message.session_id not in session_ids:
+                dropped.append(user_message.session_id)
+                continue
+            # Links to articles deleted since are dropped, the messages kept
+            turn = (user_message, bot_message, [article_id for article_id in ids if article_id in article_ids])
+            try:
+                self._write([turn], {})
+            except IntegrityError:
+                forget_pks([turn])
+                dropped.append(user_message.session_id)
+        if dropped:
+            logger.error(
+                "Dropped %d chat turns that could not be saved (sessions %s)",
+                len(dropped), sorted(set(dropped)),
+            )
+        self._write([], {pk: timestamp for pk, timestamp in activity.items() if pk in session_ids})
+
+    def _write(self, turns, activity):
+        Through = ChatMessage.context_articles.through
+        with transaction.atomic():
+            messages = [message for user_message, bot_message, _ in turns
+                        for message in (user_message, bot_message)]
+            ChatMessage.objects.bulk_create(messages)
+            links = [
+                Through(chatmessage_id=bot_message.pk, knowledgearticle_id=article_id)
+                for _, bot_message, article_ids in turns
+                for article_id in article_ids
+            ]
+            if links:
+                Through.objects.bulk_create(links, ignore_conflicts=True)
+            if activity:
+                ChatSession.objects.filter(pk__in=activity).update(last_activity=Case(
+                    *[When(pk=pk, then=Value(timestamp)) for pk, timestamp in activity.items()],
+                    output_field=DateTimeField(),
+                ))
+
+    def _final_flush(self):
+        # Shutdown also writes the debounced activity
+        self.flush(force=True)
+
+
+def forget_pks(turns):
+    """Reset messages whose insert was rolled back so they can be inserted again"""
+    for user_message, bot_message, _ in turns:
+        for message in (user_message, bot_message):
+            message.pk = None
+            message._state.adding = True
+
+
+chat_writer = ChatWriteBuffer()
@@ -0,0 +1,65 @@
+"""
+Hybrid retrieval of article chunks combining BM25 with dense vectors.
+
+Both rankings are merged with reciprocal rank fusion, which needs no score
+calibration between the two engines. The fused chunks are then trimmed to
+the prompt token budget using their precomputed token counts.
+"""
+from django.conf import settings
+
+from .models import ArticleChunk
+from .search import search_chunks
+from .vectors import semantic_search
+
+
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(*rankings, k=None):
+    """Fuse ``(doc_id, score)`` rankings into one, best first"""
+    fused = {}
+    for ranking in rankings:
+        for rank, (doc_id, _) in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    return ranked[:k] if k is not None else ranked
+
+
+def retrieve(question, language='en', k=None):
+    """Return the ``(chunk_id, score)`` pairs used as chatbot context"""
+    if k is None:
+        k = settings.CHATBOT_SEARCH_TOP_K
+    depth = k * settings.CHATBOT_RETRIEVAL_DEPTH
+    keyword_hits = search_chunks(question, language, depth)
+    semantic_hits = [
+        (doc_id, score)
+        for doc_id, score in semantic_search(question, language, depth)
+        if score >= settings.CHATBOT_SEMANTIC_MIN_SCORE
+    ]
+    return reciprocal_rank_fusion(keyword_hits, semantic_hits, k=k)
+
+
+def retrieve_chunks(question, language='en', k=None, token_budget=None):
+    """Return ranked ``ArticleChunk`` objects that fit the token budget
+
+    Each chunk gets a ``score`` attribute with its fused retrieval score.
+    """
+    if token_budget is None:
+        token_budget = settings.CHATBOT_CONTEXT_TOKENS
+    hits = retrieve(question, language, k)
+    chunks = (
+        ArticleChunk.objects
+        .select_related('article')
+        .only('id', 'position', 'content', 'token_count', 'article__id', 'article__title')
+        .in_bulk([chunk_id for chunk_id, _ in hits])
+    )
+
+    selected, used = [], 0
+    for chunk_id, score in hits:
+        chunk = chunks.get(chunk_id)
+        if chunk is None or used + chunk.token_count > token_budget:
+            continue
+        chunk.score = score
+        selected.append(chunk)
+        used += chunk.token_count
+    return selected
@@ -0,0 +1,354 @@
+"""
+BM25 keyword search over knowledge article chunks.
+
+Each language gets its own in-process inverted index of ``ArticleChunk``
+rows, kept current by the ``post_save``/``post_delete`` receivers in
+``chatbot.signals`` so the request path only touches in-memory postings.
+
+Under ``settings.CHATBOT_INDEX_DIR`` each language has a pickled snapshot
+and an append-only log of the chunk changes made since. Writers take an
+exclusive ``flock``, replay records other processes appended, apply their
+own change and append it, so a save costs one small record rather than a
+rewrite of the whole index, and concurrent writers never lose each other's
+updates. Once the log outgrows the snapshot it is folded into a new one.
+Readers notice changes by the file sizes and replay only the new records.
+"""
+import heapq
+import math
+import os
+import pickle
+import re
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from operator import itemgetter
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+
+# A log longer than this and than the snapshot is folded into a new snapshot
+LOG_COMPACT_BYTES = 1 << 20
+
+TOKEN_RE = re.compile(r'[\wഀ-ൿ]+')
+
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'for',
+    'from', 'how', 'i', 'in', 'is', 'it', 'my', 'of', 'on', 'or', 'should',
+    'the', 'this', 'to', 'what', 'when', 'which', 'with',
+])
+
+# Article fields are weighted by repeating their tokens, a cheap BM25F
+# approximation; every chunk carries its article's title and tags
+ARTICLE_FIELD_WEIGHTS = (
+    ('title', 3),
+    ('tags', 2),
+)
+
+
+def tokenize(text):
+    """Lowercase and split text into index terms"""
+    if not text:
+        return []
+    return [
+        token for token in TOKEN_RE.findall(text.lower())
+        if token not in STOPWORDS and token != '_'
+    ]
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def chunk_tokens(chunk):
+    """Return the weighted token stream for an article chunk"""
+    article = chunk.article
+    tokens = []
+    for field, weight in ARTICLE_FIELD_WEIGHTS:
+        tokens.extend(tokenize(getattr(article, field)) * weight)
+    if chunk.position == 0:
+        tokens.extend(tokenize(article.summary))
+    tokens.extend(tokenize(chunk.content))
+    return tokens
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring"""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}      # term -> {doc_id: term frequency}
+        self.doc_terms = {}     # doc_id -> terms, so removal never scans postings
+        self.doc_lengths = {}   # doc_id -> number of tokens
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_lengths
+
+    def add(self, doc_id, tokens):
+        """Index a document, replacing any previous version of it"""
+        self.remove(doc_id)
+        if not tokens:
+            return
+        counts = Counter(tokens)
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        self.doc_terms[doc_id] = tuple(counts)
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id):
+        """Drop a document from the index; unknown ids are ignored"""
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def search(self, query_tokens, k=10):
+        """Return up to ``k`` ``(doc_id, score)`` pairs, best first"""
+        n_docs = len(self.doc_lengths)
+        if not n_docs or not query_tokens:
+            return []
+
+        avg_length = self.total_length / n_docs
+        k1, b = self.k1, self.b
+        scores = {}
+        for term in set(query_tokens):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in postings.items():
+                norm = k1 * (1 - b + b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=itemgetter(1))
+
+
+class IndexManager:
+    """Owns the per-language indexes of this process and their files"""
+
+    def __init__(self):
+        self._indexes = {}
+        self._positions = {}    # language -> (snapshot signature, log offset read)
+        self._lock = threading.RLock()
+
+    # Persistence
+
+    def _paths(self, language):
+        directory = Path(settings.CHATBOT_INDEX_DIR)
+        return directory / f'bm25_{language}.pkl', directory / f'bm25_{language}.log'
+
+    @contextmanager
+    def _file_lock(self, language, exclusive):
+        directory = Path(settings.CHATBOT_INDEX_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / f'bm25_{language}.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _is_current(self, language):
+        position = self._positions.get(language)
+        if position is None:
+            return False
+        snapshot_path, log_path = self._paths(language)
+        log = file_signature(log_path)
+        return position == (file_signature(snapshot_path), log[2] if log else 0)
+
+    def _load_snapshot(self, path):
+        try:
+            with open(path, 'rb') as fh:
+                return pickle.load(fh)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _replay(self, index, log_path, offset, repair):
+        """Apply log records from ``offset``; returns the offset reached"""
+        try:
+            fh = open(log_path, 'rb')
+        except FileNotFoundError:
+            return 0
+        with fh:
+            fh.seek(offset)
+            while True:
+                try:
+                    removed_ids, added = pickle.load(fh)
+                except (EOFError, pickle.UnpicklingError):
+                    break
+                for doc_id in removed_ids:
+                    index.remove(doc_id)
+                for doc_id, tokens in added:
+                    index.add(doc_id, tokens)
+                offset = fh.tell()
+            if repair and os.fstat(fh.fileno()).st_size > offset:
+                # A writer died halfway through a record; later appends must stay readable
+                os.truncate(log_path, offset)
+        return offset
+
+    def _catch_up(self, language, repair=False):
+        """Bring this process's index level with the files; ``None`` if there is no snapshot
+
+        Must be called holding the file lock (exclusive when ``repair``).
+        """
+        snapshot_path, log_path = self._paths(language)
+        snapshot = file_signature(snapshot_path)
+        index = self._indexes.get(language)
+        position = self._positions.get(language)
+        if index is None or position is None or position[0] != snapshot:
+            index = self._load_snapshot(snapshot_path)
+            if index is None:
+                return None
+            offset = 0
+        else:
+            offset = position[1]
+        self._indexes[language] = index
+        self._positions[language] = (snapshot, self._replay(index, log_path, offset, repair))
+        return index
+
+    def _save_snapshot(self, language, index):
+        """Write ``index`` as the new snapshot and empty the log it absorbs"""
+        snapshot_path, log_path = self._paths(language)
+        fd, tmp_path = tempfile.mkstemp(dir=snapshot_path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            pickle.dump(index, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+        # Replaying the old log over the new snapshot is harmless if we stop here
+        open(log_path, 'wb').close()
+        self._indexes[language] = index
+        self._positions[language] = (file_signature(snapshot_path), 0)
+
+    def _append(self, language, index, removed_ids, added):
+        """Log a change already applied to ``index``, compacting a long log"""
+        snapshot_path, log_path = self._paths(language)
+        with open(log_path, 'ab') as fh:
+            pickle.dump((removed_ids, added), fh, protocol=pickle.HIGHEST_PROTOCOL)
+            offset = fh.tell()
+        snapshot = self._positions[language][0]
+        if offset > max(snapshot[2] if snapshot else 0, LOG_COMPACT_BYTES):
+            self._save_snapshot(language, index)
+        else:
+            self._positions[language] = (snapshot, offset)
+
+    def _load(self, language):
+        """Current index of ``language``, building it if there is no snapshot
+
+        Must be called holding the exclusive file lock.
+        """
+        index = self._catch_up(language, repair=True)
+        if index is None:
+            index = self._build(language)
+            self._save_snapshot(language, index)
+        return index
+
+    # Access
+
+    def get(self, language):
+        """Return the current index for ``language``, catching up if stale"""
+        index = self._indexes.get(language)
+        if index is not None and self._is_current(language):
+            return index
+        with self._lock:
+            with self._file_lock(language, exclusive=False):
+                index = self._catch_up(language)
+            if index is None:
+                with self._file_lock(language, exclusive=True):
+                    index = self._load(language)
+            return index
+
+    def _build(self, language):
+        from .models import ArticleChunk
+
+        index = BM25Index()
+        chunks = (
+            ArticleChunk.objects
+            .filter(language=language, article__is_active=True)
+            .select_related('article')
+            .only('id', 'position', 'content', 'article__title', 'article__tags', 'article__summary')
+        )
+        for chunk in chunks.iterator(chunk_size=2000):
+            index.add(chunk.id, chunk_tokens(chunk))
+        return index
+
+    def rebuild(self, language):
+        """Rebuild ``language`` from the database and publish it"""
+        with self._lock, self._file_lock(language, exclusive=True):
+            index = self._build(language)
+            self._save_snapshot(language, index)
+            return index
+
+    # Incremental updates
+
+    def update_chunks(self, removed_ids=(), chunks=()):
+        """Drop ``removed_ids``, (re)index ``chunks`` and log the change
+
+        Each language is updated under its exclusive file lock after
+        replaying what other processes logged, so concurrent writers never
+        overwrite each other's changes.
+        """
+        added = {}
+        for chunk in chunks:
+            added.setdefault(chunk.language, []).append((chunk.id, chunk_tokens(chunk)))
+        languages = set(added) | (set(self.languages()) if removed_ids else set())
+        touched = set()
+        with self._lock:
+            for language in languages:
+                with self._file_lock(language, exclusive=True):
+                    index = self._load(language)
+                    removed = [doc_id for doc_id in removed_ids if doc_id in index]
+                    language_added = added.get(language, [])
+                    if not removed and not language_added:
+                        continue
+                    for doc_id in removed:
+                        index.remove(doc_id)
+                    for doc_id, tokens in language_added:
+                        index.add(doc_id, tokens)
+                    self._append(language, index, removed, language_added)
+                    touched.add(language)
+        return touched
+
+    def languages(self):
+        from .models import KnowledgeArticle
+
+        return [code for code, _ in KnowledgeArticle.LANGUAGE_CHOICES]
+
+    def clear(self):
+        """Forget all in-process indexes (used by tests)"""
+        with self._lock:
+            self._indexes.clear()
+            self._positions.clear()
+
+
+index_manager = IndexManager()
+
+
+def search_chunks(query, language='en', k=None):
+    """Return ``(chunk_id, score)`` pairs for ``query``, best first"""
+    if k is None:
+        k = settings.CHATBOT_SEARCH_TOP_K
+    return index_manager.get(language).search(tokenize(query), k)
@@ -0,0 +1,37 @@
+from rest_framework import serializers
+
+from .models import ChatMessage, ChatSession, KnowledgeArticle
+
+
+class ChatbotQuerySerializer(serializers.Serializer):
+    """Validate an incoming chatbot question"""
+
+    question = serializers.CharField(max_length=1000, trim_whitespace=True)
+    language = serializers.ChoiceField(
+        choices=KnowledgeArticle.LANGUAGE_CHOICES,
+        required=False,
+    )
+    session_id = serializers.CharField(max_length=100, required=False)
+
+
+class ArticleReferenceSerializer(serializers.ModelSerializer):
+    """Compact article reference, without the article body"""
+
+    class Meta:
+        model = KnowledgeArticle
+        fields = ['id', 'title', 'category']
+
+
+class ChatMessageSerializer(serializers.ModelSerializer):
+    context_articles = ArticleReferenceSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ChatMessage
+        fields = ['id', 'message_type', 'content', 'timestamp', 'context_articles']
+
+
+class ChatSessionSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ChatSession
+        fields = ['session_id', 'language', 'started_at', 'last_activity', 'is_active']
@@ -0,0 +1,140 @@
+"""
+RAG chatbot service: retrieve context, generate an answer, record the turn.
+"""
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+
+from core.usage import log_api_usage
+
+from .answer_cache import answer_cache
+from .chunking import count_tokens
+from .context import build_history, format_history
+from .llm import LLMError, build_prompt, get_llm_client
+from .models import ChatSession
+from .persistence import chat_writer
+from .retrieval import retrieve_chunks
+
+
+class ChatbotService:
+    """Process chatbot queries for a user"""
+
+    def __init__(self, user):
+        self.user = user
+
+    def get_session(self, session_id, language):
+        """Return the user's session, creating one when no id is given"""
+        if session_id:
+            return ChatSession.objects.get(session_id=session_id, user=self.user)
+        return ChatSession.objects.create(
+            user=self.user,
+            session_id=uuid.uuid4().hex,
+            language=language,
+        )
+
+    def prepare_context(self, chunks):
+        return '\n\n'.join(f"[{chunk.article.title}]\n{chunk.content}" for chunk in chunks)
+
+    def prepare(self, question, language='en', session_id=None):
+        """Resolve the session, retrieve context and look up the answer cache
+
+        Returns ``(session, chunks, cached_answer)``; ``cached_answer`` is
+        ``None`` when the LLM has to be called. The conversation history is
+        attached as ``session.history``. Cached answers are only used for
+        the first question of a session, since follow-ups depend on it.
+        """
+        session = self.get_session(session_id, language)
+        session.history = build_history(session)
+        chunks = retrieve_chunks(question, language)
+        cached = None
+        if self.is_opening(session):
+            cached = answer_cache.get(question, language, self.article_ids(chunks))
+        return session, chunks, cached['answer'] if cached is not None else None
+
+    def is_opening(self, session):
+        history = getattr(session, 'history', None)
+        return history is None or not (history.summary or history.messages)
+
+    def article_ids(self, chunks):
+        return sorted({chunk.article.id for chunk in chunks})
+
+    def log_generation(self, client, language, started, tokens_used=None, error=None):
+        log_api_usage(
+            'gemini', client.name, 500 if error else 200, (time.perf_counter() - started) * 1000,
+            user=self.user, request_data={'language': language},
+            tokens_used=tokens_used, error_message=error,
+        )
+
+    def build_prompt(self, question, language, chunks, history=None):
+        return build_prompt(
+            question, self.prepare_context(chunks), language,
+            history=format_history(history) if history is not None else '',
+        )
+
+    def generate_answer(self, question, language, chunks, history=None):
+        """Call the LLM and log the request in APIUsageLog"""
+        client = get_llm_client()
+        prompt = self.build_prompt(question, language, chunks, history)
+        started = time.perf_counter()
+        try:
+            response = client.generate(prompt)
+        except LLMError as exc:
+            self.log_generation(client, language, started, error=str(exc))
+            raise
+        self.log_generation(client, language, started, response.tokens_used)
+        return response.text
+
+    async def stream_answer(self, question, language, chunks, history=None):
+        """Yield answer text pieces as the LLM produces them"""
+        client = get_llm_client()
+        prompt = self.build_prompt(question, language, chunks, history)
+        started = time.perf_counter()
+        tokens_used = None
+        pieces = []
+        try:
+            async for piece in client.stream(prompt):
+                tokens_used = piece.tokens_used or tokens_used
+                if piece.text:
+                    pieces.append(piece.text)
+                    yield piece.text
+        except LLMError as exc:
+            await sync_to_async(self.log_generation)(client, language, started, error=str(exc))
+            raise
+        if tokens_used is None:
+            tokens_used = count_tokens(prompt) + count_tokens(''.join(pieces))
+        await sync_to_async(self.log_generation)(client, language, started, tokens_used)
+
+    def finish(self, session, question, language, answer, chunks, cached=False):
+        """Cache a fresh answer, record the turn and build the API payload"""
+        article_ids = self.article_ids(chunks)
+        if not cached and self.is_opening(session):
+            answer_cache.set(question, language, article_ids, {'answer': answer})
+        self.record_turn(session, question, answer, article_ids)
+        return {
+            'session_id': session.session_id,
+            'question': question,
+            'language': language,
+            'answer': answer,
+            'cached': cached,
+            'sources': [
+                {
+                    'chunk_id': chunk.id,
+                    'article_id': chunk.article.id,
+                    'title': chunk.article.title,
+                    'score': round(chunk.score, 4),
+                }
+                for chunk in chunks
+            ],
+        }
+
+    def process_query(self, question, language='en', session_id=None):
+        """Answer ``question`` and record both sides of the turn"""
+        session, chunks, answer = self.prepare(question, language, session_id)
+        cached = answer is not None
+        if not cached:
+            answer = self.generate_answer(question, language, chunks, session.history)
+        return self.finish(session, question, language, answer, chunks, cached)
+
+    def record_turn(self, session, question, answer, article_ids):
+        chat_writer.add_turn(session, question, answer, article_ids)
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .answer_cache import answer_cache
+from .chunking import rechunk_article
+from .models import KnowledgeArticle, tag_index
+from .search import index_manager
+from .vectors import vector_index
+
+
+def update_chunk_indexes(article_id, removed_ids, chunks):
+    """Apply a chunk change to both search indexes and the answer cache"""
+    index_manager.update_chunks(removed_ids, chunks)
+    vector_index.update_chunks(removed_ids, chunks)
+    answer_cache.invalidate_article(article_id)
+
+
+@receiver(post_save, sender=KnowledgeArticle)
+def chunk_knowledge_article(sender, instance, raw=False, **kwargs):
+    """Re-chunk the article and re-index its chunks once the write commits"""
+    if raw or not getattr(instance, 'index_changed', True):
+        return
+    stale_ids = list(instance.chunks.values_list('id', flat=True))
+    chunks = rechunk_article(instance)
+    transaction.on_commit(lambda: update_chunk_indexes(instance.id, stale_ids, chunks))
+
+
+@receiver(post_save, sender=KnowledgeArticle)
+def sync_article_tags(sender, instance, raw=False, **kwargs):
+    """Mirror the tags string into the tag links"""
+    if raw:
+        return
+    tag_index.sync([instance])
+
+
+@receiver(pre_delete, sender=KnowledgeArticle)
+def remember_article_chunks(sender, instance, **kwargs):
+    """Capture chunk ids before the cascade removes them"""
+    instance._stale_chunk_ids = list(instance.chunks.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=KnowledgeArticle)
+def unindex_knowledge_article(sender, instance, **kwargs):
+    """Drop deleted articles from the search indexes"""
+    article_id = instance.id
+    stale_ids = getattr(instance, '_stale_chunk_ids', [])
+    transaction.on_commit(lambda: update_chunk_indexes(article_id, stale_ids, []))
@@ -1,3 +1,746 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import APIUsageLog
+
+from .answer_cache import AnswerCache, normalize_question
+from .chunking import chunk_text, count_tokens
+from .context import build_history, format_history
+from .embeddings import HashingEmbedder
+from .llm import HISTORY_HEADER, GeminiClient, LLMError, LLMResponse, build_prompt
+from .models import ArticleChunk, ChatMessage, ChatSession, KnowledgeArticle, tag_index
+from .persistence import ChatWriteBuffer
+from .retrieval import retrieve, retrieve_chunks
+from .search import BM25Index, IndexManager, index_manager, search_chunks, tokenize
+from .vectors import VectorStore, semantic_search, vector_index
+
+
+class FakeStreamingClient:
+    """Streams a fixed answer piece by piece, or fails if told to"""
+
+    name = 'fake-stream'
+    pieces = ['Sow ', 'paddy ', 'in ', 'June.']
+    fail = False
+
+    def generate(self, prompt):
+        return LLMResponse(''.join(self.pieces), 42)
+
+    async def stream(self, prompt):
+        for piece in self.pieces:
+            if self.fail:
+                raise LLMError("model overloaded")
+            yield LLMResponse(piece, None)
+        yield LLMResponse('', 42)
+
+
+def parse_sse(body):
+    """Return ``(event, data)`` pairs from a server-sent event stream"""
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+class IndexDirMixin:
+    """Point the search index at a throwaway directory for each test"""
+
+    def setUp(self):
+        super().setUp()
+        self.index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.index_dir, ignore_errors=True)
+        override = override_settings(CHATBOT_INDEX_DIR=self.index_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        index_manager.clear()
+        vector_index.clear()
+        self.addCleanup(index_manager.clear)
+        self.addCleanup(vector_index.clear)
+
+    def create_article(self, **kwargs):
+        kwargs.setdefault('category', 'crop_cultivation')
+        with self.captureOnCommitCallbacks(execute=True):
+            return KnowledgeArticle.objects.create(**kwargs)
+
+
+class BM25IndexTests(TestCase):
+
+    def test_tokenize_keeps_malayalam_words_whole(self):
+        self.assertEqual(tokenize('നെല്ല് കൃഷി for Paddy'), ['നെല്ല്', 'കൃഷി', 'paddy'])
+
+    def test_ranks_documents_by_relevance(self):
+        index = BM25Index()
+        index.add(1, tokenize('paddy sowing season paddy nursery'))
+        index.add(2, tokenize('banana irrigation schedule'))
+        index.add(3, tokenize('pepper pest control and paddy'))
+
+        results = index.search(tokenize('when to sow paddy nursery'), k=2)
+
+        self.assertEqual([doc_id for doc_id, _ in results], [1, 3])
+
+    def test_remove_drops_postings(self):
+        index = BM25Index()
+        index.add(1, ['paddy'])
+        index.add(2, ['paddy', 'banana'])
+        index.remove(2)
+
+        self.assertEqual(len(index), 1)
+        self.assertNotIn('banana', index.postings)
+        self.assertEqual(index.total_length, 1)
+
+
+class SearchIndexSyncTests(IndexDirMixin, TestCase):
+
+    def test_signals_update_index_incrementally(self):
+        article = self.create_article(title='Paddy sowing', content='Sow paddy in June.')
+        chunk = article.chunks.get()
+        self.assertEqual(search_chunks('paddy', 'en')[0][0], chunk.id)
+
+        article.language = 'ml'
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save()
+        self.assertEqual(search_chunks('paddy', 'en'), [])
+        self.assertEqual(search_chunks('paddy', 'ml')[0][0], article.chunks.get().id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article.delete()
+        self.assertEqual(search_chunks('paddy', 'ml'), [])
+
+    def test_saves_that_keep_indexed_fields_keep_chunks(self):
+        article = self.create_article(title='Paddy sowing', content='Sow paddy in June.', source='KAU')
+        chunk_ids = list(article.chunks.values_list('id', flat=True))
+
+        article.source = 'Kerala Agricultural University'
+        with self.captureOnCommitCallbacks() as callbacks:
+            article.save()
+        self.assertEqual(callbacks, [])
+        self.assertEqual(list(article.chunks.values_list('id', flat=True)), chunk_ids)
+
+        article.content = 'Sow paddy in the first week of June.'
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save(update_fields=['content'])
+        self.assertNotEqual(list(article.chunks.values_list('id', flat=True)), chunk_ids)
+        self.assertEqual(KnowledgeArticle.objects.get(pk=article.pk).index_hash, article.index_signature())
+
+    def test_inactive_articles_are_not_searchable(self):
+        self.create_article(title='Banana wilt', content='Wilt', is_active=False)
+        self.assertEqual(search_chunks('banana', 'en'), [])
+
+    def test_other_process_reloads_snapshot(self):
+        article = self.create_article(title='Coconut mite', content='Mite control')
+        other = IndexManager()
+        self.assertEqual(other.get('en').search(['coconut'])[0][0], article.chunks.get().id)
+
+        self.create_article(title='Coconut yield', content='Yield tips')
+        self.assertEqual(len(other.get('en')), 2)
+
+    def test_concurrent_writers_keep_each_others_updates(self):
+        first, second = IndexManager(), IndexManager()
+        self.assertEqual((len(first.get('en')), len(second.get('en'))), (0, 0))
+        snapshot = os.stat(os.path.join(self.index_dir, 'bm25_en.pkl'))
+        with self.captureOnCommitCallbacks():
+            paddy = KnowledgeArticle.objects.create(title='Paddy', content='Sow paddy', category='crop_cultivation')
+            pepper = KnowledgeArticle.objects.create(title='Pepper', content='Pepper wilt', category='crop_cultivation')
+
+        first.update_chunks(chunks=paddy.chunks.select_related('article'))
+        second.update_chunks(chunks=pepper.chunks.select_related('article'))
+
+        for manager in (first, second, IndexManager()):
+            self.assertEqual(len(manager.get('en')), 2)
+        # Small changes are appended to the log, not rewritten into the snapshot
+        self.assertEqual(os.stat(os.path.join(self.index_dir, 'bm25_en.pkl')).st_ino, snapshot.st_ino)
+
+
+@override_settings(
+    CHATBOT_LLM_CLIENT='chatbot.llm.OfflineClient', CHATBOT_WRITE_MODE='sync', API_USAGE_LOG_MODE='sync'
+)
+class ChatbotQueryViewTests(IndexDirMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        caches['chatbot_answers'].clear()
+        self.user = User.objects.create_user('farmer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ask(self, question, **extra):
+        return self.client.post('/api/chatbot/query/', {'question': question, **extra})
+
+    def test_answers_from_ranked_chunks_and_records_turn(self):
+        paddy = self.create_article(title='Paddy sowing', content='Sow paddy after rains.')
+        self.create_article(title='Pepper wilt', content='Quick wilt in pepper.')
+
+        response = self.ask('When to sow paddy?')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['language'], 'en')
+        self.assertIn('Sow paddy after rains.', response.data['answer'])
+        self.assertFalse(response.data['cached'])
+        self.assertEqual([s['article_id'] for s in response.data['sources']], [paddy.id])
+
+        session = ChatSession.objects.get(session_id=response.data['session_id'])
+        bot_message = session.messages.get(message_type='bot')
+        self.assertEqual(list(bot_message.context_articles.all()), [paddy])
+        self.assertEqual(APIUsageLog.objects.filter(api_type='gemini').count(), 1)
+
+    def test_repeated_and_reworded_questions_hit_the_cache(self):
+        self.create_article(title='Paddy sowing', content='Sow paddy after rains.')
+
+        first = self.ask('When to sow paddy?')
+        again = self.ask('when to sow   PADDY')
+        reworded = self.ask('When should I sow paddy?')
+
+        self.assertTrue(again.data['cached'])
+        self.assertTrue(reworded.data['cached'])
+        self.assertEqual(APIUsageLog.objects.count(), 1)
+        self.assertEqual(ChatMessage.objects.count(), 6)
+
+    def test_follow_up_includes_history_and_skips_the_cache(self):
+        self.create_article(title='Paddy sowing', content='Sow paddy after rains.')
+
+        first = self.ask('When to sow paddy?')
+        follow_up = self.ask('When to sow paddy?', session_id=first.data['session_id'])
+
+        self.assertFalse(follow_up.data['cached'])
+        self.assertEqual(APIUsageLog.objects.count(), 2)
+        self.assertEqual(
+            list(ChatMessage.objects.values_list('token_count', flat=True)[:1]),
+            [count_tokens('When to sow paddy?')],
+        )
+
+    def test_article_change_invalidates_cached_answers(self):
+        article = self.create_article(title='Paddy sowing', content='Sow paddy after rains.')
+        self.ask('When to sow paddy?')
+
+        article.content = 'Sow paddy in the first week of June.'
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save()
+        response = self.ask('When to sow paddy?')
+
+        self.assertFalse(response.data['cached'])
+        self.assertIn('first week of June', response.data['answer'])
+
+    def test_unknown_session_is_not_found(self):
+        other = User.objects.create_user('other')
+        ChatSession.objects.create(user=other, session_id='theirs')
+
+        self.assertEqual(self.ask('paddy', session_id='theirs').status_code, 404)
+
+    def test_requires_question(self):
+        response = self.client.post('/api/chatbot/query/', {})
+        self.assertEqual(response.status_code, 400)
+
+
+class StalledModel:
+    """Stands in for the Gemini SDK model; times out or stalls mid-stream"""
+
+    def __init__(self):
+        self.request_options = []
+
+    def generate_content(self, prompt, request_options=None):
+        self.request_options.append(request_options)
+        raise TimeoutError("Deadline exceeded")
+
+    async def generate_content_async(self, prompt, stream=False, request_options=None):
+        self.request_options.append(request_options)
+        return self.chunks()
+
+    async def chunks(self):
+        yield type('Chunk', (), {'text': 'Sow ', 'usage_metadata': None})()
+        await asyncio.sleep(60)
+
+
+@override_settings(GEMINI_TIMEOUT=0.05)
+class GeminiClientTests(TestCase):
+
+    def setUp(self):
+        self.llm = GeminiClient.__new__(GeminiClient)
+        self.llm.name = 'gemini-test'
+        self.llm._model = StalledModel()
+
+    def test_timeout_becomes_llm_error(self):
+        with self.assertRaisesMessage(LLMError, "Deadline exceeded"):
+            self.llm.generate('When to sow paddy?')
+        self.assertEqual(self.llm._model.request_options, [{'timeout': 0.05}])
+
+    async def test_stalled_stream_becomes_llm_error(self):
+        pieces = []
+        with self.assertRaises(LLMError):
+            async for piece in self.llm.stream('When to sow paddy?'):
+                pieces.append(piece.text)
+        self.assertEqual(pieces, ['Sow '])
+
+
+@override_settings(
+    CHATBOT_LLM_CLIENT='chatbot.tests.FakeStreamingClient', CHATBOT_WRITE_MODE='sync', API_USAGE_LOG_MODE='sync'
+)
+class ChatbotQueryStreamViewTests(IndexDirMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        caches['chatbot_answers'].clear()
+        self.user = User.objects.create_user('farmer')
+        self.token = Token.objects.create(user=self.user)
+        self.create_article(title='Paddy sowing', content='Sow paddy after rains.')
+
+    async def stream(self, question, token=None):
+        response = await self.async_client.post(
+            '/api/chatbot/query/stream/',
+            {'question': question},
+            content_type='application/json',
+            headers={'Authorization': f'Token {token or self.token.key}'},
+        )
+        if not response.streaming:
+            return response, None
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        return response, parse_sse(body)
+
+    async def test_streams_tokens_then_saves_turn_once(self):
+        response, events = await self.stream('When to sow paddy?')
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(
+            [data['text'] for event, data in events if event == 'token'],
+            FakeStreamingClient.pieces,
+        )
+        event, done = events[-1]
+        self.assertEqual(event, 'done')
+        self.assertFalse(done['cached'])
+
+        messages = [m async for m in ChatMessage.objects.filter(
+            session__session_id=done['session_id']).order_by('id')]
+        self.assertEqual([m.message_type for m in messages], ['user', 'bot'])
+        self.assertEqual(messages[1].content, 'Sow paddy in June.')
+        log = await APIUsageLog.objects.aget()
+        self.assertEqual(log.tokens_used, 42)
+
+        _, events = await self.stream('when to sow paddy')
+        self.assertTrue(events[-1][1]['cached'])
+        self.assertEqual(events[0][1]['text'], 'Sow paddy in June.')
+
+    async def test_model_failure_emits_error_event_and_saves_nothing(self):
+        FakeStreamingClient.fail = True
+        self.addCleanup(setattr, FakeStreamingClient, 'fail', False)
+
+        _, events = await self.stream('When to sow paddy?')
+
+        self.assertEqual(events[-1][0], 'error')
+        self.assertFalse(await ChatMessage.objects.aexists())
+
+    async def test_rejects_invalid_token(self):
+        response, _ = await self.stream('paddy', token='bogus')
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(
+    CHATBOT_WRITE_MODE='buffered',
+    CHATBOT_WRITE_BUFFER_SIZE=3,
+    CHATBOT_WRITE_FLUSH_INTERVAL=3600,
+    CHATBOT_ACTIVITY_DEBOUNCE=30,
+)
+class ChatWriteBufferTests(TestCase):
+
+    def setUp(self):
+        self.buffer = ChatWriteBuffer()
+        self.addCleanup(self.buffer.close)
+        user = User.objects.create_user('farmer')
+        self.session = ChatSession.objects.create(user=user, session_id='s1')
+        self.article = KnowledgeArticle.objects.create(
+            title='Paddy', content='Sow paddy', category='crop_cultivation'
+        )
+
+    def test_turns_are_coalesced_until_the_size_threshold(self):
+        self.buffer.add_turn(self.session, 'q1', 'a1', [self.article.id])
+        self.buffer.add_turn(self.session, 'q2', 'a2')
+        self.assertFalse(ChatMessage.objects.exists())
+
+        # messages, M2M rows and session activity: one statement each
+        with self.assertNumQueries(5):
+            self.buffer.add_turn(self.session, 'q3', 'a3', [self.article.id])
+
+        self.assertEqual(
+            list(ChatMessage.objects.order_by('timestamp', 'id').values_list('content', flat=True)),
+            ['q1', 'a1', 'q2', 'a2', 'q3', 'a3'],
+        )
+        self.assertEqual(self.article.chatmessage_set.count(), 2)
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_last_activity_updates_are_debounced(self):
+        self.buffer.add_turn(self.session, 'q1', 'a1')
+        self.buffer.flush()
+        self.session.refresh_from_db()
+        first_activity = self.session.last_activity
+
+        self.buffer.add_turn(self.session, 'q2', 'a2')
+        self.buffer.flush()
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.last_activity, first_activity)
+
+        self.buffer.close()
+        self.session.refresh_from_db()
+        self.assertGreater(self.session.last_activity, first_activity)
+
+    @override_settings(CHATBOT_WRITE_MODE='sync')
+    def test_sync_mode_writes_immediately(self):
+        self.buffer.add_turn(self.session, 'q1', 'a1')
+        self.assertEqual(ChatMessage.objects.count(), 2)
+
+    @override_settings(CHATBOT_WRITE_BUFFER_LIMIT=2, CHATBOT_WRITE_BUFFER_SIZE=10)
+    def test_queue_is_capped_to_the_newest_turns(self):
+        buffer = ChatWriteBuffer()
+        self.addCleanup(buffer.close)
+        for i in range(3):
+            buffer.add_turn(self.session, f'q{i}', f'a{i}')
+        self.assertEqual(len(buffer), 2)
+
+        with self.assertLogs('krishi_sakhi', 'WARNING'):
+            buffer.flush()
+        self.assertEqual(
+            list(ChatMessage.objects.order_by('timestamp', 'id').values_list('content', flat=True)),
+            ['q1', 'a1', 'q2', 'a2'],
+        )
+
+
+@override_settings(CHATBOT_WRITE_MODE='buffered', CHATBOT_WRITE_BUFFER_SIZE=3, CHATBOT_WRITE_FLUSH_INTERVAL=3600)
+class ChatWriteBufferFailureTests(TransactionTestCase):
+
+    def test_turns_of_deleted_sessions_do_not_block_other_writes(self):
+        buffer = ChatWriteBuffer()
+        self.addCleanup(buffer.close)
+        user = User.objects.create_user('farmer')
+        gone = ChatSession.objects.create(user=user, session_id='gone')
+        kept = ChatSession.objects.create(user=user, session_id='kept')
+        article = KnowledgeArticle.objects.create(title='Paddy', content='Sow paddy', category='crop_cultivation')
+
+        buffer.add_turn(gone, 'q1', 'a1')
+        ChatSession.objects.filter(pk=gone.pk).delete()
+        buffer.add_turn(kept, 'q2', 'a2', [article.id, article.id + 1])
+        with self.assertLogs('krishi_sakhi', 'ERROR'):
+            # The size threshold flushes inline; the failure must not reach the caller
+            buffer.add_turn(kept, 'q3', 'a3')
+
+        self.assertEqual(
+            list(ChatMessage.objects.order_by('timestamp', 'id').values_list('content', flat=True)),
+            ['q2', 'a2', 'q3', 'a3'],
+        )
+        self.assertEqual(list(article.chatmessage_set.values_list('content', flat=True)), ['a2'])
+        self.assertEqual(len(buffer), 0)
+
+
+class ChatSessionDetailViewTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('farmer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.session = ChatSession.objects.create(user=self.user, session_id='s1')
+        self.article = KnowledgeArticle.objects.create(
+            title='Paddy', content='A long body ' * 50, category='crop_cultivation'
+        )
+        start = timezone.now() - timedelta(days=1)
+        # Pairs share a timestamp so the id tie-breaker is exercised
+        self.messages = ChatMessage.objects.bulk_create([
+            ChatMessage(
+                session=self.session,
+                message_type='user' if i % 2 == 0 else 'bot',
+                content=f'message {i}',
+                timestamp=start + timedelta(seconds=i // 2),
+            )
+            for i in range(120)
+        ])
+        for message in self.messages[1::2]:
+            message.context_articles.add(self.article)
+
+    def get_page(self, **params):
+        return self.client.get('/api/chatbot/sessions/s1/', params)
+
+    def test_walks_history_newest_page_first(self):
+        contents = []
+        cursor = None
+        while True:
+            params = {'limit': 50}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.get_page(**params)
+            self.assertEqual(response.status_code, 200)
+            contents[:0] = [m['content'] for m in response.data['messages']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(contents, [f'message {i}' for i in range(120)])
+
+    def test_query_count_is_independent_of_history_length(self):
+        # session, message page, prefetched articles
+        with self.assertNumQueries(3):
+            response = self.get_page(limit=10)
+
+        last = response.data['messages'][-1]
+        self.assertEqual(last['content'], 'message 119')
+        self.assertEqual(last['context_articles'], [
+            {'id': self.article.id, 'title': 'Paddy', 'category': 'crop_cultivation'}
+        ])
+
+    def test_rejects_bad_cursor_and_foreign_sessions(self):
+        self.assertEqual(self.get_page(cursor='garbage').status_code, 400)
+        self.assertEqual(self.get_page(limit=0).status_code, 400)
+
+        other = User.objects.create_user('other')
+        ChatSession.objects.create(user=other, session_id='s2')
+        self.assertEqual(self.client.get('/api/chatbot/sessions/s2/').status_code, 404)
+
+
+@override_settings(CHATBOT_HISTORY_TOKENS=40, CHATBOT_SUMMARY_TOKENS=20, CHATBOT_WRITE_MODE='sync')
+class ConversationHistoryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('farmer')
+        self.session = ChatSession.objects.create(user=self.user, session_id='s1')
+
+    def add_turns(self, count, start=0):
+        writer = ChatWriteBuffer()
+        for i in range(start, start + count):
+            writer.add_turn(self.session, f'question {i} about paddy',
+                            f'Answer {i} is short. More detail follows here.')
+
+    def test_short_conversation_is_kept_verbatim(self):
+        self.add_turns(2)
+
+        history = build_history(self.session)
+
+        self.assertEqual(history.summary, '')
+        self.assertEqual([m.content for m in history.messages][:2],
+                         ['question 0 about paddy', 'Answer 0 is short. More detail follows here.'])
+        self.assertIsNone(ChatSession.objects.get(pk=self.session.pk).summarized_until)
+
+    def test_overflow_folds_oldest_turns_into_summary(self):
+        self.add_turns(6)
+
+        history = build_history(self.session)
+
+        self.assertLessEqual(sum(m.token_count for m in history.messages), 40)
+        self.assertEqual(history.messages[0].message_type, 'user')
+        self.assertEqual(history.messages[-1].content, 'Answer 5 is short. More detail follows here.')
+        # Answers are reduced to their first sentence; the oldest lines drop off
+        self.assertIn('Assistant: Answer 4 is short.', history.summary)
+        self.assertNotIn('More detail', history.summary)
+        self.assertNotIn('question 0', history.summary)
+
+        session = ChatSession.objects.get(pk=self.session.pk)
+        self.assertEqual(session.summary, history.summary)
+        self.assertLessEqual(session.summary_token_count, 20)
+        self.assertIn(HISTORY_HEADER, build_prompt('next?', '', 'en', format_history(history)))
+
+    def test_reads_only_the_unsummarized_tail(self):
+        self.add_turns(50)
+        build_history(self.session)
+        self.add_turns(1, start=50)
+        session = ChatSession.objects.get(pk=self.session.pk)
+
+        # Only the tail after the watermark is read, however long the session
+        with self.assertNumQueries(1):
+            history = build_history(session)
+        self.assertLessEqual(len(history.messages), 10)
+
+
+class AnswerCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = AnswerCache()
+        self.cache.cache.clear()
+
+    def test_normalize_question(self):
+        self.assertEqual(normalize_question('  When to SOW paddy?? '), 'when to sow paddy')
+
+    def test_scope_includes_language_and_articles(self):
+        self.cache.set('sow paddy', 'en', [1, 2], {'answer': 'June'})
+
+        self.assertEqual(self.cache.get('sow paddy', 'en', [2, 1]), {'answer': 'June'})
+        self.assertIsNone(self.cache.get('sow paddy', 'ml', [1, 2]))
+        self.assertIsNone(self.cache.get('sow paddy', 'en', [1]))
+
+    def test_dissimilar_questions_miss(self):
+        self.cache.set('when to sow paddy', 'en', [1], {'answer': 'June'})
+        self.assertIsNone(self.cache.get('paddy blast fungicide dose', 'en', [1]))
+
+    @override_settings(CHATBOT_ANSWER_CACHE_BUCKET_SIZE=2)
+    def test_bucket_evicts_least_recently_used(self):
+        self.cache.set('paddy sowing month', 'en', [1], {'answer': 'a'})
+        self.cache.set('banana irrigation interval', 'en', [1], {'answer': 'b'})
+        self.assertEqual(self.cache.get('what is the paddy sowing month', 'en', [1]), {'answer': 'a'})
+        self.cache.set('pepper wilt control', 'en', [1], {'answer': 'c'})
+
+        scope = self.cache._scope('en', [1])
+        self.assertEqual(self.cache._get_similar(scope, 'the paddy sowing month'), {'answer': 'a'})
+        self.assertIsNone(self.cache._get_similar(scope, 'the banana irrigation interval'))
+
+
+class VectorStoreTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.embedder = HashingEmbedder(dim=64)
+
+    def test_hashing_embedder_is_deterministic_and_normalised(self):
+        first = self.embedder.embed(['paddy sowing in june', ''])
+        second = self.embedder.embed(['paddy sowing in june'])
+
+        np.testing.assert_array_equal(first[0], second[0])
+        self.assertAlmostEqual(float(np.linalg.norm(first[0])), 1.0, places=5)
+        self.assertFalse(first[1].any())
+
+    def test_upsert_search_and_delete(self):
+        store = VectorStore(self.directory, 'en', 64)
+        texts = ['paddy sowing season', 'banana irrigation', 'pepper quick wilt']
+        store.upsert([1, 2, 3], self.embedder.embed(texts))
+
+        query = self.embedder.embed(['banana irrigation schedule'])[0]
+        self.assertEqual(store.search(query, k=1)[0][0], 2)
+
+        store.delete([2])
+        self.assertNotIn(2, [doc_id for doc_id, _ in store.search(query, k=3)])
+        self.assertEqual(len(store), 2)
+
+    def test_deleted_rows_are_compacted_away(self):
+        store = VectorStore(self.directory, 'en', 64)
+        store.upsert(list(range(1, 9)), self.embedder.embed([f'crop note {i}' for i in range(8)]))
+
+        store.delete([1])  # Below the threshold: tombstoned in place
+        self.assertEqual(os.path.getsize(store.ids_path), 8 * 8)
+        store.delete([2])
+
+        self.assertEqual(os.path.getsize(store.ids_path), 6 * 8)
+        self.assertEqual(len(store), 6)
+        query = self.embedder.embed(['crop note 7'])[0]
+        self.assertEqual(store.search(query, k=1)[0][0], 8)
+
+    def test_readers_share_the_mapped_file(self):
+        writer = VectorStore(self.directory, 'en', 64)
+        reader = VectorStore(self.directory, 'en', 64)
+        writer.upsert([1], self.embedder.embed(['coconut mite']))
+        self.assertIsInstance(reader._matrix, np.ndarray)
+
+        query = self.embedder.embed(['coconut mite'])[0]
+        self.assertEqual(reader.search(query, k=1)[0][0], 1)
+        self.assertIsInstance(reader._matrix, np.memmap)
+
+        writer.upsert([1], self.embedder.embed(['arecanut']))
+        self.assertLess(reader.search(query, k=1)[0][1], 0.5)
+
+
+class HybridRetrievalTests(IndexDirMixin, TestCase):
+
+    def test_semantic_index_follows_article_changes(self):
+        article = self.create_article(title='Banana bunchy top', content='Virus in banana')
+        self.assertEqual(semantic_search('banana virus', 'en')[0][0], article.chunks.get().id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article.delete()
+        self.assertEqual(semantic_search('banana virus', 'en'), [])
+
+    def test_retrieve_fuses_keyword_and_semantic_hits(self):
+        paddy = self.create_article(title='Paddy sowing', content='Sow paddy after rains.')
+        self.create_article(title='Rubber tapping', content='Tap rubber trees at dawn.')
+
+        self.assertEqual(
+            [doc_id for doc_id, _ in retrieve('sow paddy', 'en')],
+            [paddy.chunks.get().id],
+        )
+
+
+@override_settings(CHATBOT_CHUNK_WORDS=10, CHATBOT_CHUNK_OVERLAP=3)
+class ChunkingTests(IndexDirMixin, TestCase):
+
+    def test_chunk_text_overlaps_windows(self):
+        text = ' '.join(f'w{i}' for i in range(24))
+        chunks = list(chunk_text(text))
+
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(chunks[0].endswith('w9'))
+        self.assertTrue(chunks[1].startswith('w7'))
+        self.assertTrue(chunks[2].endswith('w23'))
+
+    def test_count_tokens_counts_words_and_punctuation(self):
+        self.assertEqual(count_tokens('Sow paddy, then irrigate.'), 6)
+
+    def test_saving_article_replaces_chunks(self):
+        article = self.create_article(title='Paddy', content=' '.join(['paddy'] * 24))
+        self.assertEqual(article.chunks.count(), 3)
+        old_ids = set(article.chunks.values_list('id', flat=True))
+
+        article.content = 'short banana note'
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save()
+
+        chunk = article.chunks.get()
+        self.assertEqual(chunk.token_count, 3)
+        self.assertFalse(old_ids & {chunk_id for chunk_id, _ in search_chunks('paddy', 'en', 10)})
+
+    def test_rebuild_rechunks_every_article(self):
+        active = self.create_article(title='Paddy', content=' '.join(['paddy'] * 24))
+        inactive = self.create_article(title='Banana', content='banana wilt', is_active=False)
+        ArticleChunk.objects.create(article=inactive, language='en', position=0, content='stale', token_count=1)
+
+        with override_settings(CHATBOT_CHUNK_WORDS=20):
+            call_command('rebuild_search_index', '--rechunk', '--skip-vectors', stdout=StringIO())
+
+        self.assertEqual(active.chunks.count(), 2)
+        self.assertFalse(inactive.chunks.exists())
+        self.assertEqual(len(search_chunks('paddy', 'en', 10)), 2)
+
+    def test_retrieve_chunks_respects_token_budget(self):
+        self.create_article(title='Paddy', content=' '.join(['paddy'] * 24))
+
+        chunks = retrieve_chunks('paddy', 'en', k=3, token_budget=15)
+
+        self.assertEqual(len(chunks), 1)
+        self.assertLessEqual(sum(chunk.token_count for chunk in chunks), 15)
+
+
+class IngestArticlesCommandTests(IndexDirMixin, TestCase):
+
+    def write_jsonl(self, rows):
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            for row in rows:
+                fh.write(row if isinstance(row, str) else json.dumps(row))
+                fh.write('\n')
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_ingests_in_batches_and_indexes_chunks(self):
+        path = self.write_jsonl([
+            {'title': 'Paddy sowing', 'content': 'Sow paddy in June.', 'category': 'crop_cultivation'},
+            {'title': 'Banana', 'content': 'Banana irrigation.', 'category': 'irrigation', 'tags': ['banana']},
+            {'title': 'Bad category', 'content': 'x', 'category': 'nope'},
+            'not json',
+            {'title': 'Pepper', 'content': 'Pepper wilt.', 'category': 'pest_management', 'language': 'ml'},
+        ])
+
+        call_command('ingest_articles', path, batch_size=2, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(KnowledgeArticle.objects.count(), 3)
+        self.assertEqual(ArticleChunk.objects.count(), 3)
+        self.assertEqual(KnowledgeArticle.objects.get(title='Banana').tags, 'banana')
+        self.assertEqual(
+            list(tag_index.filter(KnowledgeArticle.objects.all(), 'Banana').values_list('title', flat=True)),
+            ['Banana'],
+        )
+        paddy_chunk = ArticleChunk.objects.get(article__title='Paddy sowing')
+        self.assertEqual(search_chunks('paddy', 'en')[0][0], paddy_chunk.id)
+        self.assertEqual(len(IndexManager().get('ml')), 1)
@@ -6,6 +6,7 @@ app_name = 'chatbot'
 urlpatterns = [
     # Chatbot endpoints
     path('query/', views.ChatbotQueryView.as_view(), name='query'),
+    path('query/stream/', views.ChatbotQueryStreamView.as_view(), name='query-stream'),
     path('sessions/', views.ChatSessionListView.as_view(), name='sessions'),
     path('sessions/<str:session_id>/', views.ChatSessionDetailView.as_view(), name='session-detail'),
 ]
\ No newline at end of file
@@ -0,0 +1,271 @@
+"""
+Dense-vector semantic retrieval over knowledge article chunks.
+
+Embeddings for each language live in two flat files under
+``settings.CHATBOT_INDEX_DIR``:
+
+* ``vectors_<lang>.f32`` - a contiguous ``(rows, dim)`` float32 matrix
+* ``vectors_<lang>.ids`` - the int64 chunk id of every row (0 = deleted)
+
+Both are opened with ``numpy.memmap``, so every worker process maps the
+same page-cache pages instead of holding a private copy. Updates rewrite a
+row in place or append one; readers only remap when the files grow or are
+replaced. Once deleted rows make up ``COMPACT_DEAD_FRACTION`` of the file,
+the next delete rewrites it without them, so search cost and disk use
+follow the live corpus rather than its edit history.
+"""
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .embeddings import get_embedder
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+
+ID_DTYPE = np.int64
+VECTOR_DTYPE = np.float32
+COMPACT_DEAD_FRACTION = 0.25
+
+
+def embedding_text(chunk):
+    """Text that represents a chunk in embedding space"""
+    return f'{chunk.article.title}\n{chunk.content}'
+
+
+class VectorStore:
+    """Memory-mapped embedding matrix for a single language"""
+
+    def __init__(self, directory, language, dim):
+        self.directory = Path(directory)
+        self.language = language
+        self.dim = dim
+        self.vectors_path = self.directory / f'vectors_{language}.f32'
+        self.ids_path = self.directory / f'vectors_{language}.ids'
+        self.lock_path = self.directory / f'vectors_{language}.lock'
+        self._signature = None
+        self._ids = np.zeros(0, dtype=ID_DTYPE)
+        self._matrix = np.zeros((0, dim), dtype=VECTOR_DTYPE)
+        self._rows = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        self.refresh()
+        return int(np.count_nonzero(self._ids))
+
+    # Mapping
+
+    def refresh(self):
+        """Remap the files if another process grew or replaced them"""
+        try:
+            stat = os.stat(self.ids_path)
+            signature = (stat.st_ino, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature == self._signature:
+            return
+
+        with self._lock:
+            rows = signature[1] // np.dtype(ID_DTYPE).itemsize if signature else 0
+            if rows:
+                try:
+                    ids = np.memmap(self.ids_path, dtype=ID_DTYPE, mode='r', shape=(rows,))
+                    matrix = np.memmap(
+                        self.vectors_path, dtype=VECTOR_DTYPE, mode='r', shape=(rows, self.dim)
+                    )
+                except (FileNotFoundError, ValueError):
+                    # Caught halfway through a rebuild; keep the old mapping
+                    return
+            else:
+                ids = np.zeros(0, dtype=ID_DTYPE)
+                matrix = np.zeros((0, self.dim), dtype=VECTOR_DTYPE)
+            self._ids, self._matrix = ids, matrix
+            self._rows = dict(zip(ids.tolist(), range(rows)))
+            self._rows.pop(0, None)
+            self._signature = signature
+
+    @contextmanager
+    def _write_lock(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_row(self, path, dtype, row, values, width=1):
+        itemsize = np.dtype(dtype).itemsize
+        view = np.memmap(path, dtype=dtype, mode='r+', offset=row * width * itemsize, shape=(width,))
+        view[:] = values
+        view.flush()
+        del view
+
+    # Queries
+
+    def search(self, query_vector, k=10):
+        """Return up to ``k`` ``(doc_id, score)`` pairs by cosine similarity"""
+        self.refresh()
+        ids, matrix = self._ids, self._matrix
+        if not len(ids):
+            return []
+
+        scores = matrix @ np.asarray(query_vector, dtype=VECTOR_DTYPE)
+        scores[ids == 0] = -np.inf
+        k = min(k, len(scores))
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [
+            (int(ids[row]), float(scores[row]))
+            for row in top
+            if np.isfinite(scores[row])
+        ]
+
+    # Updates
+
+    def upsert(self, doc_ids, vectors):
+        """Insert or overwrite the vectors of ``doc_ids``"""
+        vectors = np.ascontiguousarray(vectors, dtype=VECTOR_DTYPE).reshape(-1, self.dim)
+        with self._write_lock():
+            new_ids, new_vectors = [], []
+            for doc_id, vector in zip(doc_ids, vectors):
+                row = self._rows.get(doc_id)
+                if row is not None and self._ids[row] == doc_id:
+                    self._write_row(self.vectors_path, VECTOR_DTYPE, row, vector, self.dim)
+                else:
+                    new_ids.append(doc_id)
+                    new_vectors.append(vector)
+            if new_ids:
+                # Vectors first: readers size the matrix from the ids file
+                with open(self.vectors_path, 'ab') as fh:
+                    fh.write(np.asarray(new_vectors, dtype=VECTOR_DTYPE).tobytes())
+                with open(self.ids_path, 'ab') as fh:
+                    fh.write(np.asarray(new_ids, dtype=ID_DTYPE).tobytes())
+            self.refresh()
+
+    def delete(self, doc_ids):
+        """Tombstone the rows of ``doc_ids``"""
+        with self._write_lock():
+            for doc_id in doc_ids:
+                row = self._rows.pop(doc_id, None)
+                if row is None or self._ids[row] != doc_id:
+                    continue
+                self._write_row(self.ids_path, ID_DTYPE, row, 0)
+                self._write_row(
+                    self.vectors_path, VECTOR_DTYPE, row,
+                    np.zeros(self.dim, dtype=VECTOR_DTYPE), self.dim,
+                )
+            live = self._ids != 0
+            dead = len(live) - int(np.count_nonzero(live))
+            if dead and dead >= COMPACT_DEAD_FRACTION * len(live):
+                self._swap(self._ids[live], self._matrix[live])
+
+    def replace(self, doc_ids, vectors):
+        """Atomically swap in a freshly built, compacted matrix"""
+        with self._write_lock():
+            self._swap(doc_ids, vectors)
+
+    def _swap(self, doc_ids, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=VECTOR_DTYPE).reshape(-1, self.dim)
+        for path, data in ((self.vectors_path, vectors),
+                           (self.ids_path, np.asarray(doc_ids, dtype=ID_DTYPE))):
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(data.tobytes())
+            os.replace(tmp_path, path)
+        self.refresh()
+
+
+class VectorIndexManager:
+    """Per-process registry of language vector stores"""
+
+    def __init__(self):
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    def get(self, language):
+        """Return the store for ``language``, building it on first use"""
+        embedder = get_embedder()
+        key = (str(settings.CHATBOT_INDEX_DIR), language, embedder.dim)
+        store = self._stores.get(key)
+        if store is None:
+            with self._lock:
+                store = self._stores.get(key)
+                if store is None:
+                    store = VectorStore(settings.CHATBOT_INDEX_DIR, language, embedder.dim)
+                    if not store.ids_path.exists():
+                        self._build(store, language)
+                    self._stores[key] = store
+        return store
+
+    def _build(self, store, language, batch_size=500):
+        from .models import ArticleChunk
+
+        embedder = get_embedder()
+        chunks = (
+            ArticleChunk.objects
+            .filter(language=language, article__is_active=True)
+            .select_related('article')
+            .only('id', 'content', 'article__title')
+        )
+        ids, blocks, batch = [], [], []
+        for chunk in chunks.iterator(chunk_size=batch_size):
+            batch.append(chunk)
+            if len(batch) == batch_size:
+                ids.extend(c.id for c in batch)
+                blocks.append(embedder.embed([embedding_text(c) for c in batch]))
+                batch = []
+        if batch:
+            ids.extend(c.id for c in batch)
+            blocks.append(embedder.embed([embedding_text(c) for c in batch]))
+
+        matrix = np.vstack(blocks) if blocks else np.zeros((0, store.dim), dtype=VECTOR_DTYPE)
+        store.replace(ids, matrix)
+
+    def rebuild(self, language, batch_size=500):
+        """Re-embed every active chunk of ``language`` into a new matrix"""
+        store = self.get(language)
+        self._build(store, language, batch_size)
+        return store
+
+    def update_chunks(self, removed_ids=(), chunks=()):
+        """Tombstone ``removed_ids`` and embed ``chunks`` into their stores"""
+        from .models import KnowledgeArticle
+
+        if removed_ids:
+            for language, _ in KnowledgeArticle.LANGUAGE_CHOICES:
+                self.get(language).delete(removed_ids)
+
+        by_language = {}
+        for chunk in chunks:
+            by_language.setdefault(chunk.language, []).append(chunk)
+        for language, language_chunks in by_language.items():
+            vectors = get_embedder().embed([embedding_text(c) for c in language_chunks])
+            self.get(language).upsert([c.id for c in language_chunks], vectors)
+
+    def clear(self):
+        """Forget all open stores (used by tests)"""
+        with self._lock:
+            self._stores.clear()
+
+
+vector_index = VectorIndexManager()
+
+
+def semantic_search(query, language='en', k=None):
+    """Return ``(chunk_id, score)`` pairs most similar to ``query``"""
+    if k is None:
+        k = settings.CHATBOT_SEARCH_TOP_K
+    query_vector = get_embedder().embed([query])[0]
+    return vector_index.get(language).search(query_vector, k)
@@ -1,16 +1,137 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from core.pagination import keyset_page, parse_limit
+
+from .llm import LLMError
+from .models import ChatMessage, ChatSession, KnowledgeArticle
+from .serializers import ChatbotQuerySerializer, ChatMessageSerializer, ChatSessionSerializer
+from .services import ChatbotService
+
+
+def preferred_language(user):
+    """Return the user's preferred chat language, defaulting to English"""
+    profile = getattr(user, 'userprofile', None)
+    return getattr(profile, 'preferred_language', None) or 'en'
 
 
 class ChatbotQueryView(APIView):
-    """Chatbot query endpoint - placeholder"""
+    """Answer a farmer's question using the knowledge base"""
     
     def post(self, request):
-        return Response(
-            {"message": "Chatbot query endpoint - coming soon"}, 
-            status=status.HTTP_200_OK
+        serializer = ChatbotQuerySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        question = serializer.validated_data['question']
+        language = serializer.validated_data.get('language') or preferred_language(request.user)
+
+        try:
+            result = ChatbotService(request.user).process_query(
+                question, language, serializer.validated_data.get('session_id')
+            )
+        except ChatSession.DoesNotExist:
+            raise NotFound("Chat session not found")
+        except LLMError:
+            return Response(
+                {"message": "The assistant is unavailable right now, please try again"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return Response(result, status=status.HTTP_200_OK)
+
+
+def sse_event(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ChatbotQueryStreamView(View):
+    """Stream the chatbot answer as server-sent events
+
+    Async so that a long LLM generation does not hold a worker thread.
+    Emits ``token`` events as text arrives, then one ``done`` event with the
+    session id and sources; the chat turn is saved once, after the last
+    token. Authentication matches the DRF API views.
+    """
+
+    async def post(self, request):
+        drf_request = Request(
+            request,
+            parsers=[JSONParser()],
+            authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
         )
+        try:
+            user, data = await sync_to_async(self.authenticate_and_parse)(drf_request)
+            serializer = ChatbotQuerySerializer(data=data)
+            serializer.is_valid(raise_exception=True)
+        except APIException as exc:
+            return JsonResponse({'detail': exc.detail}, status=exc.status_code)
+
+        if not user.is_authenticated:
+            return JsonResponse(
+                {'detail': "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        question = serializer.validated_data['question']
+        language = serializer.validated_data.get('language') or \
+            await sync_to_async(preferred_language)(user)
+        service = ChatbotService(user)
+        try:
+            session, chunks, cached_answer = await sync_to_async(service.prepare)(
+                question, language, serializer.validated_data.get('session_id')
+            )
+        except ChatSession.DoesNotExist:
+            return JsonResponse({'detail': "Chat session not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(
+            self.events(service, session, question, language, chunks, cached_answer),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def authenticate_and_parse(self, drf_request):
+        if drf_request.content_type.split(';')[0].strip() != 'application/json':
+            raise ValidationError("Expected a JSON body")
+        return drf_request.user, drf_request.data
+
+    async def events(self, service, session, question, language, chunks, cached_answer):
+        if cached_answer is not None:
+            answer = cached_answer
+            yield sse_event('token', {'text': answer})
+        else:
+            pieces = []
+            try:
+                async for text in service.stream_answer(question, language, chunks, session.history):
+                    pieces.append(text)
+                    yield sse_event('token', {'text': text})
+            except LLMError:
+                yield sse_event('error', {
+                    'message': "The assistant is unavailable right now, please try again"
+                })
+                return
+            answer = ''.join(pieces).strip()
+
+        result = await sync_to_async(service.finish)(
+            session, question, language, answer, chunks, cached=cached_answer is not None
+        )
+        result.pop('answer')
+        yield sse_event('done', result)
 
 
 class ChatSessionListView(APIView):
@@ -24,10 +145,36 @@ class ChatSessionListView(APIView):
 
 
 class ChatSessionDetailView(APIView):
-    """Chat session detail endpoint - placeholder"""
-    
+    """Chat session with its messages, newest page first
+
+    ``?limit=`` sets the page size and ``?cursor=`` continues from the
+    ``next_cursor`` of the previous page. Messages within a page are
+    returned oldest first.
+    """
+    default_limit = 50
+    max_limit = 200
+
     def get(self, request, session_id):
+        session = get_object_or_404(ChatSession, session_id=session_id, user=request.user)
+        limit = parse_limit(request.query_params.get('limit'), self.default_limit, self.max_limit)
+        messages = (
+            ChatMessage.objects
+            .filter(session=session)
+            .order_by('-timestamp', '-id')
+            .only('id', 'message_type', 'content', 'timestamp')
+            .prefetch_related(Prefetch(
+                'context_articles',
+                queryset=KnowledgeArticle.objects.only('id', 'title', 'category'),
+            ))
+        )
+        page, next_cursor = keyset_page(messages, request.query_params.get('cursor'), limit)
+        page.reverse()
+
         return Response(
-            {"message": f"Chat session {session_id} detail endpoint - coming soon"}, 
+            {
+                **ChatSessionSerializer(session).data,
+                'messages': ChatMessageSerializer(page, many=True).data,
+                'next_cursor': next_cursor,
+            },
             status=status.HTTP_200_OK
         )
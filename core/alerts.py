@@ -0,0 +1,242 @@
+"""
+Batch evaluation of weather alert rules over every farm.
+
+Farms are grouped by weather tile (see ``core.weather``) so each tile is
+fetched once, through the shared weather cache. The weather of all tiles
+is loaded into one feature matrix, every rule is evaluated over it with
+NumPy. Each rule firing in a tile becomes one ``AlertEvent`` holding the
+weather payload, and the farms of the tile get a small ``WeatherAlert``
+referencing it. A storm that lasts across runs keeps its event, so farmers
+are alerted once per event. Rows are written with ``bulk_create`` and
+queued for delivery in the ``core.dispatch`` outbox.
+"""
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from farm.models import FarmProfile
+
+from . import geo
+from .dashboard import invalidate_alerts as invalidate_dashboard_alerts
+from .dispatch import enqueue_alerts
+from .models import AlertEvent, WeatherAlert
+from .weather import WeatherError, weather_service
+
+
+logger = logging.getLogger('krishi_sakhi')
+
+SEVERITIES = ['low', 'medium', 'high', 'critical']
+
+FEATURES = ['rain_mm_per_hour', 'temp_min', 'temp_max', 'wind_speed']
+
+
+AlertRule = namedtuple('AlertRule', ['alert_type', 'feature', 'thresholds', 'above', 'title', 'message'])
+
+# Thresholds are given for low, medium, high and critical severity
+ALERT_RULES = [
+    AlertRule(
+        'heavy_rain', 'rain_mm_per_hour', (7.5, 15, 30, 50), True,
+        "Heavy rain expected",
+        "Rain of {value:.0f} mm/h expected. Clear field drains and delay fertiliser application.",
+    ),
+    AlertRule(
+        'frost_warning', 'temp_min', (4, 2, 0, -2), False,
+        "Frost risk tonight",
+        "Temperatures may fall to {value:.0f}°C. Cover nurseries and irrigate lightly in the evening.",
+    ),
+    AlertRule(
+        'heatwave', 'temp_max', (37, 40, 43, 45), True,
+        "Heatwave conditions",
+        "Temperatures up to {value:.0f}°C expected. Irrigate early morning and mulch to keep soil moist.",
+    ),
+    AlertRule(
+        'high_wind', 'wind_speed', (10, 14, 18, 25), True,
+        "Strong winds expected",
+        "Winds up to {value:.0f} m/s expected. Stake young plants and postpone spraying.",
+    ),
+]
+
+
+AlertRunResult = namedtuple('AlertRunResult', ['farms', 'tiles', 'failed_tiles', 'alerts', 'elapsed'])
+
+
+def extract_features(data):
+    """Return the ``FEATURES`` vector of an OpenWeather current weather payload"""
+    main = data.get('main', {})
+    rain = data.get('rain', {})
+    wind = data.get('wind', {})
+    temp = main.get('temp', np.nan)
+    return [
+        rain.get('1h', rain.get('3h', 0) / 3),
+        main.get('temp_min', temp),
+        main.get('temp_max', temp),
+        max(wind.get('speed', 0), wind.get('gust', 0)),
+    ]
+
+
+def group_by_tile(lats, lons, precision=None):
+    """Return ``(tiles, tile_index)``: unique tiles and each farm's tile position"""
+    codes = geo.encode_many(lats, lons, precision or settings.WEATHER_GEOHASH_PRECISION)
+    return np.unique(codes, return_inverse=True)
+
+
+def evaluate(features, rules=ALERT_RULES):
+    """Evaluate ``rules`` over a ``(tiles, FEATURES)`` matrix
+
+    Returns one array per rule with the severity index of each tile, or -1
+    where the rule does not fire. Missing weather (NaN) never fires.
+    """
+    levels = []
+    for rule in rules:
+        values = features[:, FEATURES.index(rule.feature)][:, None]
+        thresholds = np.asarray(rule.thresholds, dtype=np.float64)
+        reached = values >= thresholds if rule.above else values <= thresholds
+        levels.append(reached.sum(axis=1) - 1)
+    return levels
+
+
+def build_events(tiles, features, payloads, levels, rules=ALERT_RULES, now=None):
+    """Create unsaved ``AlertEvent`` objects for every rule that fires in a tile
+
+    Returns ``{(rule position, tile position): event}``.
+    """
+    now = now or timezone.now()
+    valid_until = now + timedelta(hours=settings.WEATHER_ALERT_VALID_HOURS)
+    events = {}
+    for position, (rule, tile_levels) in enumerate(zip(rules, levels)):
+        for tile in np.flatnonzero(tile_levels >= 0):
+            events[position, tile] = AlertEvent(
+                tile=tiles[tile],
+                alert_type=rule.alert_type,
+                severity=SEVERITIES[tile_levels[tile]],
+                weather_data=payloads[tile],
+                valid_from=now,
+                valid_until=valid_until,
+            )
+    return events
+
+
+def build_alerts(farms, tile_index, features, events, levels, rules=ALERT_RULES):
+    """Create unsaved ``WeatherAlert`` objects for every farm a rule fires for
+
+    ``farms`` is a list of ``(user_id, lat, lon)`` aligned with
+    ``tile_index``; ``events`` is the mapping returned by ``build_events``.
+    """
+    alerts = []
+    for position, (rule, tile_levels) in enumerate(zip(rules, levels)):
+        column = FEATURES.index(rule.feature)
+        for farm in np.flatnonzero(tile_levels[tile_index] >= 0):
+            tile = tile_index[farm]
+            event = events[position, tile]
+            user_id, lat, lon = farms[farm]
+            alerts.append(WeatherAlert(
+                user_id=user_id,
+                event=event,
+                alert_type=rule.alert_type,
+                severity=event.severity,
+                title=rule.title,
+                message=rule.message.format(value=features[tile, column]),
+                location_lat=lat,
+                location_lon=lon,
+                valid_from=event.valid_from,
+                valid_until=event.valid_until,
+            ))
+    return alerts
+
+
+def save_events(events, now=None):
+    """Save new events, reusing an active event of the same tile and type
+
+    An active event is reused unless the new one is more severe, so a storm
+    that persists across runs stays one event and its farmers are not
+    alerted again. Returns the ids of reused events.
+    """
+    now = now or timezone.now()
+    active = {}
+    for event in AlertEvent.objects.filter(
+        tile__in={event.tile for event in events.values()},
+        valid_until__gt=now,
+    ).order_by('valid_from'):
+        active[event.tile, event.alert_type] = event
+
+    new = []
+    reused = set()
+    for key, event in events.items():
+        current = active.get((event.tile, event.alert_type))
+        if current is not None and SEVERITIES.index(current.severity) >= SEVERITIES.index(event.severity):
+            events[key] = current
+            reused.add(current.id)
+        else:
+            new.append(event)
+    AlertEvent.objects.bulk_create(new, batch_size=1000)
+    return reused
+
+
+def save_alerts(alerts, reused_event_ids, batch_size=1000):
+    """Save alerts, skipping users already alerted for a reused event"""
+    if reused_event_ids:
+        existing = set(
+            WeatherAlert.objects.filter(event_id__in=reused_event_ids).values_list('user_id', 'event_id')
+        )
+        alerts = [alert for alert in alerts if (alert.user_id, alert.event.id) not in existing]
+    WeatherAlert.objects.bulk_create(alerts, batch_size=batch_size)
+    if alerts:
+        # bulk_create skips the signals that refresh dashboards
+        transaction.on_commit(invalidate_dashboard_alerts)
+    return alerts
+
+
+def fetch_tiles(tiles, workers=None):
+    """Fetch the weather of every tile; returns ``(features, payloads, failed)``"""
+    features = np.full((len(tiles), len(FEATURES)), np.nan)
+    payloads = [None] * len(tiles)
+    failed = 0
+
+    def fetch(tile):
+        try:
+            return weather_service.for_tile(tile)['data']
+        except WeatherError:
+            return None
+        finally:
+            close_old_connections()
+
+    with ThreadPoolExecutor(max_workers=workers or settings.WEATHER_ALERT_FETCH_WORKERS) as executor:
+        for position, data in enumerate(executor.map(fetch, tiles)):
+            if data is None:
+                failed += 1
+                continue
+            payloads[position] = data
+            features[position] = extract_features(data)
+    return features, payloads, failed
+
+
+def run_alerts(dry_run=False, workers=None, batch_size=1000):
+    """Evaluate alert rules for every farm and save the alerts"""
+    started = time.perf_counter()
+    farms = list(FarmProfile.objects.values_list('user_id', 'location_lat', 'location_lon'))
+    if not farms:
+        return AlertRunResult(0, 0, 0, 0, time.perf_counter() - started)
+
+    coordinates = np.array([(lat, lon) for _, lat, lon in farms], dtype=np.float64)
+    tiles, tile_index = group_by_tile(coordinates[:, 0], coordinates[:, 1])
+    features, payloads, failed = fetch_tiles(tiles, workers)
+    levels = evaluate(features)
+    events = build_events(tiles, features, payloads, levels)
+    if dry_run:
+        alerts = build_alerts(farms, tile_index, features, events, levels)
+    else:
+        with transaction.atomic():
+            reused = save_events(events)
+            alerts = save_alerts(build_alerts(farms, tile_index, features, events, levels), reused, batch_size)
+            enqueue_alerts(alerts)
+
+    result = AlertRunResult(len(farms), len(tiles), failed, len(alerts), time.perf_counter() - started)
+    logger.info("Weather alerts: %s", result)
+    return result
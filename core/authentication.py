@@ -0,0 +1,101 @@
+"""
+Token authentication without a database query per request.
+
+``CachedTokenAuthentication`` is a drop-in replacement for DRF's
+``TokenAuthentication``. Resolved tokens (with their user) are kept in a
+small in-process LRU for ``settings.AUTH_TOKEN_LOCAL_TTL`` seconds and in
+the shared default cache for ``settings.AUTH_TOKEN_CACHE_TTL`` seconds, so
+only a cold token costs the ``authtoken_token JOIN auth_user`` query.
+
+Deleting a token (logout) or deactivating its user removes the shared
+entry and this process's copy once the write commits; other processes
+stop accepting it when their short-lived local copy expires. Cache keys
+hold a digest of the token, never the token itself, and cached users are
+loaded without their password hash.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+def cache_key(key):
+    return 'auth:token:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class LocalTokenCache:
+    """Thread-safe LRU of recently resolved tokens with a per-entry expiry"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, token = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, key, token):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + settings.AUTH_TOKEN_LOCAL_TTL, token)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_TOKEN_LOCAL_SIZE:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_tokens = LocalTokenCache()
+
+
+def forget_tokens(keys):
+    """Drop tokens from the shared cache and this process"""
+    hashed = [cache_key(key) for key in keys]
+    cache.delete_many(hashed)
+    for key in hashed:
+        local_tokens.discard(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``TokenAuthentication`` that caches the token-to-user lookup"""
+
+    def authenticate_credentials(self, key):
+        hashed = cache_key(key)
+        token = local_tokens.get(hashed)
+        if token is None:
+            token = cache.get(hashed)
+            if token is None:
+                try:
+                    token = Token.objects.select_related('user').defer('user__password').get(key=key)
+                except Token.DoesNotExist:
+                    raise exceptions.AuthenticationFailed(_('Invalid token.'))
+                cache.set(hashed, token, settings.AUTH_TOKEN_CACHE_TTL)
+            local_tokens.set(hashed, token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        # Requests may modify their user; keep the cached copy pristine
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token.user, token
@@ -0,0 +1,125 @@
+"""
+Write-behind queues shared by API usage logging and chat persistence.
+
+A ``WriteBehindBuffer`` holds unsaved rows in a bounded in-process deque. A
+daemon thread writes them every ``flush_interval`` seconds, sooner when
+woken, and once more at interpreter exit. When the database falls behind
+the oldest rows are dropped and counted, including rows put back after a
+failed write.
+
+Forked children start with new locks, an empty queue and no flusher: the
+parent's flusher thread does not survive the fork, so a lock it held at
+that moment would otherwise stay locked in the child forever.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from django.db import close_old_connections
+
+
+logger = logging.getLogger('krishi_sakhi')
+
+
+class WriteBehindBuffer:
+    """Bounded queue of unsaved rows written by a background thread
+
+    Subclasses provide the ``limit`` and ``flush_interval`` properties and
+    ``flush()``, which writes what ``_take()`` returns and hands anything
+    it could not write to ``_requeue()``.
+    """
+
+    thread_name = 'write-behind'
+    item_name = 'rows'
+
+    def __init__(self):
+        self._create_locks()
+        self._reset()
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _create_locks(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def _after_fork(self):
+        self._create_locks()
+        self._reset()
+
+    def _reset(self):
+        """Start with an empty queue and no flusher thread"""
+        self._queue = deque(maxlen=self.limit)
+        self.dropped = 0
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    def __len__(self):
+        return len(self._queue)
+
+    # Queue operations; callers hold ``_lock``
+
+    def _push(self, item):
+        """Queue ``item``, dropping the oldest when full; returns the queue length"""
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(item)
+        return len(self._queue)
+
+    def _take(self):
+        """Empty the queue; returns its items and how many were dropped since the last take"""
+        items = list(self._queue)
+        self._queue.clear()
+        dropped, self.dropped = self.dropped, 0
+        return items, dropped
+
+    def _requeue(self, items):
+        """Put back ``items`` whose write failed, ahead of newer ones
+
+        When they do not all fit, the oldest of them are dropped.
+        """
+        room = self._queue.maxlen - len(self._queue)
+        kept = items[len(items) - room:] if room else []
+        self.dropped += len(items) - len(kept)
+        self._queue.extendleft(reversed(kept))
+
+    def _report_dropped(self, dropped):
+        if dropped:
+            logger.warning("Write-behind buffer was full; dropped %d %s", dropped, self.item_name)
+
+    # Background flushing
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass  # Already logged; the rows stay queued for the next tick
+            finally:
+                close_old_connections()
+
+    def _final_flush(self):
+        self.flush()
+
+    def close(self):
+        """Stop the flusher and write everything still queued"""
+        self._stop.set()
+        self._wake.set()
+        try:
+            self._final_flush()
+        except Exception:
+            logger.exception("Dropping %d %s at shutdown", len(self), self.item_name)
@@ -0,0 +1,95 @@
+"""
+Process-local, cached access to ``SystemConfiguration``.
+
+All active keys are loaded with one query on first use into a read-only
+dict. Saving or deleting a row bumps a version counter in the default
+cache once the transaction commits; each process compares its snapshot's
+version with the counter at most every
+``settings.SYSTEM_CONFIG_CHECK_INTERVAL`` seconds and reloads when it
+changed. Between reloads a lookup costs no query.
+"""
+import json
+import threading
+import time
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import SystemConfiguration
+from .versioning import bump_version
+
+
+VERSION_KEY = 'core:system_config:version'
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'off', ''}
+
+
+class SystemConfig:
+    """Typed, cached getters for ``SystemConfiguration`` values"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = None
+        self._version = None
+        self._checked = 0.0
+
+    def values(self):
+        """Return the read-only mapping of active keys to raw values"""
+        now = time.monotonic()
+        if self._values is not None and now - self._checked < settings.SYSTEM_CONFIG_CHECK_INTERVAL:
+            return self._values
+
+        version = cache.get(VERSION_KEY, 0)
+        with self._lock:
+            if self._values is None or version != self._version:
+                self._values = MappingProxyType(dict(
+                    SystemConfiguration.objects.filter(is_active=True).values_list('key', 'value')
+                ))
+                self._version = version
+            self._checked = now
+        return self._values
+
+    def invalidate(self):
+        """Drop this process's snapshot and tell other processes to reload"""
+        bump_version(VERSION_KEY)
+        with self._lock:
+            self._values = None
+
+    # Typed getters
+
+    def get(self, key, default=None):
+        return self.values().get(key, default)
+
+    def get_int(self, key, default=None):
+        try:
+            return int(self.values()[key])
+        except (KeyError, ValueError):
+            return default
+
+    def get_float(self, key, default=None):
+        try:
+            return float(self.values()[key])
+        except (KeyError, ValueError):
+            return default
+
+    def get_bool(self, key, default=False):
+        value = self.values().get(key)
+        if value is None:
+            return default
+        value = value.strip().lower()
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+        return default
+
+    def get_json(self, key, default=None):
+        try:
+            return json.loads(self.values()[key])
+        except (KeyError, ValueError):
+            return default
+
+
+system_config = SystemConfig()
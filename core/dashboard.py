@@ -0,0 +1,200 @@
+"""
+The home screen dashboard.
+
+One request returns the user's profile, farm, recent diary entries,
+month-to-date income and expense, active weather alerts and last chat
+session. Sections missing from the cache are loaded together: the user row
+with ``select_related`` profile and farm and the finance totals as
+aggregate subqueries, plus one prefetch each for diary, alerts and chat,
+so a full rebuild is a fixed four queries however much data the user has.
+
+Each section is cached separately under a per-user, per-section version.
+Writes bump only the versions of the sections they touch, so a diary entry
+rebuilds the diary section and nothing else. Weather alerts are created in
+bulk for many users, so the alert run bumps one shared version instead;
+alerts and chat sections also expire after ``DASHBOARD_LIVE_TTL`` since
+they change with time and through bulk updates.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, OuterRef, Prefetch, Subquery, Sum
+from django.utils import timezone
+
+from chatbot.models import ChatSession
+from farm.models import DiaryEntry
+from finance.models import FinancialLedgerEntry
+from finance.summary import money
+
+from .models import WeatherAlert
+from .versioning import bump_version
+
+
+SECTIONS = ('profile', 'farm', 'diary', 'finance', 'alerts', 'chat')
+LIVE_SECTIONS = {'alerts', 'chat'}
+ALERTS_VERSION_KEY = 'dashboard:alerts:version'
+
+
+def version_key(user_id, section):
+    return f'dashboard:version:{user_id}:{section}'
+
+
+def invalidate(user_id, *sections):
+    """Make the given dashboard sections of ``user_id`` stale"""
+    for section in sections:
+        bump_version(version_key(user_id, section))
+
+
+def invalidate_alerts():
+    """Make the alerts section of every user stale"""
+    bump_version(ALERTS_VERSION_KEY)
+
+
+def section_keys(user_id, today):
+    """Return ``{section: cache key}`` for the current versions"""
+    version_keys = {section: version_key(user_id, section) for section in SECTIONS}
+    versions = cache.get_many([*version_keys.values(), ALERTS_VERSION_KEY])
+    keys = {}
+    for section, key in version_keys.items():
+        version = versions.get(key, 0)
+        if section == 'alerts':
+            version = f'{version}.{versions.get(ALERTS_VERSION_KEY, 0)}'
+        elif section == 'finance':
+            # Month-to-date totals roll over with the date
+            version = f'{version}.{today.isoformat()}'
+        keys[section] = f'dashboard:{user_id}:{section}:{version}'
+    return keys
+
+
+def get_dashboard(user):
+    """Return the dashboard of ``user``, rebuilding only stale sections"""
+    today = timezone.localdate()
+    keys = section_keys(user.pk, today)
+    cached = cache.get_many(keys.values())
+    dashboard = {section: cached[key] for section, key in keys.items() if key in cached}
+    missing = [section for section in SECTIONS if section not in dashboard]
+    if missing:
+        built = build_sections(user.pk, missing, today)
+        dashboard.update(built)
+        for section, value in built.items():
+            timeout = settings.DASHBOARD_LIVE_TTL if section in LIVE_SECTIONS else settings.DASHBOARD_CACHE_TTL
+            cache.set(keys[section], value, timeout)
+    return {section: dashboard[section] for section in SECTIONS}
+
+
+def ledger_total(entry_type, start, end):
+    entries = (
+        FinancialLedgerEntry.objects
+        .filter(user=OuterRef('pk'), entry_type=entry_type, date__gte=start, date__lte=end)
+        .order_by()
+        .values('user')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    return Subquery(entries, output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def build_sections(user_id, sections, today):
+    """Load ``sections`` for one user with a fixed number of queries"""
+    users = User.objects.filter(pk=user_id)
+    if 'profile' in sections:
+        users = users.select_related('userprofile')
+    if 'farm' in sections:
+        users = users.select_related('farmprofile')
+    month_start = today.replace(day=1)
+    if 'finance' in sections:
+        users = users.annotate(
+            month_income=ledger_total('income', month_start, today),
+            month_expense=ledger_total('expense', month_start, today),
+        )
+    if 'diary' in sections:
+        users = users.prefetch_related(Prefetch(
+            'diary_entries',
+            queryset=DiaryEntry.objects
+            .order_by('-date', '-created_at')
+            .only('id', 'user', 'date', 'activity_type', 'crop_involved', 'notes')[:settings.DASHBOARD_DIARY_LIMIT],
+            to_attr='recent_diary',
+        ))
+    if 'alerts' in sections:
+        now = timezone.now()
+        users = users.prefetch_related(Prefetch(
+            'weather_alerts',
+            queryset=WeatherAlert.objects
+            .filter(valid_from__lte=now, valid_until__gt=now)
+            .order_by('-valid_until', '-id')
+            .only('id', 'user', 'alert_type', 'severity', 'title', 'valid_until')[:settings.DASHBOARD_ALERT_LIMIT],
+            to_attr='active_alerts',
+        ))
+    if 'chat' in sections:
+        users = users.prefetch_related(Prefetch(
+            'chat_sessions',
+            queryset=ChatSession.objects
+            .order_by('-last_activity', '-id')
+            .annotate(message_count=Count('messages'))
+            .only('id', 'user', 'session_id', 'language', 'last_activity')[:1],
+            to_attr='last_sessions',
+        ))
+    user = users.get()
+
+    built = {}
+    if 'profile' in sections:
+        profile = getattr(user, 'userprofile', None)
+        built['profile'] = {
+            'username': user.username,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'email': user.email,
+            'phone_number': getattr(profile, 'phone_number', None),
+            'preferred_language': getattr(profile, 'preferred_language', 'en'),
+        }
+    if 'farm' in sections:
+        farm = getattr(user, 'farmprofile', None)
+        built['farm'] = farm and {
+            'location_lat': farm.location_lat,
+            'location_lon': farm.location_lon,
+            'farm_size': farm.farm_size,
+            'primary_crops': farm.primary_crops,
+            'soil_type': farm.soil_type,
+        }
+    if 'diary' in sections:
+        built['diary'] = [
+            {
+                'id': entry.id,
+                'date': entry.date,
+                'activity_type': entry.activity_type,
+                'crop_involved': entry.crop_involved,
+                'notes': entry.notes,
+            }
+            for entry in user.recent_diary
+        ]
+    if 'finance' in sections:
+        income = user.month_income or Decimal('0.00')
+        expense = user.month_expense or Decimal('0.00')
+        built['finance'] = {
+            'month': f'{month_start:%Y-%m}',
+            'income': money(income),
+            'expense': money(expense),
+            'net': money(income - expense),
+        }
+    if 'alerts' in sections:
+        built['alerts'] = [
+            {
+                'id': alert.id,
+                'alert_type': alert.alert_type,
+                'severity': alert.severity,
+                'title': alert.title,
+                'valid_until': alert.valid_until,
+            }
+            for alert in user.active_alerts
+        ]
+    if 'chat' in sections:
+        session = user.last_sessions[0] if user.last_sessions else None
+        built['chat'] = session and {
+            'session_id': session.session_id,
+            'language': session.language,
+            'last_activity': session.last_activity,
+            'message_count': session.message_count,
+        }
+    return built
@@ -0,0 +1,325 @@
+"""
+Outbox delivery of weather alerts over SMS and email.
+
+``enqueue_alerts`` writes one ``AlertDispatch`` row per event, channel and
+recipient in the same run that creates the alerts. The ``dispatch_alerts`` worker
+claims due rows in batches, leasing them by moving ``next_attempt_at``
+forward so a crashed worker's rows are picked up again, and sends them
+from a thread pool. Each thread opens its transport once and reuses the
+connection for its share of the batch; a token bucket per channel keeps
+the combined send rate under ``settings.ALERT_DISPATCH_RATES``.
+
+Outcomes are written back in bulk: sent rows and the alerts' ``is_sent_*``
+flags with one ``UPDATE ... WHERE id IN`` each, failures with exponential
+backoff until ``ALERT_DISPATCH_MAX_ATTEMPTS``. A message sent for an event
+flags every alert of that event whose user shares the recipient, not just
+the alert the outbox row points at.
+
+Transports are chosen with ``ALERT_SMS_TRANSPORT`` and
+``ALERT_EMAIL_TRANSPORT``. A transport has ``name``, ``open()``,
+``send(recipient, subject, body)`` and ``close()``.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import AlertDispatch, WeatherAlert
+from .usage import log_api_usage
+
+
+logger = logging.getLogger('krishi_sakhi')
+
+SENT_FLAGS = {'sms': 'is_sent_sms', 'email': 'is_sent_email'}
+RECIPIENT_FIELDS = {'sms': 'user__userprofile__phone_number', 'email': 'user__email'}
+SMS_MAX_LENGTH = 320
+
+
+class DispatchError(Exception):
+    """Raised by a transport when a message could not be delivered"""
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+# Transports
+
+class EmailTransport:
+    """Send through Django's configured email backend over one connection"""
+
+    name = 'email'
+
+    def open(self):
+        self.connection = get_connection()
+        self.connection.open()
+
+    def send(self, recipient, subject, body):
+        try:
+            EmailMessage(subject, body, to=[recipient], connection=self.connection).send()
+        except Exception as exc:
+            raise DispatchError(str(exc)) from exc
+
+    def close(self):
+        self.connection.close()
+
+
+class TwilioSMSTransport:
+    """Send SMS with Twilio; the client's HTTP session is reused"""
+
+    name = 'twilio'
+
+    def open(self):
+        from twilio.rest import Client
+
+        self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+    def send(self, recipient, subject, body):
+        from twilio.base.exceptions import TwilioRestException
+
+        try:
+            self.client.messages.create(to=recipient, from_=settings.TWILIO_PHONE_NUMBER, body=body)
+        except TwilioRestException as exc:
+            # 4xx other than rate limiting means the message itself is bad
+            raise DispatchError(str(exc), permanent=400 <= exc.status < 500 and exc.status != 429) from exc
+        except Exception as exc:
+            raise DispatchError(str(exc)) from exc
+
+    def close(self):
+        self.client = None
+
+
+class LocmemSMSTransport:
+    """Keep sent SMS in ``LocmemSMSTransport.outbox``; for development and tests"""
+
+    name = 'locmem'
+    outbox = []
+
+    def open(self):
+        pass
+
+    def send(self, recipient, subject, body):
+        self.outbox.append((recipient, body))
+        logger.info("SMS to %s: %s", recipient, body)
+
+    def close(self):
+        pass
+
+
+@lru_cache(maxsize=None)
+def _load_transport_class(path):
+    return import_string(path)
+
+
+def get_transport(channel):
+    """Return a new, unopened transport instance for ``channel``"""
+    path = settings.ALERT_SMS_TRANSPORT if channel == 'sms' else settings.ALERT_EMAIL_TRANSPORT
+    return _load_transport_class(path)()
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing ``rate`` acquisitions per second"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Enqueueing
+
+def format_message(alert, channel):
+    """Return ``(subject, body)`` for an alert on ``channel``"""
+    if channel == 'sms':
+        return '', f"{alert.title}: {alert.message}"[:SMS_MAX_LENGTH]
+    return alert.title, alert.message
+
+
+def enqueue_alerts(alerts):
+    """Create outbox rows for saved ``alerts``; returns how many were queued
+
+    Messages are deduplicated per event: a phone number or email address
+    shared by several alerted users receives one message per event.
+    """
+    user_ids = {alert.user_id for alert in alerts}
+    contacts = {
+        user_id: (email, phone)
+        for user_id, email, phone in User.objects.filter(id__in=user_ids)
+        .values_list('id', 'email', 'userprofile__phone_number')
+    }
+    dispatches = {}
+    for alert in alerts:
+        email, phone = contacts.get(alert.user_id, (None, None))
+        for channel, recipient in (('sms', phone), ('email', email)):
+            key = (alert.event_id or ('alert', alert.id), channel, recipient)
+            if recipient and key not in dispatches:
+                dispatches[key] = AlertDispatch(
+                    alert=alert, event_id=alert.event_id, channel=channel, recipient=recipient
+                )
+    AlertDispatch.objects.bulk_create(dispatches.values(), batch_size=1000, ignore_conflicts=True)
+    return len(dispatches)
+
+
+# Delivery
+
+Outcome = namedtuple('Outcome', ['dispatch', 'error', 'permanent'])
+
+
+class DispatchWorker:
+    """Claims due outbox rows and delivers them concurrently"""
+
+    def __init__(self, workers=None, batch_size=None):
+        self.workers = workers or settings.ALERT_DISPATCH_WORKERS
+        self.batch_size = batch_size or settings.ALERT_DISPATCH_BATCH_SIZE
+        self.buckets = {
+            channel: TokenBucket(rate) for channel, rate in settings.ALERT_DISPATCH_RATES.items()
+        }
+
+    def claim(self):
+        """Lease up to ``batch_size`` due rows to this worker"""
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                AlertDispatch.objects
+                .filter(Q(status='pending') | Q(status='sending'), next_attempt_at__lte=now)
+                .order_by('next_attempt_at')
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            AlertDispatch.objects.filter(id__in=ids).update(
+                status='sending', next_attempt_at=now + timedelta(seconds=settings.ALERT_DISPATCH_LEASE)
+            )
+        return list(AlertDispatch.objects.filter(id__in=ids).select_related('alert'))
+
+    def run_once(self):
+        """Deliver one batch; returns ``(sent, failed)`` counts"""
+        dispatches = self.claim()
+        if not dispatches:
+            return 0, 0
+
+        by_channel = defaultdict(list)
+        for dispatch in dispatches:
+            by_channel[dispatch.channel].append(dispatch)
+
+        started = time.perf_counter()
+        outcomes = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(self.send_all, channel, share)
+                for channel, items in by_channel.items()
+                for share in self.split(items)
+            ]
+            for future in futures:
+                outcomes.extend(future.result())
+
+        self.record(outcomes)
+        failed = sum(1 for outcome in outcomes if outcome.error)
+        if by_channel.get('sms'):
+            sms_failed = sum(1 for o in outcomes if o.error and o.dispatch.channel == 'sms')
+            log_api_usage(
+                'twilio', 'alerts/sms', 500 if sms_failed else 200, (time.perf_counter() - started) * 1000,
+                request_data={'messages': len(by_channel['sms']), 'failed': sms_failed},
+            )
+        return len(outcomes) - failed, failed
+
+    def split(self, items):
+        """Split ``items`` into one share per thread"""
+        shares = min(self.workers, len(items))
+        return [items[i::shares] for i in range(shares)]
+
+    def send_all(self, channel, dispatches):
+        """Send ``dispatches`` over one transport connection"""
+        transport = get_transport(channel)
+        try:
+            transport.open()
+        except Exception as exc:
+            return [Outcome(dispatch, str(exc), False) for dispatch in dispatches]
+
+        bucket = self.buckets.get(channel)
+        outcomes = []
+        try:
+            for dispatch in dispatches:
+                if bucket is not None:
+                    bucket.acquire()
+                subject, body = format_message(dispatch.alert, channel)
+                try:
+                    transport.send(dispatch.recipient, subject, body)
+                except DispatchError as exc:
+                    outcomes.append(Outcome(dispatch, str(exc), exc.permanent))
+                else:
+                    outcomes.append(Outcome(dispatch, None, False))
+        finally:
+            transport.close()
+        return outcomes
+
+    def delivered_alert_ids(self, channel, sent):
+        """Ids of the alerts ``sent`` messages delivered, including those deduplicated into them"""
+        alert_ids = {d.alert_id for d in sent}
+        delivered = {(d.event_id, d.recipient) for d in sent if d.event_id}
+        if delivered:
+            field = RECIPIENT_FIELDS[channel]
+            alert_ids.update(
+                alert_id
+                for alert_id, event_id, recipient in WeatherAlert.objects.filter(
+                    event_id__in={event_id for event_id, _ in delivered},
+                    **{f'{field}__in': {recipient for _, recipient in delivered}},
+                ).values_list('id', 'event_id', field)
+                if (event_id, recipient) in delivered
+            )
+        return alert_ids
+
+    def record(self, outcomes):
+        """Write the batch's outcomes back in bulk"""
+        now = timezone.now()
+        sent = [outcome.dispatch for outcome in outcomes if not outcome.error]
+        retries = []
+        with transaction.atomic():
+            if sent:
+                AlertDispatch.objects.filter(id__in=[d.id for d in sent]).update(status='sent', sent_at=now)
+                for channel, flag in SENT_FLAGS.items():
+                    alert_ids = self.delivered_alert_ids(channel, [d for d in sent if d.channel == channel])
+                    if alert_ids:
+                        WeatherAlert.objects.filter(id__in=alert_ids).update(**{flag: True})
+
+            for outcome in outcomes:
+                if not outcome.error:
+                    continue
+                dispatch = outcome.dispatch
+                dispatch.attempts += 1
+                dispatch.last_error = outcome.error
+                if outcome.permanent or dispatch.attempts >= settings.ALERT_DISPATCH_MAX_ATTEMPTS:
+                    dispatch.status = 'failed'
+                else:
+                    dispatch.status = 'pending'
+                    delay = settings.ALERT_DISPATCH_RETRY_DELAY * 2 ** (dispatch.attempts - 1)
+                    dispatch.next_attempt_at = now + timedelta(seconds=delay)
+                retries.append(dispatch)
+            if retries:
+                AlertDispatch.objects.bulk_update(
+                    retries, ['status', 'attempts', 'next_attempt_at', 'last_error'], batch_size=500
+                )
@@ -0,0 +1,97 @@
+"""
+Geohash encoding used to bucket nearby coordinates into shared tiles.
+
+A geohash of precision 5 covers roughly 4.9 km x 4.9 km, 6 about
+1.2 km x 0.6 km. Farms in the same tile share cached weather and are
+scanned together by location-based jobs.
+"""
+import numpy as np
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+DECODE_MAP = {char: index for index, char in enumerate(BASE32)}
+
+
+def encode(lat, lon, precision=5):
+    """Return the geohash of ``(lat, lon)`` with ``precision`` characters"""
+    lat, lon = float(lat), float(lon)
+    if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        raise ValueError(f"Invalid coordinates: {lat}, {lon}")
+
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        target, interval = (lon, lon_range) if even else (lat, lat_range)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if target >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def bounds(geohash):
+    """Return ``(min_lat, min_lon, max_lat, max_lon)`` of a geohash tile"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        try:
+            value = DECODE_MAP[char]
+        except KeyError:
+            raise ValueError(f"Invalid geohash: {geohash!r}")
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def decode(geohash):
+    """Return the ``(lat, lon)`` centre of a geohash tile"""
+    min_lat, min_lon, max_lat, max_lon = bounds(geohash)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+
+def encode_many(lats, lons, precision=5):
+    """Vectorised ``encode`` for NumPy arrays of coordinates
+
+    Returns an array of geohash strings, one per coordinate pair.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if np.any(np.abs(lats) > 90) or np.any(np.abs(lons) > 180):
+        raise ValueError("Invalid coordinates")
+
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    # Cell index along each axis; the upper edge belongs to the last cell
+    lat_cells = np.minimum(((lats + 90) / 180 * (1 << lat_bits)).astype(np.int64), (1 << lat_bits) - 1)
+    lon_cells = np.minimum(((lons + 180) / 360 * (1 << lon_bits)).astype(np.int64), (1 << lon_bits) - 1)
+
+    # Interleave, longitude first, most significant bit first
+    code = np.zeros(lats.shape, dtype=np.int64)
+    for bit in range(total_bits):
+        axis, bits = (lon_cells, lon_bits) if bit % 2 == 0 else (lat_cells, lat_bits)
+        code = (code << 1) | ((axis >> (bits - 1 - bit // 2)) & 1)
+
+    alphabet = np.array(list(BASE32))
+    chars = [alphabet[(code >> (5 * (precision - 1 - i))) & 31] for i in range(precision)]
+    return np.array([''.join(parts) for parts in zip(*chars)]) if len(code) else np.array([], dtype=str)
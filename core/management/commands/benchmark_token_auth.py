@@ -0,0 +1,53 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.authentication import CachedTokenAuthentication, forget_tokens, local_tokens
+
+
+class Command(BaseCommand):
+    help = "Time token lookups and user saves, uncached against cached (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=1000, help="Timed calls per measurement")
+
+    def handle(self, *args, **options):
+        calls = options['calls']
+        self.stdout.write(f"{'':<26} {'ms/call':>9} {'queries/call':>13}")
+        with transaction.atomic():
+            user = User.objects.create_user('token-benchmark')
+            key = Token.objects.create(user=user).key
+            forget_tokens([key])
+            try:
+                self.report('TokenAuthentication', calls,
+                            lambda: TokenAuthentication().authenticate_credentials(key))
+                self.report('CachedTokenAuthentication', calls,
+                            lambda: CachedTokenAuthentication().authenticate_credentials(key))
+
+                def edit_name():
+                    user.first_name = 'Anu' if user.first_name != 'Anu' else 'Asha'
+                    user.save(update_fields=['first_name'])
+
+                self.report('save, name edit', calls, edit_name)
+                self.report('save, deactivation', calls, lambda: self.toggle_active(user))
+            finally:
+                forget_tokens([key])
+                local_tokens.clear()
+                transaction.set_rollback(True)
+
+    def toggle_active(self, user):
+        user.is_active = not user.is_active
+        user.save(update_fields=['is_active'])
+
+    def report(self, label, calls, call):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(calls):
+                call()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label:<26} {elapsed / calls * 1000:>9.3f} {len(queries) / calls:>13.2f}")
@@ -0,0 +1,55 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from core.alerts import FEATURES, build_alerts, build_events, evaluate, group_by_tile
+
+
+class Command(BaseCommand):
+    help = "Time alert grouping and evaluation on synthetic farms (no database or network)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--farms',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help="Farm counts to benchmark",
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        self.stdout.write(f"{'farms':>8} {'tiles':>6} {'group':>8} {'evaluate':>9} {'build':>8} {'alerts':>7}")
+        for count in options['farms']:
+            # Farms spread over Kerala
+            lats = rng.uniform(8.2, 12.8, count)
+            lons = rng.uniform(74.8, 77.4, count)
+
+            started = time.perf_counter()
+            tiles, tile_index = group_by_tile(lats, lons)
+            grouped = time.perf_counter()
+
+            features = np.column_stack([
+                rng.gamma(1.0, 6.0, len(tiles)),  # rain mm/h
+                rng.normal(22, 4, len(tiles)),  # temp_min
+                rng.normal(33, 4, len(tiles)),  # temp_max
+                rng.gamma(2.0, 3.0, len(tiles)),  # wind m/s
+            ])
+            if features.shape[1] != len(FEATURES):
+                raise CommandError(
+                    f"Synthetic weather has {features.shape[1]} columns but alerts expect {len(FEATURES)}: {FEATURES}"
+                )
+            levels = evaluate(features)
+            evaluated = time.perf_counter()
+
+            farms = [(0, lat, lon) for lat, lon in zip(lats.tolist(), lons.tolist())]
+            events = build_events(tiles, features, [{}] * len(tiles), levels)
+            alerts = build_alerts(farms, tile_index, features, events, levels)
+            built = time.perf_counter()
+
+            self.stdout.write(
+                f"{count:>8} {len(tiles):>6} {grouped - started:>7.3f}s "
+                f"{evaluated - grouped:>8.4f}s {built - evaluated:>7.3f}s {len(alerts):>7}"
+            )
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.dispatch import DispatchWorker
+
+
+class Command(BaseCommand):
+    help = "Deliver queued weather alerts over SMS and email"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Deliver everything that is due, then exit",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help="Sender threads (defaults to ALERT_DISPATCH_WORKERS)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help="Rows claimed per batch (defaults to ALERT_DISPATCH_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help="Seconds to wait when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        worker = DispatchWorker(workers=options['workers'], batch_size=options['batch_size'])
+        total_sent = total_failed = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                sent, failed = worker.run_once()
+                if sent or failed:
+                    total_sent += sent
+                    total_failed += failed
+                    self.stdout.write(
+                        f"Sent {sent}, failed {failed} in {time.perf_counter() - started:.2f}s"
+                    )
+                    continue
+                if options['once']:
+                    break
+                close_old_connections()
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Delivered {total_sent} messages, {total_failed} failed"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.alerts import run_alerts
+
+
+class Command(BaseCommand):
+    help = "Fetch weather per tile and create weather alerts for every farm"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Evaluate the rules without saving alerts",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help="Concurrent tile fetches (defaults to WEATHER_ALERT_FETCH_WORKERS)",
+        )
+
+    def handle(self, *args, **options):
+        result = run_alerts(dry_run=options['dry_run'], workers=options['workers'])
+        verb = "Would create" if options['dry_run'] else "Created"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result.alerts} alerts for {result.farms} farms in {result.tiles} tiles "
+            f"({result.failed_tiles} tiles failed) in {result.elapsed:.2f}s"
+        ))
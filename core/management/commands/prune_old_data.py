@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from core.retention import get_policies, prune
+
+
+class Command(BaseCommand):
+    help = "Delete or archive rows past their retention period in bounded chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            help="Model label to prune, e.g. core.APIUsageLog (repeatable, defaults to all)",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help="Primary keys per delete window (defaults to RETENTION_CHUNK_SIZE)",
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help="Seconds to sleep between windows to let other writers in",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Count expired rows without deleting or archiving",
+        )
+
+    def handle(self, *args, **options):
+        for policy in get_policies(options['model']):
+            result = prune(
+                policy,
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+                pause=options['pause'],
+            )
+            verb = "Would delete" if options['dry_run'] else "Deleted"
+            message = f"{verb} {result.deleted} {policy.model} rows older than {policy.days} days"
+            if result.archive_path:
+                message += f", archived to {result.archive_path}"
+            self.stdout.write(self.style.SUCCESS(message))
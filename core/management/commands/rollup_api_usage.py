@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.usage import rollup_recent
+
+
+class Command(BaseCommand):
+    help = "Aggregate APIUsageLog into hourly APIUsageRollup rows (run hourly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=2,
+            help="Hours to recompute, counting the current one",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rollup_recent(options['hours'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} rollups in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from chatbot.models import KnowledgeArticle, tag_index
+from farm.models import FarmProfile, crop_index
+
+
+TERM_INDEXES = {
+    'crops': (FarmProfile, crop_index),
+    'tags': (KnowledgeArticle, tag_index),
+}
+
+
+class Command(BaseCommand):
+    help = "Rebuild normalised crop and tag links from primary_crops and tags"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            choices=sorted(TERM_INDEXES),
+            help="Rebuild a single index (defaults to all)",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        names = [options['only']] if options['only'] else sorted(TERM_INDEXES)
+        for name in names:
+            model, index = TERM_INDEXES[name]
+            started = time.perf_counter()
+            synced = 0
+            batch = []
+            owners = model.objects.order_by('pk').only('pk', index.source_field)
+            for owner in owners.iterator(chunk_size=options['batch_size']):
+                batch.append(owner)
+                if len(batch) >= options['batch_size']:
+                    index.sync(batch)
+                    synced += len(batch)
+                    batch = []
+            index.sync(batch)
+            synced += len(batch)
+            self.stdout.write(self.style.SUCCESS(
+                f"Synced {name} for {synced} rows in {time.perf_counter() - started:.2f}s"
+            ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertDispatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('sms', 'SMS'), ('email', 'Email')], max_length=10)),
+                ('recipient', models.CharField(help_text='Phone number or email address', max_length=254)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the entry may next be claimed; a lease expiry while sending')),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('alert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispatches', to='core.weatheralert')),
+            ],
+            options={
+                'verbose_name': 'Alert Dispatch',
+                'verbose_name_plural': 'Alert Dispatches',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='alert_dispatch_due')],
+                'constraints': [models.UniqueConstraint(fields=('alert', 'channel'), name='alert_dispatch_unique_channel')],
+            },
+        ),
+    ]
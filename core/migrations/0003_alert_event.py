@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alert_dispatch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='weatheralert',
+            name='weather_data',
+            field=models.JSONField(blank=True, help_text='Raw weather data for alerts without an event; see event.weather_data', null=True),
+        ),
+        migrations.CreateModel(
+            name='AlertEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tile', models.CharField(help_text='Geohash of the weather tile', max_length=12)),
+                ('alert_type', models.CharField(max_length=20)),
+                ('severity', models.CharField(max_length=10)),
+                ('weather_data', models.JSONField(help_text='Raw weather data that triggered this event')),
+                ('valid_from', models.DateTimeField()),
+                ('valid_until', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Alert Event',
+                'verbose_name_plural': 'Alert Events',
+                'indexes': [models.Index(fields=['tile', 'alert_type', 'valid_until'], name='alert_event_active')],
+            },
+        ),
+        migrations.AddField(
+            model_name='alertdispatch',
+            name='event',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dispatches', to='core.alertevent'),
+        ),
+        migrations.AddField(
+            model_name='weatheralert',
+            name='event',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='core.alertevent'),
+        ),
+        migrations.AddConstraint(
+            model_name='alertdispatch',
+            constraint=models.UniqueConstraint(fields=('event', 'channel', 'recipient'), name='alert_dispatch_unique_recipient'),
+        ),
+        migrations.AddConstraint(
+            model_name='weatheralert',
+            constraint=models.UniqueConstraint(fields=('user', 'event'), name='weather_alert_unique_event'),
+        ),
+    ]
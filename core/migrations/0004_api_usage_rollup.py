@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:21
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alert_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APIUsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(help_text='Start of the hour')),
+                ('api_type', models.CharField(choices=[('gemini', 'Gemini AI'), ('openweather', 'OpenWeatherMap'), ('twilio', 'Twilio SMS')], max_length=20)),
+                ('endpoint', models.CharField(max_length=200)),
+                ('request_count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('p50_response_ms', models.PositiveIntegerField(default=0)),
+                ('p95_response_ms', models.PositiveIntegerField(default=0)),
+                ('tokens_used', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'API Usage Rollup',
+                'verbose_name_plural': 'API Usage Rollups',
+                'ordering': ['-hour'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='apiusagelog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='apiusagelog',
+            index=models.Index(fields=['timestamp'], name='api_usage_log_timestamp'),
+        ),
+        migrations.AddConstraint(
+            model_name='apiusagerollup',
+            constraint=models.UniqueConstraint(fields=('hour', 'api_type', 'endpoint'), name='api_usage_rollup_unique'),
+        ),
+    ]
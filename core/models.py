@@ -1,5 +1,30 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class AlertEvent(models.Model):
+    """A weather event in one tile, shared by the alerts of every farm in it"""
+    
+    tile = models.CharField(max_length=12, help_text="Geohash of the weather tile")
+    alert_type = models.CharField(max_length=20)
+    severity = models.CharField(max_length=10)
+    weather_data = models.JSONField(
+        help_text="Raw weather data that triggered this event"
+    )
+    valid_from = models.DateTimeField()
+    valid_until = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.alert_type} ({self.severity}) in {self.tile}"
+    
+    class Meta:
+        verbose_name = "Alert Event"
+        verbose_name_plural = "Alert Events"
+        indexes = [
+            models.Index(fields=['tile', 'alert_type', 'valid_until'], name='alert_event_active'),
+        ]
 
 
 class WeatherAlert(models.Model):
@@ -24,12 +49,21 @@ class WeatherAlert(models.Model):
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='weather_alerts')
+    event = models.ForeignKey(
+        AlertEvent, 
+        on_delete=models.CASCADE, 
+        null=True, 
+        blank=True,
+        related_name='alerts'
+    )
     alert_type = models.CharField(max_length=20, choices=ALERT_TYPES)
     severity = models.CharField(max_length=10, choices=SEVERITY_LEVELS)
     title = models.CharField(max_length=200)
     message = models.TextField()
     weather_data = models.JSONField(
-        help_text="Raw weather data that triggered this alert"
+        null=True, 
+        blank=True,
+        help_text="Raw weather data for alerts without an event; see event.weather_data"
     )
     location_lat = models.DecimalField(max_digits=10, decimal_places=8)
     location_lon = models.DecimalField(max_digits=11, decimal_places=8)
@@ -46,6 +80,62 @@ class WeatherAlert(models.Model):
         verbose_name = "Weather Alert"
         verbose_name_plural = "Weather Alerts"
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'event'], name='weather_alert_unique_event'),
+        ]
+
+
+class AlertDispatch(models.Model):
+    """Outbox entry for delivering a weather alert over one channel"""
+    
+    CHANNELS = [
+        ('sms', 'SMS'),
+        ('email', 'Email'),
+    ]
+    
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    alert = models.ForeignKey(WeatherAlert, on_delete=models.CASCADE, related_name='dispatches')
+    event = models.ForeignKey(
+        AlertEvent, 
+        on_delete=models.CASCADE, 
+        null=True, 
+        blank=True,
+        related_name='dispatches'
+    )
+    channel = models.CharField(max_length=10, choices=CHANNELS)
+    recipient = models.CharField(max_length=254, help_text="Phone number or email address")
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="When the entry may next be claimed; a lease expiry while sending"
+    )
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} ({self.status})"
+    
+    class Meta:
+        verbose_name = "Alert Dispatch"
+        verbose_name_plural = "Alert Dispatches"
+        constraints = [
+            models.UniqueConstraint(fields=['alert', 'channel'], name='alert_dispatch_unique_channel'),
+            # One message per recipient and event, even when several farms share a phone or email
+            models.UniqueConstraint(
+                fields=['event', 'channel', 'recipient'], name='alert_dispatch_unique_recipient'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='alert_dispatch_due'),
+        ]
 
 
 class APIUsageLog(models.Model):
@@ -71,7 +161,7 @@ class APIUsageLog(models.Model):
     response_time_ms = models.IntegerField(help_text="Response time in milliseconds")
     tokens_used = models.IntegerField(null=True, blank=True, help_text="For AI APIs")
     error_message = models.TextField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     
     def __str__(self):
         return f"{self.api_type} - {self.response_status} at {self.timestamp}"
@@ -80,6 +170,34 @@ class APIUsageLog(models.Model):
         verbose_name = "API Usage Log"
         verbose_name_plural = "API Usage Logs"
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp'], name='api_usage_log_timestamp'),
+        ]
+
+
+class APIUsageRollup(models.Model):
+    """Hourly API usage aggregates per API and endpoint"""
+    
+    hour = models.DateTimeField(help_text="Start of the hour")
+    api_type = models.CharField(max_length=20, choices=APIUsageLog.API_TYPES)
+    endpoint = models.CharField(max_length=200)
+    request_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    p50_response_ms = models.PositiveIntegerField(default=0)
+    p95_response_ms = models.PositiveIntegerField(default=0)
+    tokens_used = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.api_type} {self.endpoint} at {self.hour}: {self.request_count} calls"
+    
+    class Meta:
+        verbose_name = "API Usage Rollup"
+        verbose_name_plural = "API Usage Rollups"
+        ordering = ['-hour']
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'api_type', 'endpoint'], name='api_usage_rollup_unique'),
+        ]
 
 
 class SystemConfiguration(models.Model):
@@ -0,0 +1,72 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by the ordering key of the last row served instead of
+an OFFSET, so fetching any page of a long list is a single index range scan
+of ``page size`` rows, however deep the page, and no COUNT(*) is run.
+
+Querysets are walked newest first: every key field is descending and the
+last one must be unique (normally ``id``).
+"""
+import base64
+import binascii
+
+from django.core import exceptions
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+
+def encode_cursor(values):
+    raw = '|'.join(value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, model, fields):
+    """Return the key values in ``cursor`` or raise ``ValidationError``"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        parts = raw.split('|')
+        if len(parts) != len(fields):
+            raise ValueError(cursor)
+        values = [model._meta.get_field(field).to_python(part) for field, part in zip(fields, parts)]
+    except (ValueError, UnicodeDecodeError, binascii.Error, exceptions.ValidationError):
+        values = None
+    if not values or None in values:
+        raise ValidationError({'cursor': "Invalid cursor"})
+    return values
+
+
+def parse_limit(value, default, maximum):
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({'limit': "Must be an integer"})
+    if limit < 1:
+        raise ValidationError({'limit': "Must be positive"})
+    return min(limit, maximum)
+
+
+def after(fields, values):
+    """Filter for rows that sort after ``values`` in descending key order"""
+    condition = Q()
+    for position, field in enumerate(fields):
+        equal = {fields[i]: values[i] for i in range(position)}
+        condition |= Q(**equal, **{f'{field}__lt': values[position]})
+    # The redundant bound on the leading field gives the planner an index range
+    return Q(**{f'{fields[0]}__lte': values[0]}) & condition
+
+
+def keyset_page(queryset, cursor, limit, fields=('timestamp', 'id')):
+    """Return ``(rows, next_cursor)`` for rows after ``cursor``
+
+    ``queryset`` must be ordered by ``fields``, each descending.
+    """
+    if cursor:
+        queryset = queryset.filter(after(fields, decode_cursor(cursor, queryset.model, fields)))
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([getattr(rows[-1], field) for field in fields])
@@ -0,0 +1,138 @@
+"""
+Retention of append-only tables.
+
+Each entry in ``RETENTION_POLICIES`` names a model, the timestamp that
+ages its rows and defaults for how long rows are kept and whether they are
+archived before deletion. The defaults can be overridden per model with an
+active ``SystemConfiguration`` row whose key is ``retention.<app>.<model>``
+and whose value is JSON, e.g. ``{"days": 30, "archive": false}``.
+
+Pruning walks the table in primary-key windows of
+``settings.RETENTION_CHUNK_SIZE`` from the oldest row, deleting the rows of
+each window that are past the cutoff in their own short transaction, so
+locks are held for one window at a time. Rows are inserted roughly in
+timestamp order, so the walk stops at the first window that has rows but
+none expired; stragglers are picked up by a later run.
+
+Archived rows are streamed to a gzip-compressed JSON Lines file under
+``settings.RETENTION_ARCHIVE_DIR`` before each window is deleted.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .config import system_config
+
+
+logger = logging.getLogger('krishi_sakhi')
+
+RetentionPolicy = namedtuple('RetentionPolicy', ['model', 'timestamp_field', 'days', 'archive'])
+
+RETENTION_POLICIES = [
+    RetentionPolicy('core.APIUsageLog', 'timestamp', 90, False),
+    RetentionPolicy('chatbot.ChatMessage', 'timestamp', 365, True),
+]
+
+PruneResult = namedtuple('PruneResult', ['model', 'cutoff', 'deleted', 'archive_path'])
+
+
+def config_key(label):
+    return f'retention.{label.lower()}'
+
+
+def get_policies(labels=None):
+    """Return the retention policies with ``SystemConfiguration`` overrides applied"""
+    policies = [
+        policy for policy in RETENTION_POLICIES
+        if not labels or policy.model.lower() in {label.lower() for label in labels}
+    ]
+    resolved = []
+    for policy in policies:
+        raw = system_config.get(config_key(policy.model))
+        if raw:
+            try:
+                values = json.loads(raw)
+                policy = policy._replace(
+                    days=int(values.get('days', policy.days)),
+                    archive=bool(values.get('archive', policy.archive)),
+                )
+            except (ValueError, TypeError, AttributeError):
+                logger.warning("Ignoring invalid retention config %s=%r", config_key(policy.model), raw)
+        resolved.append(policy)
+    return resolved
+
+
+class ArchiveWriter:
+    """Streams rows of one model to a gzip-compressed JSON Lines file"""
+
+    def __init__(self, label, started):
+        directory = os.path.join(settings.RETENTION_ARCHIVE_DIR, label.lower())
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{started:%Y%m%dT%H%M%S}.jsonl.gz")
+        self._file = gzip.open(self.path, 'at', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+            self._file.write('\n')
+        # Archived rows must be on disk before they are deleted
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def prune(policy, chunk_size=None, dry_run=False, pause=0, now=None):
+    """Delete (and optionally archive) the rows ``policy`` has expired"""
+    model = apps.get_model(policy.model)
+    chunk_size = chunk_size or settings.RETENTION_CHUNK_SIZE
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=policy.days)
+    expired = {f'{policy.timestamp_field}__lt': cutoff}
+
+    bounds = model.objects.order_by().aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return PruneResult(policy.model, cutoff, 0, None)
+
+    archive = ArchiveWriter(policy.model, now) if policy.archive and not dry_run else None
+    deleted = 0
+    try:
+        low = bounds['low']
+        while low <= bounds['high']:
+            window = model.objects.order_by().filter(pk__gte=low, pk__lt=low + chunk_size)
+            low += chunk_size
+            old = window.filter(**expired)
+            if dry_run:
+                count = old.count()
+            else:
+                with transaction.atomic():
+                    if archive is not None:
+                        archive.write(old.values().iterator())
+                    count = old.delete()[1].get(model._meta.label, 0)
+            deleted += count
+            if not count:
+                if window.exists():
+                    break  # Reached rows that are still within retention
+                continue  # A gap in the primary keys
+            if pause:
+                time.sleep(pause)
+    finally:
+        if archive is not None:
+            archive.close()
+
+    path = archive.path if archive is not None and deleted else None
+    if archive is not None and not deleted:
+        os.remove(archive.path)
+    logger.info("Retention: %s deleted %d rows older than %s", policy.model, deleted, cutoff)
+    return PruneResult(policy.model, cutoff, deleted, path)
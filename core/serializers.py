@@ -0,0 +1,20 @@
+from rest_framework import serializers
+
+
+class WeatherQuerySerializer(serializers.Serializer):
+    """Optional coordinates for a weather lookup; defaults to the user's farm"""
+
+    lat = serializers.FloatField(min_value=-90, max_value=90, required=False)
+    lon = serializers.FloatField(min_value=-180, max_value=180, required=False)
+
+    def validate(self, attrs):
+        if ('lat' in attrs) != ('lon' in attrs):
+            raise serializers.ValidationError("Provide both lat and lon")
+        return attrs
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    """Output options for streaming exports"""
+
+    output = serializers.ChoiceField(choices=['csv', 'jsonl'], default='csv')
+    gzip = serializers.BooleanField(default=False)
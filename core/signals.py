@@ -0,0 +1,85 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from chatbot.models import ChatSession
+from farm.models import DiaryEntry, FarmProfile
+from finance.models import FinancialLedgerEntry
+from users.models import UserProfile
+
+from . import dashboard
+from .authentication import forget_tokens
+from .config import system_config
+from .models import SystemConfiguration, WeatherAlert
+
+
+@receiver(post_save, sender=SystemConfiguration)
+@receiver(post_delete, sender=SystemConfiguration)
+def invalidate_system_config(sender, **kwargs):
+    """Reload configuration in every process once the write commits"""
+    transaction.on_commit(system_config.invalidate)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a deleted token (logout) once the delete commits"""
+    key = instance.key
+    transaction.on_commit(lambda: forget_tokens([key]))
+
+
+# User fields that decide what a cached token grants
+TOKEN_USER_FIELDS = ('is_active', 'password', 'is_staff', 'is_superuser')
+
+
+def token_user_values(user):
+    # Read from __dict__ so the deferred password of a cached user is not loaded
+    return tuple(user.__dict__.get(field) for field in TOKEN_USER_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_token_user_values(sender, instance, **kwargs):
+    instance._token_user_values = token_user_values(instance)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, raw=False, **kwargs):
+    """Drop cached copies of the user once deactivation or a new password commits
+
+    Logins, profile edits and other saves that leave ``TOKEN_USER_FIELDS``
+    alone cost no token query.
+    """
+    values = token_user_values(instance)
+    changed = values != instance._token_user_values
+    instance._token_user_values = values
+    if raw or created or not changed:
+        return
+    keys = list(Token.objects.filter(user=instance).values_list('key', flat=True))
+    if keys:
+        transaction.on_commit(lambda: forget_tokens(keys))
+
+
+DASHBOARD_SECTIONS = {
+    User: 'profile',
+    UserProfile: 'profile',
+    FarmProfile: 'farm',
+    DiaryEntry: 'diary',
+    FinancialLedgerEntry: 'finance',
+    WeatherAlert: 'alerts',
+    ChatSession: 'chat',
+}
+
+
+def invalidate_dashboard(sender, instance, raw=False, **kwargs):
+    """Drop the dashboard section a write touches once it commits"""
+    if raw:
+        return
+    user_id = instance.pk if sender is User else instance.user_id
+    section = DASHBOARD_SECTIONS[sender]
+    transaction.on_commit(lambda: dashboard.invalidate(user_id, section))
+
+
+for model in DASHBOARD_SECTIONS:
+    post_save.connect(invalidate_dashboard, sender=model, dispatch_uid=f'dashboard:{model._meta.label}:save')
+    post_delete.connect(invalidate_dashboard, sender=model, dispatch_uid=f'dashboard:{model._meta.label}:delete')
@@ -0,0 +1,91 @@
+"""
+Normalised term tables for free-text, comma-separated fields.
+
+Fields such as ``FarmProfile.primary_crops`` and ``KnowledgeArticle.tags``
+stay as typed for display. A ``TermIndex`` mirrors them into a table of
+unique lowercase terms and a through table linking owners to terms, so
+"farms growing pepper" is an indexed equality join instead of an
+``icontains`` scan, and never matches "peanut" or "pepper vine".
+
+Owners are synced on save by signals and in bulk by ingest paths that skip
+signals; ``sync_term_links`` rebuilds the links of existing rows.
+"""
+import re
+from collections import defaultdict
+
+from django.db import transaction
+
+
+SEPARATORS = re.compile(r'[,;\n]')
+
+
+def normalize_term(value):
+    """Lowercase a term and collapse its whitespace"""
+    return ' '.join((value or '').split()).lower()
+
+
+def split_terms(text):
+    """Return the distinct normalised terms of a comma-separated string, in order"""
+    terms = []
+    for part in SEPARATORS.split(text or ''):
+        term = normalize_term(part)
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+class TermIndex:
+    """Keeps a through table in step with a comma-separated source field
+
+    ``link_model`` has foreign keys named ``owner_field`` (to the owning
+    model) and ``term_field`` (to ``term_model``, which has a unique
+    ``name``).
+    """
+
+    def __init__(self, term_model, link_model, owner_field, term_field, source_field, relation):
+        self.term_model = term_model
+        self.link_model = link_model
+        self.owner_field = owner_field
+        self.term_field = term_field
+        self.source_field = source_field
+        self.relation = relation
+
+    def filter(self, queryset, term):
+        """Restrict ``queryset`` to owners linked to ``term``"""
+        return queryset.filter(**{f'{self.relation}__name': normalize_term(term)})
+
+    def term_ids(self, names):
+        """Return ``{name: id}``, creating the terms that do not exist yet"""
+        if not names:
+            return {}
+        self.term_model.objects.bulk_create(
+            [self.term_model(name=name) for name in names], ignore_conflicts=True,
+        )
+        return dict(self.term_model.objects.filter(name__in=names).values_list('name', 'id'))
+
+    def sync(self, owners):
+        """Bring the links of saved ``owners`` in line with their source field"""
+        wanted = {owner.pk: set(split_terms(getattr(owner, self.source_field))) for owner in owners}
+        if not wanted:
+            return
+        owner_id = f'{self.owner_field}_id'
+        current = defaultdict(dict)
+        links = self.link_model.objects.filter(**{f'{owner_id}__in': list(wanted)}).values_list(
+            'pk', owner_id, f'{self.term_field}__name',
+        )
+        for link_id, pk, name in links:
+            current[pk][name] = link_id
+        changed = [pk for pk, names in wanted.items() if names != current[pk].keys()]
+        if not changed:
+            return
+
+        with transaction.atomic():
+            stale = [current[pk][name] for pk in changed for name in current[pk].keys() - wanted[pk]]
+            if stale:
+                self.link_model.objects.filter(pk__in=stale).delete()
+            added = [(pk, name) for pk in changed for name in wanted[pk] - current[pk].keys()]
+            ids = self.term_ids({name for _, name in added})
+            self.link_model.objects.bulk_create([
+                self.link_model(**{owner_id: pk, f'{self.term_field}_id': ids[name]})
+                for pk, name in added
+            ], ignore_conflicts=True)
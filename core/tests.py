@@ -1,3 +1,705 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from chatbot.models import ChatMessage, ChatSession, KnowledgeArticle
+from farm.models import DiaryEntry, FarmProfile
+from finance.models import FinancialLedgerEntry
+
+from . import geo
+from .alerts import ALERT_RULES, FEATURES, evaluate, run_alerts
+from .authentication import cache_key, local_tokens
+from .dispatch import DispatchError, DispatchWorker, LocmemSMSTransport, TokenBucket, enqueue_alerts
+from .models import (
+    AlertDispatch, AlertEvent, APIUsageLog, APIUsageRollup, SystemConfiguration, WeatherAlert,
+)
+from .config import VERSION_KEY, system_config
+from .retention import get_policies, prune
+from .usage import UsageLogBuffer, log_api_usage, rollup_usage
+from .weather import WeatherError, WeatherService, weather_service
+
+
+class OpenWeatherStandIn:
+    """Local HTTP server answering like the OpenWeather current weather API"""
+
+    def __init__(self, delay=0, status=200):
+        self.delay = delay
+        self.status = status
+        self.extra = {}
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                stand_in.requests.append(params)
+                time.sleep(stand_in.delay)
+                body = json.dumps({
+                    'coord': {'lat': float(params['lat']), 'lon': float(params['lon'])},
+                    'main': {'temp': 29.5 + len(stand_in.requests), 'humidity': 80},
+                    **stand_in.extra,
+                }).encode()
+                self.send_response(stand_in.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/data/2.5/weather'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FlakySMSTransport:
+    """Fails numbers ending in 0 transiently and numbers ending in 9 for good"""
+
+    name = 'flaky'
+    opened = 0
+    sent = []
+
+    def open(self):
+        type(self).opened += 1
+
+    def send(self, recipient, subject, body):
+        if recipient.endswith('0'):
+            raise DispatchError("Gateway timeout")
+        if recipient.endswith('9'):
+            raise DispatchError("Invalid number", permanent=True)
+        self.sent.append(recipient)
+
+    def close(self):
+        pass
+
+
+class GeohashTests(SimpleTestCase):
+
+    def test_encodes_reference_points(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geo.encode(42.6, -5.6, 5), 'ezs42')
+
+    def test_decode_returns_tile_centre(self):
+        lat, lon = geo.decode(geo.encode(10.0159, 76.3419, 6))
+        self.assertAlmostEqual(lat, 10.0159, places=2)
+        self.assertAlmostEqual(lon, 76.3419, places=2)
+        self.assertEqual(geo.encode(lat, lon, 6), geo.encode(10.0159, 76.3419, 6))
+
+    def test_rejects_invalid_input(self):
+        with self.assertRaises(ValueError):
+            geo.encode(91, 0)
+        with self.assertRaises(ValueError):
+            geo.decode('abc')
+
+
+@override_settings(API_USAGE_LOG_MODE='sync')
+class WeatherServiceTests(TransactionTestCase):
+    """Uses real transactions because fetches may run on other threads"""
+
+    def setUp(self):
+        caches['weather'].clear()
+        self.stand_in = OpenWeatherStandIn()
+        self.addCleanup(self.stand_in.close)
+        override = override_settings(OPENWEATHER_API_URL=self.stand_in.url)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_neighbouring_farms_share_one_fetch(self):
+        user = User.objects.create_user('farmer')
+        FarmProfile.objects.create(
+            user=user, location_lat='10.01590000', location_lon='76.34190000',
+            farm_size=1, primary_crops='paddy', soil_type='loamy',
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        own_farm = client.get('/api/weather/')
+        neighbour = client.get('/api/weather/', {'lat': 10.0161, 'lon': 76.3425})
+
+        self.assertEqual(own_farm.status_code, 200)
+        self.assertEqual(own_farm.data['tile'], neighbour.data['tile'])
+        self.assertEqual(own_farm.data['weather'], neighbour.data['weather'])
+        self.assertEqual(len(self.stand_in.requests), 1)
+        log = APIUsageLog.objects.get()
+        self.assertEqual((log.api_type, log.response_status, log.user), ('openweather', 200, user))
+
+    def test_concurrent_misses_are_coalesced(self):
+        self.stand_in.delay = 0.2
+        service = WeatherService()
+        results = []
+
+        def fetch():
+            results.append(service.current(10.0159, 76.3419))
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 8)
+        self.assertEqual(len({result['fetched_at'] for result in results}), 1)
+        self.assertEqual(len(self.stand_in.requests), 1)
+        self.assertEqual(APIUsageLog.objects.count(), 1)
+
+    @override_settings(WEATHER_LOCK_TIMEOUT=0.1, WEATHER_FETCH_TIMEOUT=0.1)
+    def test_follower_gives_up_when_the_leader_hangs(self):
+        service = WeatherService()
+        tile = service.tile(10.0159, 76.3419)
+        service._inflight[tile] = Future()
+
+        with self.assertRaises(WeatherError):
+            service.current(10.0159, 76.3419)
+
+    def test_stale_entry_is_served_while_revalidating(self):
+        service = WeatherService()
+        first = service.current(10.0159, 76.3419)
+
+        with override_settings(WEATHER_FRESH_TTL=0):
+            stale = service.current(10.0159, 76.3419)
+            service.executor.shutdown(wait=True)
+        fresh = service.current(10.0159, 76.3419)
+
+        self.assertTrue(stale['stale'])
+        self.assertEqual(stale['data'], first['data'])
+        self.assertFalse(fresh['stale'])
+        self.assertNotEqual(fresh['data'], first['data'])
+        self.assertEqual(len(self.stand_in.requests), 2)
+
+    def test_upstream_failure_on_miss_is_unavailable(self):
+        self.stand_in.status = 500
+        user = User.objects.create_user('farmer')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.get('/api/weather/', {'lat': 10.0, 'lon': 76.3})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIsNotNone(APIUsageLog.objects.get().error_message)
+        self.assertIsNone(caches['weather'].get(f"weather:tile:{weather_service.tile(10.0, 76.3)}"))
+
+    def test_requires_coordinates_or_farm(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('farmer'))
+
+        self.assertEqual(client.get('/api/weather/').status_code, 400)
+        self.assertEqual(client.get('/api/weather/', {'lat': 10.0}).status_code, 400)
+
+
+@override_settings(API_USAGE_LOG_MODE='sync')
+class WeatherAlertEngineTests(TransactionTestCase):
+
+    def setUp(self):
+        caches['weather'].clear()
+        self.stand_in = OpenWeatherStandIn()
+        self.addCleanup(self.stand_in.close)
+        override = override_settings(OPENWEATHER_API_URL=self.stand_in.url)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def create_farm(self, username, lat, lon):
+        return FarmProfile.objects.create(
+            user=User.objects.create_user(username), location_lat=lat, location_lon=lon,
+            farm_size=1, primary_crops='paddy', soil_type='loamy',
+        )
+
+    def test_rules_are_evaluated_per_tile(self):
+        nan = np.nan
+        features = np.array([
+            [20, 24, 31, 3],    # heavy rain (medium)
+            [0, 1, 12, 30],     # frost (high), wind (critical)
+            [nan, nan, nan, nan],  # fetch failed
+        ])
+        self.assertEqual(len(features[0]), len(FEATURES))
+
+        levels = dict(zip([rule.alert_type for rule in ALERT_RULES], evaluate(features)))
+
+        self.assertEqual(levels['heavy_rain'].tolist(), [1, -1, -1])
+        self.assertEqual(levels['frost_warning'].tolist(), [-1, 1, -1])
+        self.assertEqual(levels['heatwave'].tolist(), [-1, -1, -1])
+        self.assertEqual(levels['high_wind'].tolist(), [-1, 3, -1])
+
+    def test_fetches_each_tile_once_and_bulk_creates_alerts(self):
+        self.create_farm('a', '10.01590000', '76.34190000')
+        self.create_farm('b', '10.01610000', '76.34250000')
+        self.create_farm('c', '11.25880000', '75.78040000')
+        self.stand_in.extra = {'rain': {'1h': 32.0}}
+
+        out = StringIO()
+        call_command('evaluate_weather_alerts', stdout=out)
+
+        self.assertIn('Created 3 alerts for 3 farms in 2 tiles', out.getvalue())
+        self.assertEqual(len(self.stand_in.requests), 2)
+        self.assertEqual(
+            sorted(WeatherAlert.objects.values_list('user__username', 'alert_type', 'severity')),
+            [('a', 'heavy_rain', 'high'), ('b', 'heavy_rain', 'high'), ('c', 'heavy_rain', 'high')],
+        )
+        # No contact details on these users, so nothing to deliver
+        self.assertFalse(AlertDispatch.objects.exists())
+
+    def test_storm_is_one_event_across_runs_and_recipients(self):
+        for username in ('a', 'b'):
+            farm = self.create_farm(username, '10.01590000', '76.34190000')
+            farm.user.userprofile.phone_number = '+911111111111'  # A shared family phone
+            farm.user.userprofile.save()
+        self.stand_in.extra = {'rain': {'1h': 20.0}}
+
+        first = run_alerts()
+        again = run_alerts()
+
+        event = AlertEvent.objects.get()
+        self.assertEqual((event.alert_type, event.severity), ('heavy_rain', 'medium'))
+        self.assertEqual((first.alerts, again.alerts), (2, 0))
+        self.assertEqual(event.alerts.count(), 2)
+        self.assertIsNone(event.alerts.first().weather_data)
+        self.assertEqual(event.dispatches.count(), 1)
+
+        # A worsening storm is a new event and alerts again
+        caches['weather'].clear()
+        self.stand_in.extra = {'rain': {'1h': 40.0}}
+        self.assertEqual(run_alerts().alerts, 2)
+        self.assertEqual(
+            list(AlertEvent.objects.order_by('id').values_list('severity', flat=True)), ['medium', 'high']
+        )
+
+    def test_failed_tiles_do_not_alert(self):
+        self.create_farm('a', '10.01590000', '76.34190000')
+        self.stand_in.status = 500
+
+        result = run_alerts()
+
+        self.assertEqual((result.tiles, result.failed_tiles, result.alerts), (1, 1, 0))
+        self.assertFalse(WeatherAlert.objects.exists())
+
+
+@override_settings(
+    ALERT_SMS_TRANSPORT='core.dispatch.LocmemSMSTransport',
+    ALERT_DISPATCH_RATES={'sms': 1000, 'email': 1000},
+    API_USAGE_LOG_MODE='sync',
+)
+class AlertDispatchTests(TestCase):
+
+    def setUp(self):
+        LocmemSMSTransport.outbox = []
+        FlakySMSTransport.opened = 0
+        FlakySMSTransport.sent = []
+
+    def create_alerts(self, phones, email='', event=None):
+        alerts = []
+        for i, phone in enumerate(phones):
+            user = User.objects.create_user(f'farmer{i}', email=email and f'{i}@{email}')
+            user.userprofile.phone_number = phone
+            user.userprofile.save()
+            alerts.append(WeatherAlert(
+                user=user, event=event, alert_type='cyclone', severity='critical', title="Cyclone warning",
+                message="Move livestock to shelter.", weather_data={}, location_lat=10, location_lon=76,
+                valid_from=timezone.now(), valid_until=timezone.now(),
+            ))
+        WeatherAlert.objects.bulk_create(alerts)
+        return alerts
+
+    def test_delivers_sms_and_email_and_flags_alerts(self):
+        alerts = self.create_alerts(['+911111111111', '+912222222222', None], email='example.com')
+
+        self.assertEqual(enqueue_alerts(alerts), 5)
+        out = StringIO()
+        call_command('dispatch_alerts', '--once', stdout=out)
+
+        self.assertIn('Delivered 5 messages, 0 failed', out.getvalue())
+        self.assertEqual(
+            sorted(recipient for recipient, _ in LocmemSMSTransport.outbox), ['+911111111111', '+912222222222']
+        )
+        self.assertEqual(LocmemSMSTransport.outbox[0][1], "Cyclone warning: Move livestock to shelter.")
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['0@example.com', '1@example.com', '2@example.com'])
+        self.assertEqual(WeatherAlert.objects.filter(is_sent_sms=True).count(), 2)
+        self.assertEqual(WeatherAlert.objects.filter(is_sent_email=True).count(), 3)
+        self.assertFalse(AlertDispatch.objects.exclude(status='sent').exists())
+        self.assertEqual(APIUsageLog.objects.get().request_data, {'messages': 2, 'failed': 0})
+
+    def test_shared_recipient_flags_every_alert_of_the_event(self):
+        event = AlertEvent.objects.create(
+            tile='t9zk', alert_type='cyclone', severity='critical', weather_data={},
+            valid_from=timezone.now(), valid_until=timezone.now(),
+        )
+        alerts = self.create_alerts(['+911111111111', '+911111111111', '+912222222222'], event=event)
+
+        self.assertEqual(enqueue_alerts(alerts), 2)
+        self.assertEqual(DispatchWorker().run_once(), (2, 0))
+
+        self.assertEqual(len(LocmemSMSTransport.outbox), 2)
+        self.assertEqual(WeatherAlert.objects.filter(is_sent_sms=True).count(), 3)
+
+    @override_settings(ALERT_SMS_TRANSPORT='core.tests.FlakySMSTransport', ALERT_DISPATCH_RETRY_DELAY=60)
+    def test_retries_with_backoff_and_gives_up_on_permanent_errors(self):
+        enqueue_alerts(self.create_alerts(['+911111111111', '+911111111110', '+911111111119']))
+
+        sent, failed = DispatchWorker(workers=2).run_once()
+
+        self.assertEqual((sent, failed), (1, 2))
+        self.assertEqual(FlakySMSTransport.opened, 2)
+        retry = AlertDispatch.objects.get(recipient='+911111111110')
+        self.assertEqual((retry.status, retry.attempts, retry.last_error), ('pending', 1, "Gateway timeout"))
+        self.assertGreater(retry.next_attempt_at, timezone.now() + timezone.timedelta(seconds=50))
+        self.assertEqual(AlertDispatch.objects.get(recipient='+911111111119').status, 'failed')
+        # Nothing is due until the backoff expires
+        self.assertEqual(DispatchWorker().run_once(), (0, 0))
+
+    @override_settings(ALERT_SMS_TRANSPORT='core.tests.FlakySMSTransport')
+    def test_reuses_one_connection_per_thread(self):
+        enqueue_alerts(self.create_alerts([f'+9100000000{i:02d}1' for i in range(20)]))
+
+        self.assertEqual(DispatchWorker(workers=3).run_once(), (20, 0))
+        self.assertEqual(FlakySMSTransport.opened, 3)
+        self.assertEqual(len(FlakySMSTransport.sent), 20)
+
+    def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        for _ in range(11):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+
+class APIUsageLogTests(TestCase):
+
+    @override_settings(API_USAGE_LOG_BUFFER_SIZE=3, API_USAGE_LOG_BATCH_SIZE=100)
+    def test_buffer_keeps_newest_entries_and_flushes_in_bulk(self):
+        buffer = UsageLogBuffer()
+        buffer._ensure_thread = lambda: None  # Flush by hand; no background thread in tests
+        for i in range(5):
+            buffer.add(APIUsageLog(api_type='gemini', endpoint=f'call-{i}', response_status=200,
+                                   response_time_ms=10))
+
+        self.assertFalse(APIUsageLog.objects.exists())
+        self.assertEqual(buffer.dropped, 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(
+            sorted(APIUsageLog.objects.values_list('endpoint', flat=True)), ['call-2', 'call-3', 'call-4']
+        )
+
+    @override_settings(API_USAGE_LOG_BUFFER_SIZE=3, API_USAGE_LOG_BATCH_SIZE=100)
+    def test_failed_flush_requeue_keeps_newest_entries(self):
+        buffer = UsageLogBuffer()
+        buffer._ensure_thread = lambda: None
+        self.addCleanup(buffer.close)
+
+        def add(*endpoints):
+            for endpoint in endpoints:
+                buffer.add(APIUsageLog(api_type='gemini', endpoint=endpoint, response_status=200,
+                                       response_time_ms=10))
+
+        def fail_while_busy(*args, **kwargs):
+            add('new-1', 'new-2', 'new-3')  # Requests keep logging during the failed write
+            raise DatabaseError("database is locked")
+
+        add('old-1', 'old-2')
+        with mock.patch.object(APIUsageLog.objects, 'bulk_create', side_effect=fail_while_busy), \
+                self.assertLogs('krishi_sakhi', 'ERROR'), self.assertRaises(DatabaseError):
+            buffer.flush()
+
+        # The buffer filled up meanwhile: the older, failed entries are the ones dropped
+        self.assertEqual([entry.endpoint for entry in buffer._queue], ['new-1', 'new-2', 'new-3'])
+        self.assertEqual(buffer.dropped, 2)
+
+    def test_forked_child_gets_fresh_locks(self):
+        buffer = UsageLogBuffer()
+        buffer._flush_lock.acquire()  # As if the parent's flusher was mid-write
+
+        buffer._after_fork()
+
+        self.assertTrue(buffer._flush_lock.acquire(blocking=False))
+        buffer._flush_lock.release()
+
+    @override_settings(API_USAGE_LOG_MODE='sync')
+    def test_rollup_aggregates_per_hour_and_endpoint(self):
+        user = User.objects.create_user('farmer')
+        for ms in range(10, 110, 10):
+            log_api_usage('gemini', 'gemini-1.5-flash', 200, ms, user=user, tokens_used=100)
+        log_api_usage('gemini', 'gemini-1.5-flash', 500, 900, error_message="quota")
+        log_api_usage('openweather', 'weather', 200, 40)
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+        # The current hour is still open, so rolling up to now leaves it out
+        self.assertEqual(rollup_usage(hour, timezone.now()), 0)
+        self.assertEqual(rollup_usage(hour, hour + timezone.timedelta(hours=1)), 2)
+        # Recomputing updates rows in place
+        log_api_usage('openweather', 'weather', 200, 60)
+        call_command('rollup_api_usage', stdout=StringIO())
+
+        gemini = APIUsageRollup.objects.get(api_type='gemini')
+        self.assertEqual(gemini.hour, hour)
+        self.assertEqual((gemini.request_count, gemini.error_count, gemini.tokens_used), (11, 1, 1000))
+        self.assertEqual(gemini.p50_response_ms, 60)
+        self.assertGreater(gemini.p95_response_ms, 100)
+        weather = APIUsageRollup.objects.get(api_type='openweather')
+        self.assertEqual((weather.request_count, weather.p50_response_ms), (2, 50))
+
+
+class RetentionTests(TestCase):
+
+    def setUp(self):
+        system_config.invalidate()
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        override = override_settings(RETENTION_ARCHIVE_DIR=self.archive_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def create_logs(self, days_ago, count):
+        timestamp = timezone.now() - timezone.timedelta(days=days_ago)
+        APIUsageLog.objects.bulk_create([
+            APIUsageLog(api_type='gemini', endpoint='e', response_status=200, response_time_ms=1,
+                        timestamp=timestamp)
+            for _ in range(count)
+        ])
+
+    def policy(self, label):
+        return get_policies([label])[0]
+
+    def test_deletes_expired_rows_in_chunks(self):
+        self.create_logs(200, 10)
+        self.create_logs(1, 5)
+
+        out = StringIO()
+        call_command('prune_old_data', '--model', 'core.APIUsageLog', '--chunk-size', '3', stdout=out)
+
+        self.assertIn('Deleted 10 core.APIUsageLog rows older than 90 days', out.getvalue())
+        self.assertEqual(APIUsageLog.objects.count(), 5)
+        self.assertEqual(os.listdir(self.archive_dir), [])
+
+    def test_policy_overrides_come_from_system_configuration(self):
+        self.create_logs(5, 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            SystemConfiguration.objects.create(key='retention.core.apiusagelog', value='{"days": 3}')
+
+        policy = self.policy('core.apiusagelog')
+        self.assertEqual(prune(policy, dry_run=True).deleted, 4)
+        self.assertEqual(APIUsageLog.objects.count(), 4)
+        self.assertEqual(prune(policy).deleted, 4)
+        self.assertFalse(APIUsageLog.objects.exists())
+
+    def test_archives_chat_messages_before_deleting(self):
+        user = User.objects.create_user('farmer')
+        session = ChatSession.objects.create(user=user, session_id='s1')
+        article = KnowledgeArticle.objects.create(title='Paddy', content='...', category='crop_cultivation')
+        old = timezone.now() - timezone.timedelta(days=400)
+        messages = ChatMessage.objects.bulk_create([
+            ChatMessage(session=session, message_type='user', content=f'old {i}', timestamp=old)
+            for i in range(3)
+        ] + [ChatMessage(session=session, message_type='user', content='recent')])
+        messages[0].context_articles.add(article)
+
+        result = prune(self.policy('chatbot.ChatMessage'), chunk_size=2)
+
+        self.assertEqual(result.deleted, 3)
+        self.assertEqual(list(ChatMessage.objects.values_list('content', flat=True)), ['recent'])
+        with gzip.open(result.archive_path, 'rt', encoding='utf-8') as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual([row['content'] for row in rows], ['old 0', 'old 1', 'old 2'])
+        self.assertEqual(rows[0]['session_id'], session.id)
+
+
+class SystemConfigTests(TestCase):
+
+    def setUp(self):
+        system_config.invalidate()
+
+    def set(self, key, value, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            SystemConfiguration.objects.update_or_create(key=key, defaults={'value': value, **extra})
+
+    def test_typed_getters_read_one_snapshot(self):
+        self.set('alerts.enabled', 'yes')
+        self.set('alerts.max_per_day', '3')
+        self.set('alerts.threshold', '7.5')
+        self.set('alerts.channels', '["sms"]')
+        self.set('alerts.legacy', 'x', is_active=False)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(system_config.get_bool('alerts.enabled'))
+            self.assertEqual(system_config.get_int('alerts.max_per_day'), 3)
+            self.assertEqual(system_config.get_float('alerts.threshold'), 7.5)
+            self.assertEqual(system_config.get_json('alerts.channels'), ['sms'])
+            self.assertEqual(system_config.get_int('alerts.enabled', 0), 0)
+            self.assertIsNone(system_config.get('alerts.legacy'))
+        with self.assertRaises(TypeError):
+            system_config.values()['alerts.enabled'] = 'no'
+
+    def test_saving_a_row_reloads_the_snapshot(self):
+        self.set('alerts.max_per_day', '3')
+        self.assertEqual(system_config.get_int('alerts.max_per_day'), 3)
+
+        self.set('alerts.max_per_day', '5')
+
+        self.assertEqual(system_config.get_int('alerts.max_per_day'), 5)
+
+    @override_settings(SYSTEM_CONFIG_CHECK_INTERVAL=0)
+    def test_other_processes_notice_the_version_bump(self):
+        self.set('alerts.max_per_day', '3')
+        self.assertEqual(system_config.get_int('alerts.max_per_day'), 3)
+        with self.assertNumQueries(0):
+            system_config.get_int('alerts.max_per_day')
+
+        # Another process changed the row and bumped the counter
+        SystemConfiguration.objects.filter(key='alerts.max_per_day').update(value='4')
+        caches['default'].incr(VERSION_KEY)
+
+        self.assertEqual(system_config.get_int('alerts.max_per_day'), 4)
+
+
+class DashboardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('farmer', first_name='Anu')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        FarmProfile.objects.create(
+            user=self.user, location_lat=10, location_lon=76.3, farm_size=2,
+            primary_crops='paddy', soil_type='loamy',
+        )
+        today = timezone.localdate()
+        for day in range(8):
+            DiaryEntry.objects.create(user=self.user, date=today - timedelta(days=day),
+                                      activity_type='watering', notes=f'day {day}')
+        FinancialLedgerEntry.objects.create(user=self.user, date=today, entry_type='income',
+                                            amount=Decimal('900.00'), description='Milk', category='dairy_products')
+        FinancialLedgerEntry.objects.create(user=self.user, date=today, entry_type='expense',
+                                            amount=Decimal('150.00'), description='Feed', category='other_expense')
+        now = timezone.now()
+        for hours, title in ((2, 'Heavy rain'), (-1, 'Expired frost')):
+            WeatherAlert.objects.create(
+                user=self.user, alert_type='heavy_rain', severity='high', title=title, message='-',
+                location_lat=10, location_lon=76.3, valid_from=now - timedelta(hours=3),
+                valid_until=now + timedelta(hours=hours),
+            )
+        session = ChatSession.objects.create(user=self.user, session_id='s1')
+        ChatMessage.objects.bulk_create([
+            ChatMessage(session=session, message_type='user', content='hello') for _ in range(3)
+        ])
+
+    def test_full_build_has_fixed_query_count_then_serves_cache(self):
+        # user with profile, farm and ledger subqueries; diary, alerts, chat prefetches
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/dashboard/')
+
+        data = response.json()
+        self.assertEqual(data['profile']['first_name'], 'Anu')
+        self.assertEqual(data['farm']['primary_crops'], 'paddy')
+        self.assertEqual([entry['notes'] for entry in data['diary']], [f'day {day}' for day in range(5)])
+        self.assertEqual(data['finance'], {
+            'month': f'{timezone.localdate():%Y-%m}', 'income': '900.00', 'expense': '150.00', 'net': '750.00',
+        })
+        self.assertEqual([alert['title'] for alert in data['alerts']], ['Heavy rain'])
+        self.assertEqual((data['chat']['session_id'], data['chat']['message_count']), ('s1', 3))
+
+        with self.assertNumQueries(0):
+            self.client.get('/api/dashboard/')
+
+    def test_writes_rebuild_only_their_section(self):
+        self.client.get('/api/dashboard/')
+        with self.captureOnCommitCallbacks(execute=True):
+            FinancialLedgerEntry.objects.create(
+                user=self.user, date=timezone.localdate(), entry_type='expense',
+                amount=Decimal('50.00'), description='Fuel', category='fuel',
+            )
+
+        # user row with the ledger subqueries only
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/dashboard/')
+        self.assertEqual(response.json()['finance']['expense'], '200.00')
+
+        other = User.objects.create_user('other')
+        with self.captureOnCommitCallbacks(execute=True):
+            DiaryEntry.objects.create(user=other, date=timezone.localdate(), activity_type='sowing', notes='-')
+        with self.assertNumQueries(0):
+            self.client.get('/api/dashboard/')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        self.user = User.objects.create_user('farmer')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_requests_skip_the_token_query(self):
+        # token JOIN user, then the view's farm lookup
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/weather/').status_code, 400)
+        with self.assertNumQueries(1):
+            self.client.get('/api/weather/')
+
+        local_tokens.clear()  # Another process: served from the shared cache
+        with self.assertNumQueries(1):
+            self.client.get('/api/weather/')
+
+    def test_logout_and_deactivation_revoke_cached_tokens(self):
+        self.client.get('/api/weather/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/users/logout/').status_code, 200)
+        self.assertFalse(Token.objects.exists())
+        self.assertEqual(self.client.get('/api/weather/').status_code, 401)
+
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.client.get('/api/weather/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get('/api/weather/').status_code, 401)
+
+    def test_only_access_changes_query_tokens(self):
+        self.user.first_name = 'Anu'
+        with self.assertNumQueries(1):
+            self.user.save()
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('pass12345')
+        with self.assertNumQueries(2), self.captureOnCommitCallbacks() as callbacks:
+            user.save()
+        self.assertEqual(len(callbacks), 2)  # Token and dashboard invalidation
+
+    def test_password_hash_is_not_cached(self):
+        self.user.set_password('pass12345')
+        self.user.save()
+        self.client.get('/api/weather/')
+
+        cached = cache.get(cache_key(self.token.key))
+        self.assertIn('password', cached.user.get_deferred_fields())
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(cached))
+
+    def test_unknown_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+        self.assertEqual(self.client.get('/api/weather/').status_code, 401)
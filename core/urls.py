@@ -5,6 +5,7 @@ app_name = 'core'
 
 urlpatterns = [
     # Weather and shared endpoints
+    path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
     path('weather/', views.WeatherView.as_view(), name='weather'),
     path('weather/alerts/', views.WeatherAlertsView.as_view(), name='weather-alerts'),
 ]
\ No newline at end of file
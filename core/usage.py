@@ -0,0 +1,156 @@
+"""
+Helpers for recording calls to external APIs in ``APIUsageLog``.
+
+With ``settings.API_USAGE_LOG_MODE = 'buffered'`` ``log_api_usage`` only
+appends to an in-process ring buffer and returns immediately. A background
+thread writes the buffer with ``bulk_create`` every
+``API_USAGE_LOG_FLUSH_INTERVAL`` seconds, or sooner once
+``API_USAGE_LOG_BATCH_SIZE`` entries are waiting, and at interpreter exit.
+When the database falls behind, the buffer keeps the newest
+``API_USAGE_LOG_BUFFER_SIZE`` entries and counts what it dropped (see
+``core.buffers``).
+
+``'sync'`` mode inserts each row on the calling thread.
+
+``rollup_usage`` aggregates the raw log into ``APIUsageRollup`` rows per
+hour, API and endpoint for dashboards.
+"""
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .buffers import WriteBehindBuffer
+from .models import APIUsageLog, APIUsageRollup
+
+
+logger = logging.getLogger('krishi_sakhi')
+
+
+class UsageLogBuffer(WriteBehindBuffer):
+    """Bounded buffer of ``APIUsageLog`` rows flushed from a background thread"""
+
+    thread_name = 'api-usage-writer'
+    item_name = 'API usage log entries'
+
+    @property
+    def limit(self):
+        return settings.API_USAGE_LOG_BUFFER_SIZE
+
+    @property
+    def flush_interval(self):
+        return settings.API_USAGE_LOG_FLUSH_INTERVAL
+
+    @property
+    def buffered(self):
+        return settings.API_USAGE_LOG_MODE == 'buffered'
+
+    def add(self, entry):
+        """Queue an unsaved ``APIUsageLog``"""
+        if not self.buffered:
+            entry.save()
+            return
+
+        with self._lock:
+            pending = self._push(entry)
+        if pending >= settings.API_USAGE_LOG_BATCH_SIZE:
+            self._wake.set()
+        self._ensure_thread()
+
+    def flush(self):
+        """Write every queued entry; returns how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                entries, dropped = self._take()
+            self._report_dropped(dropped)
+            if not entries:
+                return 0
+            try:
+                APIUsageLog.objects.bulk_create(entries, batch_size=settings.API_USAGE_LOG_BATCH_SIZE)
+            except Exception:
+                logger.exception("API usage flush failed; requeueing %d entries", len(entries))
+                for entry in entries:
+                    entry.pk = None
+                    entry._state.adding = True
+                with self._lock:
+                    self._requeue(entries)
+                raise
+            return len(entries)
+
+
+usage_log = UsageLogBuffer()
+
+
+def log_api_usage(api_type, endpoint, response_status, response_time_ms,
+                  user=None, request_data=None, tokens_used=None, error_message=None):
+    """Record a single external API call"""
+    usage_log.add(APIUsageLog(
+        user_id=user.pk if user is not None and user.is_authenticated else None,
+        api_type=api_type,
+        endpoint=endpoint,
+        request_data=request_data or {},
+        response_status=response_status,
+        response_time_ms=int(response_time_ms),
+        tokens_used=tokens_used,
+        error_message=error_message,
+    ))
+
+
+def rollup_usage(start, end):
+    """Recompute ``APIUsageRollup`` rows for the whole hours in ``[start, end)``
+
+    Both bounds are truncated to the hour, so a partial hour at the end is
+    left out rather than written with only some of its logs. Returns the
+    number of rollup rows written.
+    """
+    start = start.replace(minute=0, second=0, microsecond=0)
+    end = end.replace(minute=0, second=0, microsecond=0)
+    groups = {}
+    rows = (
+        APIUsageLog.objects
+        .filter(timestamp__gte=start, timestamp__lt=end)
+        .values_list('timestamp', 'api_type', 'endpoint', 'response_status',
+                     'response_time_ms', 'tokens_used', 'error_message')
+        .iterator(chunk_size=5000)
+    )
+    for timestamp, api_type, endpoint, status, response_ms, tokens, error in rows:
+        hour = timestamp.replace(minute=0, second=0, microsecond=0)
+        group = groups.setdefault((hour, api_type, endpoint), {'times': [], 'errors': 0, 'tokens': 0})
+        group['times'].append(response_ms)
+        group['errors'] += status >= 400 or error is not None
+        group['tokens'] += tokens or 0
+
+    rollups = []
+    for (hour, api_type, endpoint), group in groups.items():
+        p50, p95 = np.percentile(np.asarray(group['times']), [50, 95])
+        rollups.append(APIUsageRollup(
+            hour=hour,
+            api_type=api_type,
+            endpoint=endpoint,
+            request_count=len(group['times']),
+            error_count=group['errors'],
+            p50_response_ms=int(round(p50)),
+            p95_response_ms=int(round(p95)),
+            tokens_used=group['tokens'],
+        ))
+    APIUsageRollup.objects.bulk_create(
+        rollups,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['hour', 'api_type', 'endpoint'],
+        update_fields=['request_count', 'error_count', 'p50_response_ms', 'p95_response_ms',
+                       'tokens_used', 'updated_at'],
+    )
+    return len(rollups)
+
+
+def rollup_recent(hours=2):
+    """Roll up the last ``hours`` hours, including the current one
+
+    The current hour's row covers the logs so far and is overwritten by the
+    next run, so it is complete once a run after the hour has ended.
+    """
+    end = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    return rollup_usage(end - timedelta(hours=hours), end)
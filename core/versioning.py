@@ -0,0 +1,19 @@
+"""
+Version counters kept in a Django cache.
+
+Cached results are keyed by a counter that their inputs' writes bump, which
+makes every entry built from the old value unreachable at once; the stale
+entries simply expire.
+"""
+from django.core.cache import cache as default_cache
+
+
+def bump_version(key, cache=None):
+    """Increment the counter at ``key`` (no expiry), starting it if missing"""
+    cache = default_cache if cache is None else cache
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); restart the counter
+        cache.set(key, 1, None)
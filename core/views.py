@@ -1,16 +1,49 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from farm.models import FarmProfile
+
+from .dashboard import get_dashboard
+from .serializers import WeatherQuerySerializer
+from .weather import WeatherError, weather_service
+
+
+class DashboardView(APIView):
+    """Everything the home screen shows, in one request"""
+    
+    def get(self, request):
+        return Response(get_dashboard(request.user), status=status.HTTP_200_OK)
 
 
 class WeatherView(APIView):
-    """Weather endpoint - placeholder"""
+    """Current weather for the given coordinates or the user's farm"""
     
     def get(self, request):
-        return Response(
-            {"message": "Weather endpoint - coming soon"}, 
-            status=status.HTTP_200_OK
-        )
+        serializer = WeatherQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        if 'lat' in serializer.validated_data:
+            lat, lon = serializer.validated_data['lat'], serializer.validated_data['lon']
+        else:
+            farm = FarmProfile.objects.filter(user=request.user).values('location_lat', 'location_lon').first()
+            if farm is None:
+                raise ValidationError("Provide lat and lon or create a farm profile")
+            lat, lon = farm['location_lat'], farm['location_lon']
+
+        try:
+            entry = weather_service.current(lat, lon, user=request.user)
+        except WeatherError:
+            return Response(
+                {"message": "Weather data is unavailable right now, please try again"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return Response({
+            'tile': entry['tile'],
+            'fetched_at': entry['fetched_at'],
+            'stale': entry['stale'],
+            'weather': entry['data'],
+        }, status=status.HTTP_200_OK)
 
 
 class WeatherAlertsView(APIView):
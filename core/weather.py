@@ -0,0 +1,165 @@
+"""
+Current weather from OpenWeatherMap, cached per geohash tile.
+
+Coordinates are snapped to a geohash tile of
+``settings.WEATHER_GEOHASH_PRECISION`` characters and the weather at the
+tile centre is cached in the ``settings.WEATHER_CACHE`` backend, so
+neighbouring farms share one upstream call.
+
+An entry is fresh for ``WEATHER_FRESH_TTL`` seconds. After that it is
+still served, for up to ``WEATHER_STALE_TTL`` seconds, while one
+background refresh replaces it (stale-while-revalidate). Concurrent misses
+for a tile are coalesced into a single fetch: within a process by sharing
+a future, across processes by a lock key in the shared cache. Every
+upstream call is recorded in ``APIUsageLog``.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+
+from . import geo
+from .usage import log_api_usage
+
+
+logger = logging.getLogger('krishi_sakhi')
+
+
+class WeatherError(Exception):
+    """Raised when weather data cannot be fetched"""
+
+
+class WeatherService:
+    """Tile-cached, coalesced access to current weather"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}  # tile -> Future of the fetch in progress
+        self.executor = None
+
+    @property
+    def cache(self):
+        return caches[settings.WEATHER_CACHE]
+
+    def tile(self, lat, lon):
+        return geo.encode(lat, lon, settings.WEATHER_GEOHASH_PRECISION)
+
+    def _entry_key(self, tile):
+        return f'weather:tile:{tile}'
+
+    def _lock_key(self, tile):
+        return f'weather:tile:{tile}:lock'
+
+    def current(self, lat, lon, user=None):
+        """Return the cached weather entry for the tile containing ``(lat, lon)``
+
+        The entry is a dict with ``tile``, ``fetched_at`` (epoch seconds),
+        ``data`` and ``stale``.
+        """
+        return self.for_tile(self.tile(lat, lon), user)
+
+    def for_tile(self, tile, user=None):
+        """Return the cached weather entry for a geohash ``tile``"""
+        entry = self.cache.get(self._entry_key(tile))
+        if entry is None:
+            entry = self._coalesced_fetch(tile, user)
+            return {**entry, 'stale': False}
+
+        stale = time.time() - entry['fetched_at'] >= settings.WEATHER_FRESH_TTL
+        if stale:
+            self.revalidate(tile)
+        return {**entry, 'stale': stale}
+
+    def revalidate(self, tile):
+        """Refresh ``tile`` in the background unless a refresh is running"""
+        if not self.cache.add(self._lock_key(tile), 1, settings.WEATHER_LOCK_TIMEOUT):
+            return None
+        with self._lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='weather-refresh')
+        return self.executor.submit(self._refresh, tile)
+
+    def _refresh(self, tile):
+        try:
+            self._coalesced_fetch(tile, locked=True)
+        except WeatherError:
+            pass  # Logged by _fetch; the stale entry keeps being served
+        finally:
+            close_old_connections()
+
+    def _coalesced_fetch(self, tile, user=None, locked=False):
+        with self._lock:
+            future = self._inflight.get(tile)
+            leader = future is None
+            if leader:
+                future = self._inflight[tile] = Future()
+        if not leader:
+            # The leader may wait out another process's lock before fetching
+            wait = settings.WEATHER_LOCK_TIMEOUT + settings.WEATHER_FETCH_TIMEOUT
+            try:
+                return future.result(timeout=wait)
+            except FutureTimeout as exc:
+                raise WeatherError(f"Timed out waiting for tile {tile}") from exc
+
+        try:
+            entry = self._fetch_once(tile, user, locked)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(entry)
+            return entry
+        finally:
+            with self._lock:
+                del self._inflight[tile]
+
+    def _fetch_once(self, tile, user, locked):
+        """Fetch unless another process holds the tile lock, then wait for it"""
+        lock_key = self._lock_key(tile)
+        if not locked and not self.cache.add(lock_key, 1, settings.WEATHER_LOCK_TIMEOUT):
+            deadline = time.monotonic() + settings.WEATHER_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = self.cache.get(self._entry_key(tile))
+                if entry is not None:
+                    return entry
+            # The holder died or is too slow; fetch anyway
+        try:
+            entry = {'tile': tile, 'fetched_at': time.time(), 'data': self._fetch(tile, user)}
+            self.cache.set(self._entry_key(tile), entry, settings.WEATHER_STALE_TTL)
+            return entry
+        finally:
+            self.cache.delete(lock_key)
+
+    def _fetch(self, tile, user=None):
+        """Call OpenWeatherMap for the centre of ``tile``"""
+        lat, lon = geo.decode(tile)
+        started = time.perf_counter()
+        status_code, error = 0, None
+        try:
+            response = requests.get(
+                settings.OPENWEATHER_API_URL,
+                params={'lat': round(lat, 4), 'lon': round(lon, 4),
+                        'appid': settings.OPENWEATHER_API_KEY, 'units': 'metric'},
+                timeout=settings.WEATHER_FETCH_TIMEOUT,
+            )
+            status_code = response.status_code
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as exc:
+            error = str(exc)
+            logger.warning("Weather fetch for tile %s failed: %s", tile, exc)
+            raise WeatherError(error) from exc
+        finally:
+            log_api_usage(
+                'openweather', 'weather', status_code or 503, (time.perf_counter() - started) * 1000,
+                user=user, request_data={'tile': tile}, error_message=error,
+            )
+
+
+weather_service = WeatherService()
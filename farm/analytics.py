@@ -0,0 +1,149 @@
+"""
+Weekly farm activity analytics.
+
+Diary entries and ledger expenses are grouped by week (``TruncWeek``),
+activity type and crop in the database, so only one row per group reaches
+Python. NumPy then scatters the groups into dense week-by-activity and
+week-by-crop grids, where weeks without activity are zero, and derives
+totals and spend per acre from them. Crop names are free text on both
+sides, so they are matched after ``normalize_term``, as the crop index
+does: "Paddy " in the ledger and "paddy" in the diary are one crop.
+
+Results are cached per user and date range in the default cache. Keys
+carry a per-user version that diary and ledger writes bump once they
+commit, so a write makes every cached range of that user stale at once.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncWeek
+
+from core.terms import normalize_term
+from core.versioning import bump_version
+from finance.models import FinancialLedgerEntry
+
+from .models import DiaryEntry
+
+
+ACTIVITIES = [value for value, _ in DiaryEntry.ACTIVITY_CHOICES]
+
+
+def version_key(user_id):
+    return f'farm:analytics:version:{user_id}'
+
+
+def invalidate(user_id):
+    """Make every cached analytics result of ``user_id`` stale"""
+    bump_version(version_key(user_id))
+
+
+def week_of(day):
+    return day - timedelta(days=day.weekday())
+
+
+def get_analytics(user, start, end):
+    """Return the cached analytics for ``user`` between two dates (inclusive)"""
+    version = cache.get(version_key(user.pk), 0)
+    key = f'farm:analytics:{user.pk}:{version}:{start.isoformat()}:{end.isoformat()}'
+    result = cache.get(key)
+    if result is None:
+        result = build_analytics(user, start, end)
+        cache.set(key, result, settings.FARM_ANALYTICS_CACHE_TTL)
+    return result
+
+
+def build_analytics(user, start, end):
+    """Aggregate ``user``'s diary and ledger spend per week, activity and crop"""
+    diary = (
+        DiaryEntry.objects
+        .filter(user=user, date__gte=start, date__lte=end)
+        .annotate(week=TruncWeek('date'))
+        .values('week', 'activity_type', 'crop_involved')
+        .annotate(count=Count('id'), acres=Sum('area_covered'))
+        .order_by()
+    )
+    spend = (
+        FinancialLedgerEntry.objects
+        .filter(user=user, entry_type='expense', date__gte=start, date__lte=end)
+        .exclude(crop_related__isnull=True).exclude(crop_related='')
+        .annotate(week=TruncWeek('date'))
+        .values('week', 'crop_related')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    diary = list(diary)
+    spend = list(spend)
+    for row in diary:
+        row['crop_involved'] = normalize_term(row['crop_involved'])
+    for row in spend:
+        row['crop_related'] = normalize_term(row['crop_related'])
+    # Whitespace-only names are empty once normalised
+    spend = [row for row in spend if row['crop_related']]
+
+    first_week = week_of(start)
+    weeks = [first_week + timedelta(weeks=i) for i in range((week_of(end) - first_week).days // 7 + 1)]
+    crops = sorted(
+        {row['crop_involved'] for row in diary if row['crop_involved']}
+        | {row['crop_related'] for row in spend}
+    )
+    crop_index = {crop: i for i, crop in enumerate(crops)}
+    activity_index = {activity: i for i, activity in enumerate(ACTIVITIES)}
+
+    def week_positions(rows):
+        return np.array([(row['week'] - first_week).days // 7 for row in rows], dtype=np.int64)
+
+    activity_counts = np.zeros((len(weeks), len(ACTIVITIES)), dtype=np.int64)
+    crop_counts = np.zeros((len(weeks), len(crops)), dtype=np.int64)
+    crop_acres = np.zeros((len(weeks), len(crops)))
+    crop_spend = np.zeros((len(weeks), len(crops)))
+
+    if diary:
+        positions = week_positions(diary)
+        counts = np.array([row['count'] for row in diary], dtype=np.int64)
+        activities = np.array([activity_index.get(row['activity_type'], activity_index['other']) for row in diary])
+        np.add.at(activity_counts, (positions, activities), counts)
+
+        with_crop = np.array([bool(row['crop_involved']) for row in diary])
+        crop_columns = np.array([crop_index.get(row['crop_involved'], -1) for row in diary])
+        acres = np.array([float(row['acres'] or 0) for row in diary])
+        np.add.at(crop_counts, (positions[with_crop], crop_columns[with_crop]), counts[with_crop])
+        np.add.at(crop_acres, (positions[with_crop], crop_columns[with_crop]), acres[with_crop])
+
+    if spend:
+        np.add.at(
+            crop_spend,
+            (week_positions(spend), np.array([crop_index[row['crop_related']] for row in spend])),
+            np.array([float(row['total']) for row in spend]),
+        )
+
+    total_acres = crop_acres.sum(axis=0)
+    total_spend = crop_spend.sum(axis=0)
+    spend_per_acre = np.divide(
+        total_spend, total_acres, out=np.full(len(crops), np.nan), where=total_acres > 0,
+    )
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'weeks': [week.isoformat() for week in weeks],
+        'activities': {
+            activity: activity_counts[:, i].tolist()
+            for i, activity in enumerate(ACTIVITIES) if activity_counts[:, i].any()
+        },
+        'weekly_activity_count': activity_counts.sum(axis=1).tolist(),
+        'crops': [
+            {
+                'crop': crop,
+                'activity_count': crop_counts[:, i].tolist(),
+                'acres': np.round(crop_acres[:, i], 2).tolist(),
+                'spend': np.round(crop_spend[:, i], 2).tolist(),
+                'total_acres': round(float(total_acres[i]), 2),
+                'total_spend': round(float(total_spend[i]), 2),
+                'spend_per_acre': None if np.isnan(spend_per_acre[i]) else round(float(spend_per_acre[i]), 2),
+            }
+            for i, crop in enumerate(crops)
+        ],
+    }
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_geohash(apps, schema_editor):
+    from core import geo
+
+    FarmProfile = apps.get_model('farm', 'FarmProfile')
+    farms = list(FarmProfile.objects.only('location_lat', 'location_lon'))
+    for farm in farms:
+        farm.geohash = geo.encode(farm.location_lat, farm.location_lon, settings.FARM_GEOHASH_PRECISION)
+    FarmProfile.objects.bulk_update(farms, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='farmprofile',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, help_text='Geohash of the farm location, kept in sync on save for proximity queries', max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='farmprofile',
+            index=models.Index(fields=['geohash'], name='farm_profile_geohash'),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
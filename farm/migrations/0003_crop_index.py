@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0002_farm_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Crop',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Lowercase crop name', max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Crop',
+                'verbose_name_plural': 'Crops',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FarmCrop',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('crop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='farm_links', to='farm.crop')),
+                ('farm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crop_links', to='farm.farmprofile')),
+            ],
+            options={
+                'verbose_name': 'Farm Crop',
+                'verbose_name_plural': 'Farm Crops',
+            },
+        ),
+        migrations.AddField(
+            model_name='farmprofile',
+            name='crops',
+            field=models.ManyToManyField(blank=True, help_text='Normalised primary crops, synced from primary_crops on save', related_name='farms', through='farm.FarmCrop', to='farm.crop'),
+        ),
+        migrations.AddConstraint(
+            model_name='farmcrop',
+            constraint=models.UniqueConstraint(fields=('crop', 'farm'), name='farm_crop_unique'),
+        ),
+    ]
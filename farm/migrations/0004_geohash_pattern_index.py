@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0003_crop_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # farm.spatial now matches cells with geohash LIKE 'prefix%' instead of a
+    # range ending in '~', which only sorts last under a C/binary collation.
+    # varchar_pattern_ops lets PostgreSQL serve that LIKE from the index
+    # whatever the database collation; other backends ignore the opclass.
+    operations = [
+        migrations.RemoveIndex(
+            model_name='farmprofile',
+            name='farm_profile_geohash',
+        ),
+        migrations.AddIndex(
+            model_name='farmprofile',
+            index=models.Index(fields=['geohash'], name='farm_profile_geohash', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
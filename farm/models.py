@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from core import geo
+from core.terms import TermIndex
+
 
 class FarmProfile(models.Model):
     """Farm profile information for each user"""
@@ -34,6 +38,12 @@ class FarmProfile(models.Model):
         ],
         help_text="Longitude coordinate of the farm"
     )
+    geohash = models.CharField(
+        max_length=12, 
+        blank=True, 
+        editable=False,
+        help_text="Geohash of the farm location, kept in sync on save for proximity queries"
+    )
     farm_size = models.DecimalField(
         max_digits=10, 
         decimal_places=2,
@@ -44,6 +54,13 @@ class FarmProfile(models.Model):
         max_length=200, 
         help_text="Comma-separated list of primary crops"
     )
+    crops = models.ManyToManyField(
+        'Crop',
+        through='FarmCrop',
+        related_name='farms',
+        blank=True,
+        help_text="Normalised primary crops, synced from primary_crops on save"
+    )
     soil_type = models.CharField(
         max_length=50, 
         choices=SOIL_CHOICES,
@@ -55,9 +72,55 @@ class FarmProfile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Farm - {self.farm_size} acres"
     
+    def save(self, *args, **kwargs):
+        self.geohash = geo.encode(self.location_lat, self.location_lon, settings.FARM_GEOHASH_PRECISION)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'location_lat', 'location_lon'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+    
     class Meta:
         verbose_name = "Farm Profile"
         verbose_name_plural = "Farm Profiles"
+        indexes = [
+            # Cell prefix (LIKE 'prefix%') lookups for farm.spatial proximity queries
+            models.Index(fields=['geohash'], name='farm_profile_geohash', opclasses=['varchar_pattern_ops']),
+        ]
+
+
+class Crop(models.Model):
+    """A normalised crop name shared by farms"""
+    
+    name = models.CharField(max_length=100, unique=True, help_text="Lowercase crop name")
+    
+    def __str__(self):
+        return self.name
+    
+    class Meta:
+        verbose_name = "Crop"
+        verbose_name_plural = "Crops"
+        ordering = ['name']
+
+
+class FarmCrop(models.Model):
+    """Links a farm to one of its primary crops"""
+    
+    farm = models.ForeignKey(FarmProfile, on_delete=models.CASCADE, related_name='crop_links')
+    crop = models.ForeignKey(Crop, on_delete=models.CASCADE, related_name='farm_links')
+    
+    def __str__(self):
+        return f"{self.farm_id} grows {self.crop_id}"
+    
+    class Meta:
+        verbose_name = "Farm Crop"
+        verbose_name_plural = "Farm Crops"
+        constraints = [
+            # Leading crop column serves "farms growing X" lookups
+            models.UniqueConstraint(fields=['crop', 'farm'], name='farm_crop_unique'),
+        ]
+
+
+crop_index = TermIndex(Crop, FarmCrop, 'farm', 'crop', 'primary_crops', 'crops')
 
 
 class DiaryEntry(models.Model):
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import DiaryEntry
+
+
+class DiaryQuerySerializer(serializers.Serializer):
+    """Optional filters for diary listings and exports"""
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    activity_type = serializers.ChoiceField(choices=DiaryEntry.ACTIVITY_CHOICES, required=False)
+    crop = serializers.CharField(max_length=100, required=False)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError("start must not be after end")
+        return attrs
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    """Date range for diary analytics; defaults to the recent weeks up to today"""
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        end = attrs.get('end') or timezone.localdate()
+        start = attrs.get('start') or end - timedelta(weeks=settings.FARM_ANALYTICS_DEFAULT_WEEKS)
+        if start > end:
+            raise serializers.ValidationError("start must not be after end")
+        if (end - start).days > settings.FARM_ANALYTICS_MAX_WEEKS * 7:
+            raise serializers.ValidationError(f"The range may span at most {settings.FARM_ANALYTICS_MAX_WEEKS} weeks")
+        return {'start': start, 'end': end}
+
+
+class NearbyQuerySerializer(serializers.Serializer):
+    """Search radius around the user's farm"""
+
+    radius_km = serializers.FloatField(min_value=0.1, max_value=50, default=10)
+    crop = serializers.CharField(max_length=100, required=False)
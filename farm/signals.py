@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from finance.models import FinancialLedgerEntry
+
+from .analytics import invalidate
+from .models import DiaryEntry, FarmProfile, crop_index
+
+
+@receiver(post_save, sender=DiaryEntry)
+@receiver(post_delete, sender=DiaryEntry)
+@receiver(post_save, sender=FinancialLedgerEntry)
+@receiver(post_delete, sender=FinancialLedgerEntry)
+def invalidate_analytics(sender, instance, raw=False, **kwargs):
+    """Drop the owner's cached analytics once the write commits"""
+    if raw:
+        return
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate(user_id))
+
+
+@receiver(post_save, sender=FarmProfile)
+def sync_farm_crops(sender, instance, raw=False, **kwargs):
+    """Mirror primary_crops into the crop links"""
+    if raw:
+        return
+    crop_index.sync([instance])
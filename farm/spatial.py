@@ -0,0 +1,115 @@
+"""
+Proximity queries over farm locations without a spatial database.
+
+Every ``FarmProfile`` stores the geohash of its location at
+``settings.FARM_GEOHASH_PRECISION`` in an indexed column. Geohashes sharing
+a prefix lie in the same grid cell, so all farms in a cell match
+``geohash LIKE 'prefix%'``. A hand-built range such as ``prefix <= geohash
+< prefix + '~'`` would depend on the column's collation sorting '~' last,
+which PostgreSQL's locale collations do not; on PostgreSQL the
+``varchar_pattern_ops`` index turns the LIKE into a B-tree range scan
+whatever the collation. SQLite scans instead, as its LIKE ignores case.
+
+A bounding box or radius query covers the area with at most
+``settings.FARM_SPATIAL_MAX_CELLS`` cells of the finest precision that
+fits, loads the coordinates of the farms in those cells, and filters them
+exactly with NumPy (box test, or haversine distance for a radius).
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+from core import geo
+
+from .models import FarmProfile
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+FarmMatch = namedtuple('FarmMatch', ['farm_id', 'user_id', 'lat', 'lon', 'distance_km'])
+
+
+def cell_size(precision):
+    """Return the ``(lat, lon)`` size in degrees of a geohash cell"""
+    bits = precision * 5
+    return 180.0 / (1 << (bits // 2)), 360.0 / (1 << ((bits + 1) // 2))
+
+
+def covering_cells(min_lat, min_lon, max_lat, max_lon, max_cells=None):
+    """Return the geohash prefixes of the cells that cover a bounding box"""
+    max_cells = max_cells or settings.FARM_SPATIAL_MAX_CELLS
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    min_lon, max_lon = max(min_lon, -180.0), min(max_lon, 180.0)
+    for precision in range(settings.FARM_GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = np.arange(math.floor((min_lat + 90) / height), math.floor((max_lat + 90) / height) + 1)
+        columns = np.arange(math.floor((min_lon + 180) / width), math.floor((max_lon + 180) / width) + 1)
+        if len(rows) * len(columns) <= max_cells or precision == 1:
+            break
+    # Encode the centre of every cell in the grid
+    lats = np.minimum((rows + 0.5) * height - 90, 90.0)
+    lons = np.minimum((columns + 0.5) * width - 180, 180.0)
+    grid_lats, grid_lons = np.meshgrid(lats, lons, indexing='ij')
+    return sorted(set(geo.encode_many(grid_lats.ravel(), grid_lons.ravel(), precision).tolist()))
+
+
+def cell_filter(cells):
+    condition = Q()
+    for cell in cells:
+        condition |= Q(geohash__startswith=cell)
+    return condition
+
+
+def candidates(min_lat, min_lon, max_lat, max_lon, queryset=None):
+    """Return ids, user ids and coordinate arrays of farms in the covering cells"""
+    queryset = FarmProfile.objects.all() if queryset is None else queryset
+    rows = list(
+        queryset.filter(cell_filter(covering_cells(min_lat, min_lon, max_lat, max_lon)))
+        .order_by()
+        .values_list('pk', 'user_id', 'location_lat', 'location_lon')
+    )
+    if not rows:
+        empty = np.array([], dtype=np.float64)
+        return [], [], empty, empty
+    ids, user_ids, lats, lons = zip(*rows)
+    return ids, user_ids, np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64)
+
+
+def farms_in_bbox(min_lat, min_lon, max_lat, max_lon, queryset=None):
+    """Return a ``FarmMatch`` for every farm inside the box"""
+    ids, user_ids, lats, lons = candidates(min_lat, min_lon, max_lat, max_lon, queryset)
+    inside = (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+    return [
+        FarmMatch(ids[i], user_ids[i], float(lats[i]), float(lons[i]), None)
+        for i in np.flatnonzero(inside)
+    ]
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance from one point to arrays of points"""
+    lat, lon = math.radians(lat), math.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def farms_within(lat, lon, radius_km, queryset=None):
+    """Return a ``FarmMatch`` for every farm within ``radius_km``, nearest first"""
+    lat, lon = float(lat), float(lon)
+    delta_lat = radius_km / KM_PER_DEGREE
+    # Widest longitude span of the circle, at the latitude nearest a pole
+    widest = min(abs(lat) + delta_lat, 90.0)
+    delta_lon = 180.0 if widest >= 89.9 else delta_lat / math.cos(math.radians(widest))
+    ids, user_ids, lats, lons = candidates(
+        lat - delta_lat, lon - delta_lon, lat + delta_lat, lon + delta_lon, queryset,
+    )
+    distances = haversine_km(lat, lon, lats, lons)
+    order = np.argsort(distances, kind='stable')
+    return [
+        FarmMatch(ids[i], user_ids[i], float(lats[i]), float(lons[i]), float(distances[i]))
+        for i in order if distances[i] <= radius_km
+    ]
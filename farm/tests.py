@@ -1,3 +1,227 @@
-from django.test import TestCase
+import csv
+import json
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+import random
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from finance.models import FinancialLedgerEntry
+
+from .models import Crop, DiaryEntry, FarmCrop, FarmProfile, crop_index
+from .spatial import covering_cells, farms_in_bbox, farms_within, haversine_km
+
+
+class DiaryExportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('farmer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        DiaryEntry.objects.bulk_create([
+            DiaryEntry(user=self.user, date=date(2026, 6, 1), activity_type='sowing',
+                       notes='Sowed paddy', crop_involved='paddy', area_covered=Decimal('1.50')),
+            DiaryEntry(user=self.user, date=date(2026, 6, 3), activity_type='watering', notes='Evening'),
+        ])
+
+    def test_exports_csv_with_filters(self):
+        response = self.client.get('/api/farm/diary/export/')
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows, [
+            ['date', 'activity_type', 'crop_involved', 'area_covered', 'weather_condition', 'notes'],
+            ['2026-06-01', 'sowing', 'paddy', '1.50', '', 'Sowed paddy'],
+            ['2026-06-03', 'watering', '', '', '', 'Evening'],
+        ])
+
+        watering = self.client.get('/api/farm/diary/export/', {'activity_type': 'watering', 'output': 'jsonl'})
+        self.assertEqual(len(b''.join(watering.streaming_content).splitlines()), 1)
+
+    def test_csv_cells_cannot_inject_formulas(self):
+        DiaryEntry.objects.create(user=self.user, date=date(2026, 6, 5), activity_type='other',
+                                  notes='=HYPERLINK("http://x.example","loan")', crop_involved='-2+3')
+
+        response = self.client.get('/api/farm/diary/export/', {'activity_type': 'other'})
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual((rows[1][2], rows[1][5]), ("'-2+3", '\'=HYPERLINK("http://x.example","loan")'))
+
+        jsonl = self.client.get('/api/farm/diary/export/', {'activity_type': 'other', 'output': 'jsonl'})
+        self.assertEqual(json.loads(b''.join(jsonl.streaming_content))['crop_involved'], '-2+3')
+
+
+class DiaryAnalyticsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('farmer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        DiaryEntry.objects.bulk_create([
+            # Monday 2026-06-01 and the following weeks
+            DiaryEntry(user=self.user, date=date(2026, 6, 1), activity_type='sowing', notes='-',
+                       crop_involved='paddy', area_covered=Decimal('2.00')),
+            DiaryEntry(user=self.user, date=date(2026, 6, 4), activity_type='watering', notes='-',
+                       crop_involved='paddy', area_covered=Decimal('2.00')),
+            DiaryEntry(user=self.user, date=date(2026, 6, 17), activity_type='weeding', notes='-'),
+        ])
+        FinancialLedgerEntry.objects.bulk_create([
+            FinancialLedgerEntry(user=self.user, date=date(2026, 6, 2), entry_type='expense', amount=Decimal('600.00'),
+                                 description='Seed', category='seeds', crop_related='paddy'),
+            FinancialLedgerEntry(user=self.user, date=date(2026, 6, 10), entry_type='expense', amount=Decimal('90.00'),
+                                 description='Sprayer', category='pesticides', crop_related='banana'),
+        ])
+        self.params = {'start': '2026-06-01', 'end': '2026-06-21'}
+
+    def test_weekly_grids_and_crop_spend(self):
+        response = self.client.get('/api/farm/diary/analytics/', self.params)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['weeks'], ['2026-06-01', '2026-06-08', '2026-06-15'])
+        self.assertEqual(response.data['activities'], {'sowing': [1, 0, 0], 'watering': [1, 0, 0], 'weeding': [0, 0, 1]})
+        self.assertEqual(response.data['weekly_activity_count'], [2, 0, 1])
+        banana, paddy = response.data['crops']
+        self.assertEqual(paddy, {
+            'crop': 'paddy', 'activity_count': [2, 0, 0], 'acres': [4.0, 0.0, 0.0], 'spend': [600.0, 0.0, 0.0],
+            'total_acres': 4.0, 'total_spend': 600.0, 'spend_per_acre': 150.0,
+        })
+        self.assertEqual((banana['spend'], banana['spend_per_acre']), ([0.0, 90.0, 0.0], None))
+
+    def test_crop_names_match_ignoring_case_and_spacing(self):
+        FinancialLedgerEntry.objects.create(
+            user=self.user, date=date(2026, 6, 3), entry_type='expense', amount=Decimal('200.00'),
+            description='Fertiliser', category='fertilizer', crop_related=' Paddy ',
+        )
+        DiaryEntry.objects.create(user=self.user, date=date(2026, 6, 16), activity_type='harvesting',
+                                  notes='-', crop_involved='PADDY', area_covered=Decimal('4.00'))
+
+        response = self.client.get('/api/farm/diary/analytics/', self.params)
+
+        self.assertEqual([crop['crop'] for crop in response.data['crops']], ['banana', 'paddy'])
+        paddy = response.data['crops'][1]
+        self.assertEqual((paddy['activity_count'], paddy['spend']), ([2, 0, 1], [800.0, 0.0, 0.0]))
+        self.assertEqual(paddy['spend_per_acre'], 100.0)
+
+    def test_cached_until_diary_or_ledger_write(self):
+        self.client.get('/api/farm/diary/analytics/', self.params)
+        with self.assertNumQueries(0):
+            self.client.get('/api/farm/diary/analytics/', self.params)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FinancialLedgerEntry.objects.create(
+                user=self.user, date=date(2026, 6, 16), entry_type='expense', amount=Decimal('40.00'),
+                description='Fuel', category='fuel', crop_related='paddy',
+            )
+        response = self.client.get('/api/farm/diary/analytics/', self.params)
+        self.assertEqual(response.data['crops'][1]['spend'], [600.0, 0.0, 40.0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DiaryEntry.objects.filter(activity_type='weeding').get().delete()
+        response = self.client.get('/api/farm/diary/analytics/', self.params)
+        self.assertEqual(response.data['weekly_activity_count'], [2, 0, 0])
+
+    def test_rejects_oversized_ranges(self):
+        response = self.client.get('/api/farm/diary/analytics/', {'start': '2020-01-01', 'end': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SpatialIndexTests(TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.farms = []
+        # Farms scattered around Kochi
+        for i in range(300):
+            user = User.objects.create_user(f'farmer{i}')
+            lat = Decimal(str(round(rng.uniform(9.6, 10.4), 6)))
+            lon = Decimal(str(round(rng.uniform(75.9, 76.7), 6)))
+            self.farms.append(FarmProfile.objects.create(
+                user=user, location_lat=lat, location_lon=lon, farm_size=Decimal('1.00'),
+                primary_crops='paddy', soil_type='loamy',
+            ))
+
+    def test_geohash_follows_location(self):
+        farm = self.farms[0]
+        self.assertEqual(len(farm.geohash), 9)
+        farm.location_lat, farm.location_lon = Decimal('42.6'), Decimal('-5.6')
+        farm.save(update_fields=['location_lat', 'location_lon'])
+        farm.refresh_from_db()
+        self.assertTrue(farm.geohash.startswith('ezs42'))
+
+    def test_radius_matches_brute_force(self):
+        for radius in (0.5, 5, 25):
+            expected = sorted(
+                (float(haversine_km(10.0, 76.3, float(f.location_lat), float(f.location_lon))), f.pk)
+                for f in self.farms
+            )
+            expected = [pk for distance, pk in expected if distance <= radius]
+            with self.assertNumQueries(1):
+                matches = farms_within(10.0, 76.3, radius)
+            self.assertEqual([match.farm_id for match in matches], expected)
+
+    def test_bbox_matches_brute_force(self):
+        box = (9.8, 76.0, 10.1, 76.25)
+        expected = {
+            f.pk for f in self.farms
+            if box[0] <= f.location_lat <= box[2] and box[1] <= f.location_lon <= box[3]
+        }
+        self.assertEqual({match.farm_id for match in farms_in_bbox(*box)}, expected)
+
+    @override_settings(FARM_SPATIAL_MAX_CELLS=4)
+    def test_cover_stays_within_cell_budget(self):
+        cells = covering_cells(9.8, 76.0, 10.1, 76.25)
+        self.assertLessEqual(len(cells), 4)
+        self.assertEqual(len({len(cell) for cell in cells}), 1)
+
+    def test_nearby_endpoint_hides_other_farmers(self):
+        client = APIClient()
+        client.force_authenticate(self.farms[0].user)
+        response = client.get('/api/farm/nearby/', {'radius_km': 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], len(farms_within(
+            self.farms[0].location_lat, self.farms[0].location_lon, 20)) - 1)
+        self.assertEqual(set(response.data['farms'][0]), {'distance_km', 'primary_crops', 'soil_type', 'farm_size'})
+
+
+class CropIndexTests(TestCase):
+
+    def farm(self, name, crops, lat='10.0'):
+        return FarmProfile.objects.create(
+            user=User.objects.create_user(name), location_lat=Decimal(lat), location_lon=Decimal('76.3'),
+            farm_size=Decimal('1.00'), primary_crops=crops, soil_type='loamy',
+        )
+
+    def growing(self, crop):
+        return sorted(crop_index.filter(FarmProfile.objects.all(), crop).values_list('user__username', flat=True))
+
+    def test_links_follow_primary_crops_without_partial_matches(self):
+        first = self.farm('first', 'Pepper, Banana')
+        self.farm('second', 'peanut;  pea ')
+        self.assertEqual(self.growing('pea'), ['second'])
+        self.assertEqual(self.growing(' PEPPER'), ['first'])
+
+        first.primary_crops = 'banana, coconut'
+        first.save()
+        self.assertEqual(self.growing('pepper'), [])
+        self.assertEqual(sorted(first.crops.values_list('name', flat=True)), ['banana', 'coconut'])
+        self.assertEqual(Crop.objects.filter(name='banana').count(), 1)
+
+        with self.assertNumQueries(1):
+            crop_index.sync([first])
+
+    def test_backfill_command_and_nearby_crop_filter(self):
+        me = self.farm('me', 'paddy')
+        self.farm('near', 'pepper', lat='10.01')
+        FarmProfile.objects.filter(user__username='near').update(primary_crops='pepper, paddy')
+        FarmCrop.objects.all().delete()
+
+        call_command('sync_term_links', only='crops', stdout=StringIO())
+
+        self.assertEqual(self.growing('paddy'), ['me', 'near'])
+        client = APIClient()
+        client.force_authenticate(me.user)
+        self.assertEqual(client.get('/api/farm/nearby/', {'crop': 'Pepper'}).data['count'], 1)
+        self.assertEqual(client.get('/api/farm/nearby/', {'crop': 'banana'}).data['count'], 0)
@@ -6,8 +6,11 @@ app_name = 'farm'
 urlpatterns = [
     # Farm profile endpoints
     path('profile/', views.FarmProfileView.as_view(), name='profile'),
+    path('nearby/', views.NearbyFarmsView.as_view(), name='nearby'),
     
     # Diary entry endpoints
     path('diary/', views.DiaryEntryListCreateView.as_view(), name='diary-list'),
+    path('diary/analytics/', views.DiaryAnalyticsView.as_view(), name='diary-analytics'),
+    path('diary/export/', views.DiaryExportView.as_view(), name='diary-export'),
     path('diary/<int:pk>/', views.DiaryEntryDetailView.as_view(), name='diary-detail'),
 ]
\ No newline at end of file
@@ -2,6 +2,25 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
+from core.export import export_response
+from core.serializers import ExportQuerySerializer
+
+from .analytics import get_analytics
+from .models import DiaryEntry, FarmProfile, crop_index
+from .serializers import AnalyticsQuerySerializer, DiaryQuerySerializer, NearbyQuerySerializer
+from .spatial import farms_within
+
+
+def diary_filters(params):
+    """Map validated diary filters to queryset lookups"""
+    lookups = {
+        'start': 'date__gte',
+        'end': 'date__lte',
+        'activity_type': 'activity_type',
+        'crop': 'crop_involved',
+    }
+    return {lookups[name]: value for name, value in params.items()}
+
 
 class FarmProfileView(APIView):
     """Farm profile endpoint - placeholder"""
@@ -19,6 +38,43 @@ class FarmProfileView(APIView):
         )
 
 
+class NearbyFarmsView(APIView):
+    """Other farms within a radius of the user's farm, nearest first, optionally by crop"""
+    
+    max_results = 50
+    
+    def get(self, request):
+        serializer = NearbyQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        farm = FarmProfile.objects.filter(user=request.user).values('location_lat', 'location_lon').first()
+        if farm is None:
+            return Response(
+                {"message": "Add a farm profile to find nearby farms"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        radius = serializer.validated_data['radius_km']
+        candidates = FarmProfile.objects.all()
+        if 'crop' in serializer.validated_data:
+            candidates = crop_index.filter(candidates, serializer.validated_data['crop'])
+        matches = [
+            match for match in farms_within(farm['location_lat'], farm['location_lon'], radius, candidates)
+            if match.user_id != request.user.pk
+        ]
+        details = FarmProfile.objects.in_bulk([match.farm_id for match in matches[:self.max_results]])
+        # Locations and owners of other farms are not disclosed
+        farms = [
+            {
+                'distance_km': round(match.distance_km, 1),
+                'primary_crops': details[match.farm_id].primary_crops,
+                'soil_type': details[match.farm_id].soil_type,
+                'farm_size': details[match.farm_id].farm_size,
+            }
+            for match in matches[:self.max_results]
+        ]
+        return Response({'count': len(matches), 'farms': farms}, status=status.HTTP_200_OK)
+
+
 class DiaryEntryListCreateView(APIView):
     """Diary entry list/create endpoint - placeholder"""
     
@@ -35,6 +91,37 @@ class DiaryEntryListCreateView(APIView):
         )
 
 
+class DiaryAnalyticsView(APIView):
+    """Weekly activity counts, acreage and crop spend from the diary and ledger"""
+    
+    def get(self, request):
+        serializer = AnalyticsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        analytics = get_analytics(request.user, **serializer.validated_data)
+        return Response(analytics, status=status.HTTP_200_OK)
+
+
+class DiaryExportView(APIView):
+    """Stream the user's diary as CSV or JSON Lines, optionally gzipped"""
+    
+    fields = ['date', 'activity_type', 'crop_involved', 'area_covered', 'weather_condition', 'notes']
+    
+    def get(self, request):
+        options = ExportQuerySerializer(data=request.query_params)
+        options.is_valid(raise_exception=True)
+        filters = DiaryQuerySerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        entries = (
+            DiaryEntry.objects
+            .filter(user=request.user, **diary_filters(filters.validated_data))
+            .order_by('date', 'created_at', 'id')
+        )
+        return export_response(
+            entries, self.fields, 'diary',
+            output=options.validated_data['output'], compress=options.validated_data['gzip'],
+        )
+
+
 class DiaryEntryDetailView(APIView):
     """Diary entry detail endpoint - placeholder"""
     
@@ -0,0 +1,213 @@
+"""
+Streaming import of ledger entries from CSV files and bank/UPI statements.
+
+Rows are parsed one at a time from the file, validated against the
+``FinancialLedgerEntry`` field validators and category lists, and saved
+in ``bulk_create`` batches of ``settings.LEDGER_IMPORT_BATCH_SIZE``, each
+in its own transaction together with its ``FinancialSummary`` update.
+Only one batch is held in memory at a time.
+
+Rows whose ``reference_number`` the user already has (in the database or
+earlier in the file) are skipped as duplicates.
+
+Two layouts are understood and detected from the header row:
+
+* ``ledger``: the model's own columns (``date``, ``entry_type``,
+  ``amount``, ``description``, ``category`` and optionally
+  ``crop_related``, ``payment_method``, ``reference_number``, ``notes``).
+* ``statement``: bank or UPI exports with a date, a narration, a
+  reference and separate debit/credit (withdrawal/deposit) columns. Debits
+  become ``other_expense`` entries and credits ``other_income``.
+"""
+import csv
+import re
+from collections import namedtuple
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from core import dashboard
+from farm.analytics import invalidate as invalidate_analytics
+
+from .models import FinancialLedgerEntry
+from .summary import apply_deltas, entry_deltas
+
+
+CATEGORIES = {
+    'income': {value for value, _ in FinancialLedgerEntry.INCOME_CATEGORIES},
+    'expense': {value for value, _ in FinancialLedgerEntry.EXPENSE_CATEGORIES},
+}
+DATE_FORMATS = ['%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y', '%d %b %Y', '%d-%b-%Y', '%d %b %y']
+MAX_REPORTED_ERRORS = 100
+
+# Statement header aliases, after normalize_header
+STATEMENT_COLUMNS = {
+    'date': ['date', 'txn_date', 'transaction_date', 'value_date', 'value_dt', 'tran_date'],
+    'description': ['narration', 'description', 'remarks', 'particulars', 'transaction_details'],
+    'reference_number': ['ref_no', 'reference_no', 'reference_number', 'chq_ref_no', 'utr',
+                         'utr_no', 'upi_ref_no', 'transaction_id', 'cheque_no'],
+    'debit': ['debit', 'withdrawal', 'withdrawal_amt', 'withdrawal_amount', 'debit_amount', 'dr'],
+    'credit': ['credit', 'deposit', 'deposit_amt', 'deposit_amount', 'credit_amount', 'cr'],
+}
+
+ImportResult = namedtuple('ImportResult', ['created', 'duplicates', 'error_count', 'errors'])
+
+
+class ImportFormatError(Exception):
+    """Raised when a file's header matches no known layout"""
+
+
+def normalize_header(name):
+    return re.sub(r'[^a-z0-9]+', '_', (name or '').strip().lower()).strip('_')
+
+
+def parse_date(value):
+    value = value.strip()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValidationError(f"Unrecognised date {value!r}")
+
+
+def parse_amount(value):
+    return value.replace(',', '').replace('₹', '').strip()
+
+
+class LedgerImporter:
+    """Validates and saves ledger rows for one user"""
+
+    def __init__(self, user, batch_size=None):
+        self.user = user
+        self.batch_size = batch_size or settings.LEDGER_IMPORT_BATCH_SIZE
+        self.fields = {field.name: field for field in FinancialLedgerEntry._meta.concrete_fields}
+
+    # Row mapping
+
+    def detect_layout(self, headers):
+        if {'date', 'entry_type', 'amount', 'category'} <= set(headers):
+            return 'ledger'
+        columns = {}
+        for column, aliases in STATEMENT_COLUMNS.items():
+            columns[column] = next((alias for alias in aliases if alias in headers), None)
+        if columns['date'] and (columns['debit'] or columns['credit']):
+            self.statement_columns = columns
+            return 'statement'
+        raise ImportFormatError(
+            "Unrecognised columns; expected a ledger CSV (date, entry_type, amount, category, ...) "
+            "or a statement with date and debit/credit columns"
+        )
+
+    def from_statement(self, row):
+        columns = self.statement_columns
+        debit = parse_amount(row.get(columns['debit']) or '') if columns['debit'] else ''
+        credit = parse_amount(row.get(columns['credit']) or '') if columns['credit'] else ''
+        if debit and debit.strip('0.'):
+            entry_type, amount = 'expense', debit
+        elif credit and credit.strip('0.'):
+            entry_type, amount = 'income', credit
+        else:
+            raise ValidationError("Row has neither a debit nor a credit amount")
+        description = (row.get(columns['description']) or '').strip() if columns['description'] else ''
+        return {
+            'date': row[columns['date']],
+            'entry_type': entry_type,
+            'amount': amount,
+            'description': description[:200] or 'Statement entry',
+            'category': 'other_expense' if entry_type == 'expense' else 'other_income',
+            'payment_method': 'upi' if 'upi' in description.lower() else 'bank_transfer',
+            'reference_number': (row.get(columns['reference_number']) or '').strip()
+            if columns['reference_number'] else '',
+        }
+
+    def build_entry(self, values):
+        """Validate mapped values and return an unsaved entry"""
+        entry_type = (values.get('entry_type') or '').strip().lower()
+        if entry_type not in CATEGORIES:
+            raise ValidationError(f"entry_type must be 'income' or 'expense', not {entry_type!r}")
+        category = (values.get('category') or '').strip().lower()
+        if category not in CATEGORIES[entry_type]:
+            raise ValidationError(f"{category!r} is not a valid {entry_type} category")
+
+        cleaned = {
+            'date': parse_date(values.get('date') or ''),
+            'amount': self.fields['amount'].clean(parse_amount(values.get('amount') or ''), None),
+        }
+        for name in ('description', 'crop_related', 'payment_method', 'reference_number', 'notes'):
+            value = (values.get(name) or '').strip()
+            if not value:
+                continue
+            if name == 'payment_method':
+                value = value.lower()
+            cleaned[name] = self.fields[name].clean(value, None)
+        if 'description' not in cleaned:
+            raise ValidationError("description is required")
+        return FinancialLedgerEntry(user=self.user, entry_type=entry_type, category=category, **cleaned)
+
+    # Import
+
+    def run(self, text_stream):
+        """Import every row of ``text_stream``; returns an ``ImportResult``"""
+        reader = csv.reader(text_stream)
+        try:
+            headers = [normalize_header(name) for name in next(reader)]
+        except StopIteration:
+            raise ImportFormatError("The file is empty")
+        layout = self.detect_layout(headers)
+
+        created = duplicates = error_count = 0
+        errors = []
+        batch = []
+        for line, values in enumerate(reader, start=2):
+            if not any(value.strip() for value in values):
+                continue
+            row = dict(zip(headers, values))
+            try:
+                entry = self.build_entry(self.from_statement(row) if layout == 'statement' else row)
+            except ValidationError as exc:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line, 'errors': exc.messages})
+                continue
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                saved, skipped = self.save_batch(batch)
+                created += saved
+                duplicates += skipped
+                batch = []
+        if batch:
+            saved, skipped = self.save_batch(batch)
+            created += saved
+            duplicates += skipped
+        if created:
+            # bulk_create skips the signals that drop cached analytics
+            invalidate_analytics(self.user.pk)
+            dashboard.invalidate(self.user.pk, 'finance')
+        return ImportResult(created, duplicates, error_count, errors)
+
+    def save_batch(self, batch):
+        """Save a batch, skipping duplicate references; returns ``(created, skipped)``"""
+        references = {entry.reference_number for entry in batch if entry.reference_number}
+        with transaction.atomic():
+            seen = set(
+                FinancialLedgerEntry.objects
+                .filter(user=self.user, reference_number__in=references)
+                .values_list('reference_number', flat=True)
+            ) if references else set()
+            entries = []
+            for entry in batch:
+                if entry.reference_number:
+                    if entry.reference_number in seen:
+                        continue
+                    seen.add(entry.reference_number)
+                entries.append(entry)
+            FinancialLedgerEntry.objects.bulk_create(entries)
+            apply_deltas(entry_deltas(entries))
+        return len(entries), len(batch) - len(entries)
@@ -0,0 +1,68 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.pagination import encode_cursor, keyset_page
+from finance.models import FinancialLedgerEntry
+from finance.serializers import LEDGER_LIST_FIELDS
+from finance.views import LEDGER_KEY
+
+
+class Command(BaseCommand):
+    help = "Time deep ledger pages, keyset against OFFSET, on synthetic ledgers (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entries',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help="Ledger sizes to benchmark",
+        )
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20, help="Timed fetches per measurement")
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        self.stdout.write(f"{'entries':>8} {'first':>9} {'keyset':>9} {'offset':>9}  (ms per page at 90% depth)")
+        for count in options['entries']:
+            with transaction.atomic():
+                user = User.objects.create_user('ledger-benchmark')
+                self.populate(user, count)
+                entries = (
+                    FinancialLedgerEntry.objects.filter(user=user)
+                    .order_by(*('-' + field for field in LEDGER_KEY))
+                    .only(*LEDGER_LIST_FIELDS)
+                )
+                depth = int(count * 0.9)
+                anchor = entries[depth - 1] if depth else None
+                cursor = encode_cursor([getattr(anchor, field) for field in LEDGER_KEY]) if anchor else None
+
+                first = self.time(lambda: keyset_page(entries, None, page_size, LEDGER_KEY), options['repeat'])
+                keyset = self.time(lambda: keyset_page(entries, cursor, page_size, LEDGER_KEY), options['repeat'])
+                offset = self.time(lambda: list(entries[depth:depth + page_size]), options['repeat'])
+                self.stdout.write(f"{count:>8} {first:>9.2f} {keyset:>9.2f} {offset:>9.2f}")
+                transaction.set_rollback(True)
+
+    def populate(self, user, count):
+        start = date(2020, 1, 1)
+        batch = []
+        for i in range(count):
+            batch.append(FinancialLedgerEntry(
+                user=user, date=start + timedelta(days=i % 2000), entry_type='expense',
+                amount=Decimal('10.00'), description=f'Entry {i}', category='labor',
+            ))
+            if len(batch) == 5000:
+                FinancialLedgerEntry.objects.bulk_create(batch)
+                batch = []
+        FinancialLedgerEntry.objects.bulk_create(batch)
+
+    def time(self, fetch, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fetch()
+        return (time.perf_counter() - started) / repeat * 1000
@@ -0,0 +1,47 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.importing import ImportFormatError, LedgerImporter
+
+
+class Command(BaseCommand):
+    help = "Import ledger entries from a ledger CSV or a bank/UPI statement export"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to import")
+        parser.add_argument('--user', required=True, help="Username that owns the entries")
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help="Rows per insert transaction (defaults to LEDGER_IMPORT_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help="Text encoding of the file",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist")
+
+        importer = LedgerImporter(user, batch_size=options['batch_size'])
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding=options['encoding'], newline='') as stream:
+                result = importer.run(stream)
+        except (OSError, ImportFormatError) as exc:
+            raise CommandError(str(exc))
+
+        for error in result.errors:
+            self.stderr.write(f"Line {error['line']}: {'; '.join(error['errors'])}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... and {result.error_count - len(result.errors)} more invalid rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} entries ({result.duplicates} duplicates, "
+            f"{result.error_count} invalid) in {time.perf_counter() - started:.2f}s"
+        ))
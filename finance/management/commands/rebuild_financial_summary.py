@@ -0,0 +1,30 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.summary import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute FinancialSummary buckets from the ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help="Username to rebuild (defaults to every user)",
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']!r} does not exist")
+
+        started = time.perf_counter()
+        buckets = rebuild_summaries(user)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {buckets} summary buckets in {time.perf_counter() - started:.2f}s"
+        ))
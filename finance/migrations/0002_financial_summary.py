@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:23
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_summaries(apps, schema_editor):
+    from django.db.models import Count, Sum, Value
+    from django.db.models.functions import Coalesce, TruncMonth
+
+    FinancialLedgerEntry = apps.get_model('finance', 'FinancialLedgerEntry')
+    FinancialSummary = apps.get_model('finance', 'FinancialSummary')
+    rows = (
+        FinancialLedgerEntry.objects.order_by()
+        .annotate(month=TruncMonth('date'), crop=Coalesce('crop_related', Value('')))
+        .values('user_id', 'month', 'entry_type', 'category', 'crop')
+        .annotate(total=Sum('amount'), entry_count=Count('id'))
+    )
+    FinancialSummary.objects.bulk_create([
+        FinancialSummary(
+            user_id=row['user_id'], month=row['month'], entry_type=row['entry_type'],
+            category=row['category'], crop_related=row['crop'],
+            total=row['total'], entry_count=row['entry_count'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinancialSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('entry_type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('category', models.CharField(max_length=50)),
+                ('crop_related', models.CharField(blank=True, default='', help_text='Crop of the entries; empty when not crop specific', max_length=100)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='financial_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Financial Summary',
+                'verbose_name_plural': 'Financial Summaries',
+                'ordering': ['month', 'entry_type', 'category', 'crop_related'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'month', 'entry_type', 'category', 'crop_related'), name='financial_summary_bucket')],
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
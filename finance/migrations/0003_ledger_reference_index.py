@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_financial_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='financialledgerentry',
+            index=models.Index(fields=['user', 'reference_number'], name='ledger_entry_user_reference'),
+        ),
+    ]
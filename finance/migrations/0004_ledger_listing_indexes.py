@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_ledger_reference_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='financialledgerentry',
+            index=models.Index(fields=['user', '-date', '-created_at', '-id'], name='ledger_entry_user_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='financialledgerentry',
+            index=models.Index(fields=['user', 'entry_type', 'category', '-date'], name='ledger_entry_user_category'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from decimal import Decimal
@@ -97,7 +97,51 @@ class FinancialLedgerEntry(models.Model):
         """Return amount with appropriate sign for calculations"""
         return self.amount if self.entry_type == 'income' else -self.amount
     
+    def save(self, *args, **kwargs):
+        # The FinancialSummary update in the save signals commits with the entry
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     class Meta:
         verbose_name = "Financial Ledger Entry"
         verbose_name_plural = "Financial Ledger Entries"
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Keyset pagination of a user's ledger, also used by date ranges
+            models.Index(fields=['user', '-date', '-created_at', '-id'], name='ledger_entry_user_keyset'),
+            models.Index(fields=['user', 'entry_type', 'category', '-date'], name='ledger_entry_user_category'),
+            # Duplicate detection on import
+            models.Index(fields=['user', 'reference_number'], name='ledger_entry_user_reference'),
+        ]
+
+
+class FinancialSummary(models.Model):
+    """Running ledger totals per user, month, entry type, category and crop"""
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='financial_summaries')
+    month = models.DateField(help_text="First day of the month")
+    entry_type = models.CharField(max_length=10, choices=FinancialLedgerEntry.ENTRY_TYPES)
+    category = models.CharField(max_length=50)
+    crop_related = models.CharField(
+        max_length=100, 
+        blank=True, 
+        default='',
+        help_text="Crop of the entries; empty when not crop specific"
+    )
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+    entry_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.month:%Y-%m} {self.entry_type}/{self.category}: ₹{self.total}"
+    
+    class Meta:
+        verbose_name = "Financial Summary"
+        verbose_name_plural = "Financial Summaries"
+        ordering = ['month', 'entry_type', 'category', 'crop_related']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'month', 'entry_type', 'category', 'crop_related'],
+                name='financial_summary_bucket',
+            ),
+        ]
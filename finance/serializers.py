@@ -0,0 +1,59 @@
+from rest_framework import serializers
+
+from .importing import CATEGORIES
+from .models import FinancialLedgerEntry
+
+# Columns served by the ledger listing; notes are only returned by the detail view
+LEDGER_LIST_FIELDS = [
+    'id', 'date', 'entry_type', 'amount', 'description', 'category',
+    'crop_related', 'payment_method', 'reference_number', 'created_at',
+]
+
+
+class FinancialLedgerEntrySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = FinancialLedgerEntry
+        fields = LEDGER_LIST_FIELDS + ['notes']
+        read_only_fields = ['id', 'created_at']
+        extra_kwargs = {'notes': {'write_only': True}}
+
+    def validate(self, attrs):
+        entry_type = attrs.get('entry_type', getattr(self.instance, 'entry_type', None))
+        category = attrs.get('category', getattr(self.instance, 'category', None))
+        if category not in CATEGORIES.get(entry_type, ()):
+            raise serializers.ValidationError({'category': f"{category!r} is not a valid {entry_type} category"})
+        return attrs
+
+
+class LedgerQuerySerializer(serializers.Serializer):
+    """Optional filters for the ledger listing"""
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    entry_type = serializers.ChoiceField(choices=FinancialLedgerEntry.ENTRY_TYPES, required=False)
+    category = serializers.CharField(max_length=50, required=False)
+    crop = serializers.CharField(max_length=100, required=False)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError("start must not be after end")
+        return attrs
+
+
+class FinancialSummaryQuerySerializer(serializers.Serializer):
+    """Optional month range for the financial summary, as YYYY-MM"""
+
+    start = serializers.DateField(input_formats=['%Y-%m'], required=False)
+    end = serializers.DateField(input_formats=['%Y-%m'], required=False)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError("start must not be after end")
+        return attrs
+
+
+class LedgerImportSerializer(serializers.Serializer):
+    """Ledger CSV or bank/UPI statement upload"""
+
+    file = serializers.FileField()
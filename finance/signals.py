@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import FinancialLedgerEntry
+from .summary import BUCKET_FIELDS, apply_deltas, entry_deltas
+
+
+@receiver(pre_save, sender=FinancialLedgerEntry)
+def remember_previous_bucket(sender, instance, raw=False, **kwargs):
+    """Capture the stored amount and bucket before an update overwrites them"""
+    if raw or instance._state.adding:
+        instance._summary_previous = None
+        return
+    instance._summary_previous = (
+        FinancialLedgerEntry.objects.filter(pk=instance.pk).values(*BUCKET_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=FinancialLedgerEntry)
+def update_summary_on_save(sender, instance, raw=False, **kwargs):
+    """Move the entry's amount from its previous bucket to its current one"""
+    if raw:
+        return
+    previous = getattr(instance, '_summary_previous', None)
+    deltas = entry_deltas([previous], sign=-1) if previous else None
+    apply_deltas(entry_deltas([instance], deltas=deltas))
+
+
+@receiver(post_delete, sender=FinancialLedgerEntry)
+def update_summary_on_delete(sender, instance, **kwargs):
+    apply_deltas(entry_deltas([instance], sign=-1))
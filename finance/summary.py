@@ -0,0 +1,156 @@
+"""
+Materialised ledger totals.
+
+``FinancialSummary`` keeps one row per (user, month, entry type, category,
+crop) bucket with the total amount and number of entries. Ledger signals
+move an entry's amount between buckets inside the entry's own transaction,
+so summaries never disagree with committed entries and the summary
+endpoint reads a handful of buckets instead of the whole ledger.
+
+``rebuild_summaries`` recomputes the table from the ledger; run it through
+``rebuild_financial_summary`` after writes that bypass model signals.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+
+from .models import FinancialLedgerEntry, FinancialSummary
+
+
+BUCKET_FIELDS = ('user_id', 'date', 'entry_type', 'category', 'crop_related', 'amount')
+
+# Totals are rendered like ledger amounts: strings with two decimal places
+MONEY_FIELD = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+def money(amount):
+    """Render a Decimal amount for API payloads, e.g. ``'1200.50'``"""
+    return MONEY_FIELD.to_representation(amount)
+
+
+def bucket_of(user_id, date, entry_type, category, crop_related):
+    """Return the summary bucket key of an entry"""
+    if isinstance(date, str):
+        date = parse_date(date)
+    return (user_id, date.replace(day=1), entry_type, category, crop_related or '')
+
+
+def apply_deltas(deltas):
+    """Add ``{bucket: (amount, count)}`` deltas to the summary rows"""
+    with transaction.atomic():
+        for (user_id, month, entry_type, category, crop), (amount, count) in deltas.items():
+            if not amount and not count:
+                continue
+            bucket = FinancialSummary.objects.filter(
+                user_id=user_id, month=month, entry_type=entry_type,
+                category=category, crop_related=crop,
+            )
+            updated = bucket.update(total=F('total') + amount, entry_count=F('entry_count') + count)
+            if not updated:
+                _, created = FinancialSummary.objects.get_or_create(
+                    user_id=user_id, month=month, entry_type=entry_type, category=category,
+                    crop_related=crop, defaults={'total': amount, 'entry_count': count},
+                )
+                if not created:
+                    # Another transaction created the bucket first
+                    bucket.update(total=F('total') + amount, entry_count=F('entry_count') + count)
+            if count < 0:
+                # Buckets left without entries are removed
+                bucket.filter(entry_count__lte=0).delete()
+
+
+def entry_deltas(entries, sign=1, deltas=None):
+    """Sum entries (objects or value dicts) into ``{bucket: (amount, count)}``"""
+    if deltas is None:
+        deltas = defaultdict(lambda: (Decimal('0'), 0))
+    for entry in entries:
+        if not isinstance(entry, dict):
+            entry = {field: getattr(entry, field) for field in BUCKET_FIELDS}
+        key = bucket_of(entry['user_id'], entry['date'], entry['entry_type'],
+                        entry['category'], entry['crop_related'])
+        amount, count = deltas[key]
+        deltas[key] = (amount + sign * Decimal(entry['amount']), count + sign)
+    return deltas
+
+
+def rebuild_summaries(user=None):
+    """Recompute ``FinancialSummary`` from the ledger; returns the bucket count"""
+    entries = FinancialLedgerEntry.objects.order_by()
+    summaries = FinancialSummary.objects.all()
+    if user is not None:
+        entries = entries.filter(user=user)
+        summaries = summaries.filter(user=user)
+
+    rows = (
+        entries
+        .annotate(month=TruncMonth('date'), crop=Coalesce('crop_related', Value('')))
+        .values('user_id', 'month', 'entry_type', 'category', 'crop')
+        .annotate(total=Sum('amount'), entry_count=Count('id'))
+    )
+    buckets = [
+        FinancialSummary(
+            user_id=row['user_id'], month=row['month'], entry_type=row['entry_type'],
+            category=row['category'], crop_related=row['crop'],
+            total=row['total'], entry_count=row['entry_count'],
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        summaries.delete()
+        FinancialSummary.objects.bulk_create(buckets, batch_size=1000)
+    return len(buckets)
+
+
+def summarize(user, start=None, end=None):
+    """Build the summary payload for ``user`` from the bucket rows
+
+    ``start`` and ``end`` are optional first-of-month dates (inclusive).
+    Amounts are rendered with ``money``.
+    """
+    buckets = FinancialSummary.objects.filter(user=user)
+    if start is not None:
+        buckets = buckets.filter(month__gte=start)
+    if end is not None:
+        buckets = buckets.filter(month__lte=end)
+
+    zero = Decimal('0.00')
+    totals = {'income': zero, 'expense': zero}
+    months = defaultdict(lambda: {'income': zero, 'expense': zero})
+    crops = defaultdict(lambda: {'income': zero, 'expense': zero})
+    by_category = defaultdict(lambda: [zero, 0])
+    for month, entry_type, category, crop, total, count in buckets.values_list(
+        'month', 'entry_type', 'category', 'crop_related', 'total', 'entry_count'
+    ):
+        totals[entry_type] += total
+        months[month][entry_type] += total
+        if crop:
+            crops[crop][entry_type] += total
+        bucket = by_category[entry_type, category]
+        bucket[0] += total
+        bucket[1] += count
+
+    categories = [
+        {'entry_type': entry_type, 'category': category, 'total': money(total), 'count': count}
+        for (entry_type, category), (total, count) in sorted(by_category.items())
+    ]
+
+    def with_net(values):
+        return {
+            'income': money(values['income']),
+            'expense': money(values['expense']),
+            'net': money(values['income'] - values['expense']),
+        }
+
+    return {
+        **with_net(totals),
+        'by_month': [
+            {'month': f'{month:%Y-%m}', **with_net(values)} for month, values in sorted(months.items())
+        ],
+        'by_category': categories,
+        'by_crop': [{'crop': crop, **with_net(values)} for crop, values in sorted(crops.items())],
+    }
@@ -1,3 +1,286 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+import csv
+import gzip
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import FinancialLedgerEntry, FinancialSummary
+from .importing import LedgerImporter
+from .summary import rebuild_summaries
+
+
+def buckets(user):
+    return sorted(
+        FinancialSummary.objects.filter(user=user)
+        .values_list('month', 'entry_type', 'category', 'crop_related', 'total', 'entry_count')
+    )
+
+
+class FinancialSummaryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('farmer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add(self, day, entry_type, amount, category, crop=None):
+        return FinancialLedgerEntry.objects.create(
+            user=self.user, date=day, entry_type=entry_type, amount=Decimal(amount),
+            description='entry', category=category, crop_related=crop,
+        )
+
+    def test_buckets_follow_create_update_and_delete(self):
+        sale = self.add(date(2026, 1, 5), 'income', '5000.00', 'crop_sale', 'paddy')
+        self.add(date(2026, 1, 20), 'income', '1500.00', 'crop_sale', 'paddy')
+        seeds = self.add(date(2026, 1, 7), 'expense', '800.00', 'seeds', 'paddy')
+        self.add(date(2026, 2, 1), 'expense', '300.00', 'fuel')
+
+        sale.amount = Decimal('4500.00')
+        sale.save()
+        seeds.date = date(2026, 2, 3)
+        seeds.crop_related = 'banana'
+        seeds.save()
+        FinancialLedgerEntry.objects.filter(category='fuel').delete()
+
+        self.assertEqual(buckets(self.user), [
+            (date(2026, 1, 1), 'income', 'crop_sale', 'paddy', Decimal('6000.00'), 2),
+            (date(2026, 2, 1), 'expense', 'seeds', 'banana', Decimal('800.00'), 1),
+        ])
+        incremental = buckets(self.user)
+        rebuild_summaries(self.user)
+        self.assertEqual(buckets(self.user), incremental)
+
+    def test_summary_endpoint_reads_only_buckets(self):
+        for day in range(1, 29):
+            self.add(date(2026, 3, day), 'expense', '10.00', 'labor', 'pepper')
+        self.add(date(2026, 3, 30), 'income', '900.00', 'crop_sale', 'pepper')
+        self.add(date(2026, 4, 2), 'income', '100.00', 'government_subsidy')
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/finance/summary/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.json()['income'], response.json()['expense'], response.json()['net']),
+            ('1000.00', '280.00', '720.00'),
+        )
+        self.assertEqual(response.json()['by_month'][0], {
+            'month': '2026-03', 'income': '900.00', 'expense': '280.00', 'net': '620.00',
+        })
+        self.assertEqual(response.json()['by_crop'], [{
+            'crop': 'pepper', 'income': '900.00', 'expense': '280.00', 'net': '620.00',
+        }])
+        self.assertIn(
+            {'entry_type': 'expense', 'category': 'labor', 'total': '280.00', 'count': 28},
+            response.json()['by_category'],
+        )
+
+        april = self.client.get('/api/finance/summary/', {'start': '2026-04', 'end': '2026-04'})
+        self.assertEqual(april.json()['income'], '100.00')
+        self.assertEqual(self.client.get('/api/finance/summary/', {'start': 'March'}).status_code, 400)
+
+    def test_rebuild_command_recovers_from_bulk_writes(self):
+        FinancialLedgerEntry.objects.bulk_create([
+            FinancialLedgerEntry(user=self.user, date=date(2026, 5, 1), entry_type='income',
+                                 amount=Decimal('50.00'), description='bulk', category='dairy_products')
+            for _ in range(3)
+        ])
+        self.assertFalse(FinancialSummary.objects.exists())
+
+        call_command('rebuild_financial_summary', stdout=StringIO())
+
+        self.assertEqual(buckets(self.user), [
+            (date(2026, 5, 1), 'income', 'dairy_products', '', Decimal('150.00'), 3),
+        ])
+
+
+class LedgerImportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('cooperative')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ledger_csv_is_validated_batched_and_deduplicated(self):
+        FinancialLedgerEntry.objects.create(
+            user=self.user, date=date(2026, 1, 2), entry_type='income', amount=Decimal('10.00'),
+            description='existing', category='crop_sale', reference_number='R1',
+        )
+        rows = [
+            'Date,Entry Type,Amount,Description,Category,Crop Related,Payment Method,Reference Number',
+            '2026-01-05,income,"1,200.50",Paddy sale,crop_sale,paddy,UPI,R1',
+            '2026-01-06,expense,300,Diesel,fuel,,cash,R2',
+            '06/01/2026,expense,300,Diesel again,fuel,,cash,R2',
+            '2026-01-07,expense,0,Free seeds,seeds,,,',
+            '2026-01-08,expense,10.999,Seeds,seeds,,,',
+            '2026-01-09,income,50,Odd,fuel,,,',
+            '',
+        ] + [f'2026-02-{day:02d},expense,25.00,Wages,labor,banana,bank_transfer,W{day}' for day in range(1, 21)]
+        upload = SimpleUploadedFile('ledger.csv', '\n'.join(rows).encode(), content_type='text/csv')
+
+        with self.settings(LEDGER_IMPORT_BATCH_SIZE=7):
+            response = self.client.post('/api/finance/ledger/import/', {'file': upload})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['duplicates'], response.data['error_count']),
+                         (21, 2, 3))
+        self.assertEqual([error['line'] for error in response.data['errors']], [5, 6, 7])
+        self.assertEqual(FinancialLedgerEntry.objects.filter(user=self.user, reference_number='R2').count(), 1)
+        incremental = buckets(self.user)
+        rebuild_summaries(self.user)
+        self.assertEqual(buckets(self.user), incremental)
+
+    def test_statement_columns_map_to_entries(self):
+        statement = (
+            'Txn Date,Narration,Ref No.,Withdrawal Amt.,Deposit Amt.\n'
+            '03/04/2026,UPI/fertiliser depot,UTR1,"2,000.00",\n'
+            '05/04/2026,NEFT milk society,UTR2,,850.00\n'
+        )
+        result = LedgerImporter(self.user).run(StringIO(statement))
+
+        self.assertEqual((result.created, result.error_count), (2, 0))
+        self.assertEqual(
+            sorted(FinancialLedgerEntry.objects.values_list(
+                'date', 'entry_type', 'amount', 'category', 'payment_method', 'reference_number'
+            )),
+            [
+                (date(2026, 4, 3), 'expense', Decimal('2000.00'), 'other_expense', 'upi', 'UTR1'),
+                (date(2026, 4, 5), 'income', Decimal('850.00'), 'other_income', 'bank_transfer', 'UTR2'),
+            ],
+        )
+
+    def test_unknown_layout_is_rejected(self):
+        upload = SimpleUploadedFile('notes.csv', b'name,value\na,b\n', content_type='text/csv')
+        response = self.client.post('/api/finance/ledger/import/', {'file': upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FinancialLedgerEntry.objects.exists())
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('date,entry_type,amount,description,category\n2026-06-01,income,99,Eggs,dairy_products\n')
+        self.addCleanup(os.remove, handle.name)
+        out = StringIO()
+
+        call_command('import_ledger', handle.name, user='cooperative', stdout=out)
+
+        self.assertIn('Imported 1 entries', out.getvalue())
+        self.assertEqual(buckets(self.user), [
+            (date(2026, 6, 1), 'income', 'dairy_products', '', Decimal('99.00'), 1),
+        ])
+
+
+class LedgerListingTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('farmer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Three entries per day so pages split rows that share a date
+        FinancialLedgerEntry.objects.bulk_create([
+            FinancialLedgerEntry(
+                user=self.user, date=date(2026, 1, 1 + i // 3), entry_type='expense',
+                amount=Decimal('10.00'), description=f'entry {i}',
+                category='labor' if i % 2 else 'seeds', notes='long notes',
+            )
+            for i in range(60)
+        ])
+
+    def walk(self, **params):
+        descriptions = []
+        cursor = None
+        while True:
+            response = self.client.get('/api/finance/ledger/', {**params, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            descriptions += [entry['description'] for entry in response.data['results']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return descriptions
+
+    def test_walks_ledger_newest_first_without_gaps(self):
+        descriptions = self.walk(limit=7)
+        expected = [
+            entry.description for entry in
+            FinancialLedgerEntry.objects.order_by('-date', '-created_at', '-id')
+        ]
+        self.assertEqual(descriptions, expected)
+        self.assertEqual(len(set(descriptions)), 60)
+
+    def test_filters_and_single_query_pages(self):
+        labor = self.walk(limit=4, category='labor', start='2026-01-05', end='2026-01-10')
+        self.assertEqual(
+            sorted(labor),
+            sorted(f'entry {i}' for i in range(12, 30) if i % 2),
+        )
+
+        first = self.client.get('/api/finance/ledger/', {'limit': 10})
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/finance/ledger/', {'cursor': first.data['next_cursor']})
+        self.assertNotIn('notes', response.data['results'][0])
+
+        self.assertEqual(self.client.get('/api/finance/ledger/', {'cursor': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/finance/ledger/', {'start': 'soon'}).status_code, 400)
+
+    def test_creates_entries_for_the_requesting_user(self):
+        payload = {
+            'date': '2026-03-01', 'entry_type': 'income', 'amount': '450.00',
+            'description': 'Milk', 'category': 'dairy_products',
+        }
+        response = self.client.post('/api/finance/ledger/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(FinancialLedgerEntry.objects.get(pk=response.data['id']).user, self.user)
+        self.assertIn((date(2026, 3, 1), 'income', 'dairy_products', '', Decimal('450.00'), 1), buckets(self.user))
+
+        invalid = self.client.post('/api/finance/ledger/', {**payload, 'category': 'fuel'}, format='json')
+        self.assertEqual(invalid.status_code, 400)
+        zero = self.client.post('/api/finance/ledger/', {**payload, 'amount': '0.00'}, format='json')
+        self.assertEqual(zero.status_code, 400)
+
+
+class LedgerExportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('farmer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        other = User.objects.create_user('other')
+        FinancialLedgerEntry.objects.bulk_create([
+            FinancialLedgerEntry(
+                user=self.user, date=date(2026, 1, 1 + i % 28), entry_type='expense',
+                amount=Decimal('12.50'), description=f'Wages, day {i}', category='labor', notes='line\nbreak',
+            )
+            for i in range(2500)
+        ] + [
+            FinancialLedgerEntry(user=other, date=date(2026, 1, 1), entry_type='income',
+                                 amount=Decimal('1.00'), description='not mine', category='loan'),
+        ])
+
+    def test_streams_gzipped_csv_in_date_order(self):
+        with self.settings(EXPORT_CHUNK_SIZE=100):
+            response = self.client.get('/api/finance/ledger/export/', {'gzip': 'true'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertRegex(response['Content-Disposition'], r'ledger-\d{8}\.csv\.gz')
+        rows = list(csv.reader(StringIO(gzip.decompress(b''.join(response.streaming_content)).decode())))
+        self.assertEqual(rows[0][:4], ['date', 'entry_type', 'category', 'amount'])
+        self.assertEqual(len(rows), 2501)
+        self.assertEqual(rows[1][4:], ['Wages, day 0', '', '', '', 'line\nbreak'])
+        dates = [row[0] for row in rows[1:]]
+        self.assertEqual(dates, sorted(dates))
 
-# Create your tests here.
+    def test_streams_filtered_json_lines(self):
+        response = self.client.get('/api/finance/ledger/export/', {'output': 'jsonl', 'start': '2026-01-28'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 89)
+        self.assertEqual(json.loads(lines[0])['amount'], '12.50')
+        self.assertEqual(self.client.get('/api/finance/ledger/export/', {'output': 'xlsx'}).status_code, 400)
@@ -6,6 +6,8 @@ app_name = 'finance'
 urlpatterns = [
     # Financial ledger endpoints
     path('ledger/', views.FinancialLedgerListCreateView.as_view(), name='ledger-list'),
+    path('ledger/export/', views.LedgerExportView.as_view(), name='ledger-export'),
+    path('ledger/import/', views.LedgerImportView.as_view(), name='ledger-import'),
     path('ledger/<int:pk>/', views.FinancialLedgerDetailView.as_view(), name='ledger-detail'),
     path('summary/', views.FinancialSummaryView.as_view(), name='summary'),
 ]
\ No newline at end of file
@@ -1,21 +1,91 @@
+import io
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
+from core.export import export_response
+from core.pagination import keyset_page, parse_limit
+from core.serializers import ExportQuerySerializer
+
+from .importing import ImportFormatError, LedgerImporter
+from .models import FinancialLedgerEntry
+from .serializers import (
+    LEDGER_LIST_FIELDS, FinancialLedgerEntrySerializer, FinancialSummaryQuerySerializer,
+    LedgerImportSerializer, LedgerQuerySerializer,
+)
+from .summary import summarize
+
+# Descending sort key of the ledger listing; matches the ledger_entry_user_keyset index
+LEDGER_KEY = ('date', 'created_at', 'id')
+
+
+def ledger_filters(params):
+    """Map validated listing filters to queryset lookups"""
+    lookups = {
+        'start': 'date__gte',
+        'end': 'date__lte',
+        'entry_type': 'entry_type',
+        'category': 'category',
+        'crop': 'crop_related',
+    }
+    return {lookups[name]: value for name, value in params.items()}
+
 
 class FinancialLedgerListCreateView(APIView):
-    """Financial ledger list/create endpoint - placeholder"""
+    """List a user's ledger newest first, a cursor page at a time, and add entries"""
+    
+    default_limit = 50
+    max_limit = 200
     
     def get(self, request):
+        filters = LedgerQuerySerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        limit = parse_limit(request.query_params.get('limit'), self.default_limit, self.max_limit)
+        
+        entries = (
+            FinancialLedgerEntry.objects
+            .filter(user=request.user, **ledger_filters(filters.validated_data))
+            .order_by(*('-' + field for field in LEDGER_KEY))
+            .only(*LEDGER_LIST_FIELDS)
+        )
+        page, next_cursor = keyset_page(entries, request.query_params.get('cursor'), limit, LEDGER_KEY)
         return Response(
-            {"message": "Financial ledger list endpoint - coming soon"}, 
+            {
+                'results': FinancialLedgerEntrySerializer(page, many=True).data,
+                'next_cursor': next_cursor,
+            },
             status=status.HTTP_200_OK
         )
     
     def post(self, request):
-        return Response(
-            {"message": "Financial ledger creation endpoint - coming soon"}, 
-            status=status.HTTP_200_OK
+        serializer = FinancialLedgerEntrySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class LedgerExportView(APIView):
+    """Stream the user's ledger as CSV or JSON Lines, optionally gzipped"""
+    
+    fields = [
+        'date', 'entry_type', 'category', 'amount', 'description', 'crop_related',
+        'payment_method', 'reference_number', 'notes',
+    ]
+    
+    def get(self, request):
+        options = ExportQuerySerializer(data=request.query_params)
+        options.is_valid(raise_exception=True)
+        filters = LedgerQuerySerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        entries = (
+            FinancialLedgerEntry.objects
+            .filter(user=request.user, **ledger_filters(filters.validated_data))
+            .order_by('date', 'created_at', 'id')
+        )
+        return export_response(
+            entries, self.fields, 'ledger',
+            output=options.validated_data['output'], compress=options.validated_data['gzip'],
         )
 
 
@@ -36,10 +106,32 @@ class FinancialLedgerDetailView(APIView):
 
 
 class FinancialSummaryView(APIView):
-    """Financial summary endpoint - placeholder"""
+    """Income and expense totals by month, category and crop"""
     
     def get(self, request):
-        return Response(
-            {"message": "Financial summary endpoint - coming soon"}, 
-            status=status.HTTP_200_OK
+        serializer = FinancialSummaryQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        summary = summarize(
+            request.user,
+            start=serializer.validated_data.get('start'),
+            end=serializer.validated_data.get('end'),
         )
+        return Response(summary, status=status.HTTP_200_OK)
+
+
+class LedgerImportView(APIView):
+    """Bulk import of ledger entries from an uploaded CSV or bank/UPI statement"""
+    
+    def post(self, request):
+        serializer = LedgerImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data['file']
+        # Large uploads are on disk; rows are decoded and read one at a time
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', errors='replace', newline='')
+        try:
+            result = LedgerImporter(request.user).run(stream)
+        except ImportFormatError as exc:
+            return Response({"message": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            stream.detach()
+        return Response(result._asdict(), status=status.HTTP_200_OK)
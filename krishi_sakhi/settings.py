@@ -115,7 +115,18 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
-    }
+    },
+    'chatbot_answers': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'chatbot-answers',
+        'TIMEOUT': 6 * 60 * 60,  # Answers go stale as advice and weather change
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'weather': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'weather',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
 # Password validation
@@ -169,7 +180,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -202,7 +213,62 @@ CORS_ALLOW_CREDENTIALS = True
 
 # API Keys Configuration
 GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
+GEMINI_MODEL = config('GEMINI_MODEL', default='gemini-1.5-flash')
+GEMINI_TIMEOUT = 20  # Seconds to wait for a response, or for the next streamed chunk
 OPENWEATHER_API_KEY = config('OPENWEATHER_API_KEY', default='')
+OPENWEATHER_API_URL = config('OPENWEATHER_API_URL', default='https://api.openweathermap.org/data/2.5/weather')
+
+# API Usage Logging: 'buffered' writes APIUsageLog rows from a background thread, 'sync' inline
+API_USAGE_LOG_MODE = config('API_USAGE_LOG_MODE', default='buffered')
+API_USAGE_LOG_BUFFER_SIZE = 10000  # Newest entries kept if the database falls behind
+API_USAGE_LOG_BATCH_SIZE = 500  # Pending entries that wake the flusher early
+API_USAGE_LOG_FLUSH_INTERVAL = 2.0  # Seconds between background flushes
+
+# Token Authentication: resolved tokens cached in process and in the default cache
+AUTH_TOKEN_CACHE_TTL = 5 * 60
+AUTH_TOKEN_LOCAL_TTL = 10  # Bounds how long other processes accept a revoked token
+AUTH_TOKEN_LOCAL_SIZE = 10000
+
+# System Configuration: seconds between checks for changes made by other processes
+SYSTEM_CONFIG_CHECK_INTERVAL = 5
+
+# Data Retention: per-model periods live in core.retention and SystemConfiguration
+RETENTION_ARCHIVE_DIR = config('RETENTION_ARCHIVE_DIR', default=str(BASE_DIR / 'var' / 'archive'))
+RETENTION_CHUNK_SIZE = 5000  # Primary keys per delete window
+
+# Ledger Import: CSV and bank/UPI statement uploads are saved in batches of this many rows
+LEDGER_IMPORT_BATCH_SIZE = 1000
+
+# Farmer Onboarding: accounts, profiles and farms created per transaction by onboard_farmers
+ONBOARDING_BATCH_SIZE = 500
+
+# Exports: rows fetched per database round trip while streaming CSV/JSONL downloads
+EXPORT_CHUNK_SIZE = 2000
+
+# Farm Analytics: weekly diary and spend grids, cached per user until a diary or ledger write
+FARM_ANALYTICS_CACHE_TTL = 60 * 60
+FARM_ANALYTICS_DEFAULT_WEEKS = 26
+FARM_ANALYTICS_MAX_WEEKS = 104
+
+# Farm Locations: geohash stored per farm; proximity queries scan at most this many cells
+FARM_GEOHASH_PRECISION = 9  # ~4.8 m cells
+FARM_SPATIAL_MAX_CELLS = 16
+
+# Dashboard: sections cached per user until a write touches them
+DASHBOARD_CACHE_TTL = 10 * 60
+DASHBOARD_LIVE_TTL = 60  # Alerts and chat, which also change with time and bulk writes
+DASHBOARD_DIARY_LIMIT = 5
+DASHBOARD_ALERT_LIMIT = 5
+
+# Weather Cache: farms in the same geohash tile share one upstream call
+WEATHER_CACHE = 'weather'  # Alias in CACHES
+WEATHER_GEOHASH_PRECISION = 5  # ~4.9 km tiles
+WEATHER_FRESH_TTL = 10 * 60  # Seconds before an entry is refreshed in the background
+WEATHER_STALE_TTL = 3 * 60 * 60  # Seconds a stale entry may still be served
+WEATHER_LOCK_TIMEOUT = 10  # Seconds a tile fetch lock is held at most
+WEATHER_FETCH_TIMEOUT = 5
+WEATHER_ALERT_VALID_HOURS = 6
+WEATHER_ALERT_FETCH_WORKERS = 8  # Concurrent tile fetches in the batch alert run
 
 # Twilio Configuration
 TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
@@ -218,6 +284,51 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Alert Dispatch: outbox delivered by the dispatch_alerts worker
+ALERT_SMS_TRANSPORT = config(
+    'ALERT_SMS_TRANSPORT',
+    default='core.dispatch.TwilioSMSTransport' if TWILIO_ACCOUNT_SID else 'core.dispatch.LocmemSMSTransport',
+)
+ALERT_EMAIL_TRANSPORT = config('ALERT_EMAIL_TRANSPORT', default='core.dispatch.EmailTransport')
+ALERT_DISPATCH_RATES = {'sms': 10, 'email': 14}  # Messages per second per channel
+ALERT_DISPATCH_WORKERS = 4  # Sender threads, each with its own connection
+ALERT_DISPATCH_BATCH_SIZE = 500
+ALERT_DISPATCH_MAX_ATTEMPTS = 5
+ALERT_DISPATCH_RETRY_DELAY = 30  # Seconds before the first retry, doubled per attempt
+ALERT_DISPATCH_LEASE = 300  # Seconds before an unfinished claim can be taken over
+
+# Chatbot Retrieval Configuration
+CHATBOT_INDEX_DIR = config('CHATBOT_INDEX_DIR', default=str(BASE_DIR / 'var' / 'chatbot_index'))
+CHATBOT_SEARCH_TOP_K = 4  # Article chunks passed to the LLM as context
+CHATBOT_CONTEXT_TOKENS = 1200  # Token budget for retrieved chunks in a prompt
+CHATBOT_CHUNK_WORDS = 160
+CHATBOT_CHUNK_OVERLAP = 32
+CHATBOT_RETRIEVAL_DEPTH = 4  # Candidates per engine = top_k * depth before fusion
+CHATBOT_EMBEDDER = config('CHATBOT_EMBEDDER', default='chatbot.embeddings.HashingEmbedder')
+CHATBOT_EMBEDDING_DIM = 256
+CHATBOT_SEMANTIC_MIN_SCORE = 0.1
+CHATBOT_LLM_CLIENT = config(
+    'CHATBOT_LLM_CLIENT',
+    default='chatbot.llm.GeminiClient' if GEMINI_API_KEY else 'chatbot.llm.OfflineClient',
+)
+
+# Chat persistence: 'buffered' writes turns behind the request, 'sync' writes each turn
+CHATBOT_WRITE_MODE = config('CHATBOT_WRITE_MODE', default='buffered')
+CHATBOT_WRITE_BUFFER_SIZE = 100  # Pending turns that trigger a flush
+CHATBOT_WRITE_BUFFER_LIMIT = 10000  # Most turns held if the database falls behind; oldest dropped
+CHATBOT_WRITE_FLUSH_INTERVAL = 1.0  # Seconds between background flushes
+CHATBOT_ACTIVITY_DEBOUNCE = 30  # Minimum seconds between last_activity writes per session
+
+# Conversation history: recent turns within the budget, older turns folded into a summary
+CHATBOT_HISTORY_TOKENS = 600
+CHATBOT_SUMMARY_TOKENS = 200
+
+# Chatbot Answer Cache
+CHATBOT_ANSWER_CACHE = 'chatbot_answers'  # Alias in CACHES
+CHATBOT_ANSWER_CACHE_DIM = 128
+CHATBOT_ANSWER_CACHE_SIMILARITY = 0.9  # Cosine similarity for near-duplicate questions
+CHATBOT_ANSWER_CACHE_BUCKET_SIZE = 32  # Recent questions kept per set of articles
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
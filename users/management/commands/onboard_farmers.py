@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.onboarding import FarmerOnboarding
+
+
+class Command(BaseCommand):
+    help = "Create farmer accounts with profiles and farms from a CSV file in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file with a username column and optional profile and farm columns")
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help="Farmers per transaction (defaults to ONBOARDING_BATCH_SIZE)",
+        )
+        parser.add_argument('--encoding', default='utf-8-sig', help="Text encoding of the file")
+
+    def handle(self, *args, **options):
+        onboarding = FarmerOnboarding(batch_size=options['batch_size'])
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding=options['encoding'], newline='') as stream:
+                result = onboarding.run(stream)
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for error in result.errors:
+            self.stderr.write(f"Line {error['line']}: {'; '.join(error['errors'])}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... and {result.error_count - len(result.errors)} more invalid rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Onboarded {result.created} farmers ({result.farms} farms, {result.skipped} existing, "
+            f"{result.error_count} invalid) in {time.perf_counter() - started:.2f}s"
+        ))
@@ -22,23 +22,48 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Fields compared by has_changed()
+    TRACKED_FIELDS = ('phone_number', 'preferred_language')
+    
     def __str__(self):
         return f"{self.user.username} - {self.phone_number}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_values = instance.tracked_values()
+        return instance
+    
+    def tracked_values(self):
+        return tuple(getattr(self, field, None) for field in self.TRACKED_FIELDS)
+    
+    def has_changed(self):
+        """Whether the tracked fields differ from the stored row"""
+        return getattr(self, '_saved_values', None) != self.tracked_values()
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._saved_values = self.tracked_values()
+    
     class Meta:
         verbose_name = "User Profile"
         verbose_name_plural = "User Profiles"
 
 
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    """Automatically create UserProfile when User is created"""
+def sync_user_profile(sender, instance, created, raw=False, **kwargs):
+    """Create the profile of a new user; save a loaded profile only if it changed
+
+    Logins (``last_login`` updates) and other user-only saves cost no profile
+    query. Users created with ``bulk_create`` get their profiles from
+    ``users.onboarding``.
+    """
+    if raw:
+        return
     if created:
         UserProfile.objects.create(user=instance)
-
-
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """Save UserProfile when User is saved"""
-    if hasattr(instance, 'userprofile'):
-        instance.userprofile.save()
+    elif User.userprofile.is_cached(instance):
+        # The cache holds None after a failed lookup such as getattr(user, 'userprofile', None)
+        profile = getattr(instance, 'userprofile', None)
+        if profile is not None and profile.has_changed():
+            profile.save()
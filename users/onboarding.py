@@ -0,0 +1,131 @@
+"""
+Bulk onboarding of farmers from a CSV file.
+
+Each row creates a ``User``, its ``UserProfile`` and, when coordinates are
+given, a ``FarmProfile``. Rows are validated one at a time while the file
+is streamed, then saved in batches of ``settings.ONBOARDING_BATCH_SIZE``:
+each batch is one transaction of three ``bulk_create`` calls (users,
+profiles, farms) plus the crop links, instead of three INSERTs and their
+signals per farmer. Usernames that already exist are skipped.
+
+Columns: ``username`` (required), ``first_name``, ``last_name``,
+``email``, ``phone_number``, ``preferred_language`` and the farm columns
+``location_lat``, ``location_lon``, ``farm_size``, ``primary_crops`` and
+``soil_type``. Accounts get unusable passwords; farmers sign in with a
+token issued later.
+"""
+import csv
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from core import geo
+from farm.models import FarmProfile, crop_index
+
+from .models import UserProfile
+
+
+FARM_FIELDS = ('location_lat', 'location_lon', 'farm_size', 'primary_crops', 'soil_type')
+MAX_REPORTED_ERRORS = 100
+
+OnboardingResult = namedtuple('OnboardingResult', ['created', 'farms', 'skipped', 'error_count', 'errors'])
+
+
+def clean_value(model, name, value):
+    """Run a model field's validators, naming the field in errors"""
+    try:
+        return model._meta.get_field(name).clean(value, None)
+    except ValidationError as exc:
+        raise ValidationError([f"{name}: {message}" for message in exc.messages])
+
+
+class FarmerOnboarding:
+    """Validates farmer rows and creates their accounts in batches"""
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or settings.ONBOARDING_BATCH_SIZE
+        # Hashed once; every onboarded account gets an unusable password
+        self.password = make_password(None)
+
+    def build(self, row):
+        """Return ``(user, profile, farm or None)`` for a row, unsaved"""
+        values = {key: (value or '').strip() for key, value in row.items() if key}
+        user = User(
+            username=clean_value(User, 'username', values.get('username')),
+            first_name=clean_value(User, 'first_name', values.get('first_name', '')),
+            last_name=clean_value(User, 'last_name', values.get('last_name', '')),
+            email=clean_value(User, 'email', values.get('email', '')),
+            password=self.password,
+        )
+        profile = UserProfile(
+            phone_number=clean_value(UserProfile, 'phone_number', values.get('phone_number') or None),
+            preferred_language=clean_value(
+                UserProfile, 'preferred_language', values.get('preferred_language') or 'en',
+            ),
+        )
+        farm = None
+        if any(values.get(name) for name in FARM_FIELDS):
+            farm = FarmProfile(**{name: clean_value(FarmProfile, name, values.get(name)) for name in FARM_FIELDS})
+        return user, profile, farm
+
+    def run(self, text_stream):
+        """Onboard every row of a CSV stream; returns an ``OnboardingResult``"""
+        created = farms = skipped = error_count = 0
+        errors = []
+        batch = []
+        seen = set()
+        for line, row in enumerate(csv.DictReader(text_stream), start=2):
+            try:
+                user, profile, farm = self.build(row)
+            except ValidationError as exc:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line, 'errors': exc.messages})
+                continue
+            if user.username in seen:
+                skipped += 1
+                continue
+            seen.add(user.username)
+            batch.append((user, profile, farm))
+            if len(batch) >= self.batch_size:
+                users, new_farms = self.save_batch(batch)
+                created, farms, skipped = created + users, farms + new_farms, skipped + len(batch) - users
+                batch = []
+        if batch:
+            users, new_farms = self.save_batch(batch)
+            created, farms, skipped = created + users, farms + new_farms, skipped + len(batch) - users
+        return OnboardingResult(created, farms, skipped, error_count, errors)
+
+    def save_batch(self, batch):
+        """Create one batch of farmers; returns ``(users, farms)`` created"""
+        with transaction.atomic():
+            taken = set(
+                User.objects.filter(username__in=[user.username for user, _, _ in batch])
+                .values_list('username', flat=True)
+            )
+            batch = [row for row in batch if row[0].username not in taken]
+            User.objects.bulk_create([user for user, _, _ in batch])
+
+            for user, profile, farm in batch:
+                profile.user = user
+                if farm is not None:
+                    farm.user = user
+            UserProfile.objects.bulk_create([profile for _, profile, _ in batch])
+
+            new_farms = [farm for _, _, farm in batch if farm is not None]
+            if new_farms:
+                # bulk_create skips FarmProfile.save, which sets the geohash
+                geohashes = geo.encode_many(
+                    [farm.location_lat for farm in new_farms],
+                    [farm.location_lon for farm in new_farms],
+                    settings.FARM_GEOHASH_PRECISION,
+                )
+                for farm, geohash in zip(new_farms, geohashes.tolist()):
+                    farm.geohash = geohash
+                FarmProfile.objects.bulk_create(new_farms)
+                crop_index.sync(new_farms)
+        return len(batch), len(new_farms)
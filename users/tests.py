@@ -1,3 +1,83 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from farm.models import FarmProfile
+
+from .models import UserProfile
+from .onboarding import FarmerOnboarding
+
+
+class UserProfileLifecycleTests(TestCase):
+
+    def test_profile_created_once_and_saved_only_when_changed(self):
+        user = User.objects.create_user('farmer')
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+
+        # Login-style and name-only saves touch the user row alone
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+        user = User.objects.select_related('userprofile').get(pk=user.pk)
+        user.first_name = 'Anu'
+        with self.assertNumQueries(1):
+            user.save()
+
+        user.userprofile.preferred_language = 'ml'
+        user.save()
+        self.assertEqual(UserProfile.objects.get(user=user).preferred_language, 'ml')
+
+
+    def test_saving_a_user_without_a_profile(self):
+        user = User.objects.create_user('farmer')
+        UserProfile.objects.filter(user=user).delete()
+        user = User.objects.get(pk=user.pk)
+        self.assertIsNone(getattr(user, 'userprofile', None))
+
+        user.first_name = 'Anu'
+        user.save()
+
+        self.assertEqual(User.objects.get(pk=user.pk).first_name, 'Anu')
+
+
+class FarmerOnboardingTests(TestCase):
+
+    CSV = (
+        'username,first_name,phone_number,preferred_language,location_lat,location_lon,farm_size,primary_crops,soil_type\n'
+        'existing,Old,,,,,,,\n'
+        'anu,Anu,+919400000001,ml,10.0,76.3,1.5,"Paddy, Pepper",loamy\n'
+        'biju,Biju,,,,,,,\n'
+        'anu,Duplicate,,,,,,,\n'
+        'bad lang,Bad,,fr,,,,,\n'
+        'farmless,,,,10.0,,1,paddy,clay\n'
+    )
+
+    def test_bulk_onboarding_creates_users_profiles_and_farms(self):
+        User.objects.create_user('existing')
+
+        # Per batch: existing usernames, users, profiles, farms, crop sync
+        result = FarmerOnboarding(batch_size=2).run(StringIO(self.CSV))
+
+        self.assertEqual((result.created, result.farms, result.skipped, result.error_count), (2, 1, 2, 2))
+        self.assertEqual([error['line'] for error in result.errors], [6, 7])
+        anu = User.objects.select_related('userprofile', 'farmprofile').get(username='anu')
+        self.assertFalse(anu.has_usable_password())
+        self.assertEqual((anu.userprofile.phone_number, anu.userprofile.preferred_language), ('+919400000001', 'ml'))
+        self.assertEqual(len(anu.farmprofile.geohash), 9)
+        self.assertEqual(sorted(anu.farmprofile.crops.values_list('name', flat=True)), ['paddy', 'pepper'])
+        self.assertEqual(UserProfile.objects.filter(user__username='biju').count(), 1)
+        self.assertFalse(FarmProfile.objects.filter(user__username='biju').exists())
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('username,first_name\n' + ''.join(f'farmer{i},F{i}\n' for i in range(30)))
+        self.addCleanup(os.remove, handle.name)
+        out = StringIO()
+
+        call_command('onboard_farmers', handle.name, batch_size=10, stdout=out, stderr=StringIO())
+
+        self.assertIn('Onboarded 30 farmers', out.getvalue())
+        self.assertEqual(UserProfile.objects.filter(user__username__startswith='farmer').count(), 30)
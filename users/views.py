@@ -1,3 +1,5 @@
+from django.contrib.auth import logout
+from rest_framework.authtoken.models import Token
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -26,11 +28,16 @@ class UserLoginView(APIView):
 
 
 class UserLogoutView(APIView):
-    """User logout endpoint - placeholder"""
+    """Revoke the token (or end the session) the request authenticated with"""
     
     def post(self, request):
+        if isinstance(request.auth, Token):
+            # Cached copies are dropped by the token delete signal
+            Token.objects.filter(key=request.auth.key).delete()
+        else:
+            logout(request._request)
         return Response(
-            {"message": "User logout endpoint - coming soon"}, 
+            {"message": "Logged out"}, 
             status=status.HTTP_200_OK
         )
 